@@ -4,6 +4,8 @@ import pandas as pd
 from rapidfuzz import process, fuzz
 import country_converter as coco
 
+from distinct_apply import apply_distinct
+
 INPUT_FILE  = "857-vc-funds-with-names.xlsx"
 SHEET_NAME  = 0
 OUTPUT_FILE = "857-vc-funds-with-country.xlsx"
@@ -146,7 +148,8 @@ def main():
     if hq_col is None:
         raise ValueError("No encuentro la columna 'HQ Location' (o equivalente) en el Excel.")
 
-    df["country"] = df[hq_col].apply(resolve_country)
+    # Cada HQ Location distinta se resuelve una sola vez
+    df["country"] = apply_distinct(df[hq_col], resolve_country)
 
     # métricas
     total = len(df)
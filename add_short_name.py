@@ -7,6 +7,63 @@ Elimina sufijos comunes como "Venture Partners", "Investment Manager", "Ventures
 import pandas as pd
 import re
 
+from csv_storage import DATA_FILE, read_csv_versioned, write_csv_atomic
+from distinct_apply import apply_distinct
+
+# Sufijos comunes a eliminar (ordenados de más específico a más general)
+SUFFIXES = [
+    # Sufijos con "Venture"
+    r'\s+Venture\s+Capital\s+Partners?',
+    r'\s+Venture\s+Partners?',
+    r'\s+Venture\s+Capital',
+    r'\s+Ventures',
+    r'\s+Venture',
+    
+    # Sufijos con "Investment"
+    r'\s+Investment\s+Management',
+    r'\s+Investment\s+Manager',
+    r'\s+Investment\s+Partners?',
+    r'\s+Investment\s+Group',
+    r'\s+Investments?',
+    
+    # Sufijos con "Capital"
+    r'\s+Capital\s+Partners?',
+    r'\s+Capital\s+Management',
+    r'\s+Capital\s+Group',
+    r'\s+Capital',
+    
+    # Sufijos con "Partners"
+    r'\s+Partners?\s+LP',
+    r'\s+Partners?\s+LLC',
+    r'\s+Partners?',
+    
+    # Sufijos con "Management"
+    r'\s+Management\s+Company',
+    r'\s+Management',
+    
+    # Otros sufijos comunes
+    r'\s+Group',
+    r'\s+Fund',
+    r'\s+Holdings?',
+    r'\s+LLC',
+    r'\s+LP',
+    r'\s+Ltd\.?',
+    r'\s+Limited',
+    r'\s+Inc\.?',
+    r'\s+Incorporated',
+    r'\s+Corp\.?',
+    r'\s+Corporation',
+    r'\s+Company',
+    r'\s+Co\.?',
+    
+    # Abreviaciones comunes
+    r'\s+VC',
+]
+
+# Precompilados una vez al importar
+_SUFFIX_PATTERNS = [re.compile(suffix + r'$', re.IGNORECASE) for suffix in SUFFIXES]
+
+
 def extract_short_name(fund_name):
     """
     Extrae el nombre corto del fondo eliminando sufijos comunes.
@@ -20,62 +77,11 @@ def extract_short_name(fund_name):
     if pd.isna(fund_name) or not fund_name.strip():
         return fund_name
     
-    # Lista de sufijos comunes a eliminar (ordenados de más específico a más general)
-    suffixes = [
-        # Sufijos con "Venture"
-        r'\s+Venture\s+Capital\s+Partners?',
-        r'\s+Venture\s+Partners?',
-        r'\s+Venture\s+Capital',
-        r'\s+Ventures',
-        r'\s+Venture',
-        
-        # Sufijos con "Investment"
-        r'\s+Investment\s+Management',
-        r'\s+Investment\s+Manager',
-        r'\s+Investment\s+Partners?',
-        r'\s+Investment\s+Group',
-        r'\s+Investments?',
-        
-        # Sufijos con "Capital"
-        r'\s+Capital\s+Partners?',
-        r'\s+Capital\s+Management',
-        r'\s+Capital\s+Group',
-        r'\s+Capital',
-        
-        # Sufijos con "Partners"
-        r'\s+Partners?\s+LP',
-        r'\s+Partners?\s+LLC',
-        r'\s+Partners?',
-        
-        # Sufijos con "Management"
-        r'\s+Management\s+Company',
-        r'\s+Management',
-        
-        # Otros sufijos comunes
-        r'\s+Group',
-        r'\s+Fund',
-        r'\s+Holdings?',
-        r'\s+LLC',
-        r'\s+LP',
-        r'\s+Ltd\.?',
-        r'\s+Limited',
-        r'\s+Inc\.?',
-        r'\s+Incorporated',
-        r'\s+Corp\.?',
-        r'\s+Corporation',
-        r'\s+Company',
-        r'\s+Co\.?',
-        
-        # Abreviaciones comunes
-        r'\s+VC',
-    ]
-    
     short_name = fund_name.strip()
     
-    # Intentar eliminar sufijos (case-insensitive)
-    for suffix in suffixes:
-        pattern = suffix + r'$'  # Solo al final del nombre
-        short_name = re.sub(pattern, '', short_name, flags=re.IGNORECASE)
+    # Intentar eliminar sufijos (case-insensitive, solo al final del nombre)
+    for pattern in _SUFFIX_PATTERNS:
+        short_name = pattern.sub('', short_name)
     
     # Limpiar espacios extras
     short_name = ' '.join(short_name.split())
@@ -90,13 +96,13 @@ def extract_short_name(fund_name):
 def main():
     """Función principal."""
     print("📂 Leyendo archivo CSV...")
-    df = pd.read_csv("857-vc-funds-with-email-template.csv")
+    df, version = read_csv_versioned(DATA_FILE)
     
     print(f"✅ Cargados {len(df)} registros")
     
     # Agregar columna Short_Name
     print("\n🔄 Generando nombres cortos...")
-    df["Short_Name"] = df["Investors"].apply(extract_short_name)
+    df["Short_Name"] = apply_distinct(df["Investors"], extract_short_name)
     
     # Mostrar algunos ejemplos
     print("\n📊 Ejemplos de nombres cortos generados:")
@@ -120,7 +126,8 @@ def main():
     
     # Guardar
     print("\n💾 Guardando cambios...")
-    df.to_csv("857-vc-funds-with-email-template.csv", index=False)
+    # Falla con StaleDataError si otro proceso escribió el CSV mientras tanto
+    write_csv_atomic(df, DATA_FILE, expected_version=version)
     print("✅ Archivo actualizado con la columna Short_Name")
     
     # Verificar posición de la columna
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Instrumentación ligera de las llamadas a APIs externas (LLM, búsqueda web, Genderize).
+
+- @instrument("serpapi") o `with track("llm.openai", model=...) as call:`
+  miden la duración de cada llamada; dentro, annotate() / annotate_response()
+  agregan el status HTTP, los tokens de uso, el modelo o un error.
+- record_cache_hit() y note_retry() cuentan aciertos de caché y reintentos.
+- El registro agrega por nombre de llamada: histograma de latencias, p50/p95,
+  tokens, coste estimado, códigos HTTP, errores, cache hits y reintentos.
+- start_run("generate_hooks") abre una traza JSONL (una línea por evento) en
+  METRICS_DIR; finish_run() la cierra e imprime la tabla resumen. La pestaña
+  "Métricas" de app.py lee estas trazas y el registro del propio proceso.
+
+Precios aproximados en PRICES_PER_1K_TOKENS (USD por 1K tokens de entrada /
+salida); se pueden sobrescribir con LLM_PRICES='{"gpt-4o": [0.0025, 0.01]}'.
+"""
+
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+METRICS_DIR = "api_metrics"
+# Límites superiores (segundos) de los buckets del histograma de latencias
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, float("inf"))
+LATENCY_SAMPLES = 1000
+
+PRICES_PER_1K_TOKENS = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "claude-3-haiku": (0.00025, 0.00125),
+    "claude-3-5-sonnet": (0.003, 0.015),
+    "claude-3-sonnet": (0.003, 0.015),
+    "claude-3-opus": (0.015, 0.075),
+}
+PRICES_PER_1K_TOKENS.update({k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+
+# Las URLs de requests en los mensajes de error llevan la API key en la query
+_SECRET_PARAM_RE = re.compile(r"([?&](?:api_?key|key|token|access_token)=)[^&\s]+", re.IGNORECASE)
+
+_current: ContextVar[Optional[Dict]] = ContextVar("api_metrics_call", default=None)
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Coste en USD según el prefijo más largo del modelo en la tabla de precios."""
+    if not model:
+        return None
+    matches = [name for name in PRICES_PER_1K_TOKENS if model.startswith(name)]
+    if not matches:
+        return None
+    price_in, price_out = PRICES_PER_1K_TOKENS[max(matches, key=len)]
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1000
+
+
+def usage_from(payload) -> Dict[str, int]:
+    """Tokens de uso de una respuesta OpenAI (usage.prompt_tokens) o Anthropic (usage.input_tokens)."""
+    usage = payload.get("usage") if isinstance(payload, dict) else getattr(payload, "usage", None)
+    if usage is None:
+        return {}
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    prompt = get("prompt_tokens") if get("prompt_tokens") is not None else get("input_tokens")
+    completion = get("completion_tokens") if get("completion_tokens") is not None else get("output_tokens")
+    return {"prompt_tokens": int(prompt or 0), "completion_tokens": int(completion or 0)}
+
+
+class _Aggregate:
+    """Agregado de un nombre de llamada."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.total_seconds = 0.0
+        self.statuses = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, event: Dict):
+        kind = event.get("event", "call")
+        if kind == "cache_hit":
+            self.cache_hits += 1
+            return
+        if kind == "retry":
+            self.retries += 1
+            return
+        self.calls += 1
+        if not event.get("ok", True):
+            self.errors += 1
+        if event.get("status") is not None:
+            self.statuses[str(event["status"])] += 1
+        self.prompt_tokens += event.get("prompt_tokens") or 0
+        self.completion_tokens += event.get("completion_tokens") or 0
+        self.cost += event.get("cost_usd") or 0.0
+        duration = event.get("duration_s") or 0.0
+        self.total_seconds += duration
+        self.samples.append(duration)
+        self.buckets[next(i for i, edge in enumerate(LATENCY_BUCKETS) if duration <= edge)] += 1
+
+    def row(self, name: str) -> Dict:
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3) if samples else None
+
+        return {
+            "name": name, "calls": self.calls, "errors": self.errors, "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "avg_s": round(self.total_seconds / self.calls, 3) if self.calls else None,
+            "p50_s": percentile(0.50), "p95_s": percentile(0.95), "max_s": round(samples[-1], 3) if samples else None,
+            "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 4), "statuses": dict(self.statuses),
+            "histogram": {(f"≤{edge:g}s" if edge != float("inf") else f">{LATENCY_BUCKETS[-2]:g}s"): n
+                          for edge, n in zip(LATENCY_BUCKETS, self.buckets)},
+        }
+
+
+class MetricsRegistry:
+    """Agregados por nombre de llamada + traza JSONL opcional de la ejecución en curso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aggregates: Dict[str, _Aggregate] = {}
+        self._trace = None
+        self.trace_path: Optional[str] = None
+        self.run_name: Optional[str] = None
+
+    def add(self, event: Dict):
+        event.setdefault("ts", round(time.time(), 3))
+        if self.run_name:
+            event.setdefault("run", self.run_name)
+        with self._lock:
+            self._aggregates.setdefault(event["name"], _Aggregate()).add(event)
+            if self._trace is not None:
+                self._trace.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+                self._trace.flush()
+
+    def start_run(self, name: str, directory: str = METRICS_DIR) -> str:
+        """Reinicia los agregados y abre la traza <directory>/<name>-<fecha>.jsonl."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}-{datetime.now():%Y%m%d-%H%M%S}.jsonl")
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+            self._aggregates = {}
+            self._trace = open(path, "a", encoding="utf-8")
+            self.trace_path = path
+            self.run_name = name
+        return path
+
+    def finish_run(self, show: bool = True) -> List[Dict]:
+        """Cierra la traza y (por defecto) imprime el resumen."""
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+            self._trace = None
+        rows = self.summary()
+        if show and rows:
+            print(format_summary(rows))
+            if self.trace_path:
+                print(f"   🧾 Traza: {self.trace_path}")
+        return rows
+
+    def summary(self) -> List[Dict]:
+        with self._lock:
+            return [agg.row(name) for name, agg in sorted(self._aggregates.items())]
+
+    def reset(self):
+        with self._lock:
+            self._aggregates = {}
+
+
+registry = MetricsRegistry()
+
+
+def annotate(**fields):
+    """Agrega campos (status, prompt_tokens, model, error, ...) a la llamada en curso."""
+    call = _current.get()
+    if call is not None:
+        if fields.get("error") is not None:
+            fields["error"] = _SECRET_PARAM_RE.sub(r"\1***", str(fields["error"]))[:200]
+        call.update({k: v for k, v in fields.items() if v is not None})
+
+
+def annotate_response(response, model: Optional[str] = None):
+    """Status HTTP y tokens de uso de una respuesta de requests."""
+    fields = {"status": response.status_code, "model": model}
+    try:
+        fields.update(usage_from(response.json()))
+    except ValueError:
+        pass
+    annotate(**fields)
+
+
+@contextmanager
+def track(name: str, **fields):
+    """Mide el bloque como una llamada `name`; annotate() dentro agrega datos."""
+    call = dict(fields)
+    token = _current.set(call)
+    started = time.perf_counter()
+    try:
+        yield call
+    except GeneratorExit:  # el consumidor dejó de leer un stream: no es un error
+        call.setdefault("cancelled", True)
+        raise
+    except BaseException as e:
+        call.setdefault("error", _SECRET_PARAM_RE.sub(r"\1***", f"{type(e).__name__}: {e}")[:200])
+        status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+        if status is not None:
+            call.setdefault("status", status)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:  # generador consumido desde otro contexto
+            _current.set(None)
+        _finish(name, call, time.perf_counter() - started)
+
+
+def _finish(name: str, call: Dict, duration: float):
+    status = call.get("status")
+    ok = "error" not in call and (status is None or int(status) < 400)
+    cost = estimate_cost(call.get("model"), call.get("prompt_tokens") or 0, call.get("completion_tokens") or 0)
+    registry.add({"event": "call", "name": name, "duration_s": round(duration, 4), "ok": ok,
+                  **call, **({"cost_usd": round(cost, 6)} if cost else {})})
+
+
+def instrument(name: str):
+    """Decorador: cada llamada a la función se registra como `name` (también generadores)."""
+    def decorator(fn: Callable):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                with track(name):
+                    yield from fn(*args, **kwargs)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache_hit(name: str):
+    registry.add({"event": "cache_hit", "name": name})
+
+
+def note_retry(name: str):
+    registry.add({"event": "retry", "name": name})
+
+
+def start_run(name: str, directory: str = METRICS_DIR) -> str:
+    return registry.start_run(name, directory)
+
+
+def finish_run(show: bool = True) -> List[Dict]:
+    return registry.finish_run(show)
+
+
+def summarize_events(events: Iterable[Dict]) -> List[Dict]:
+    """Mismo resumen que el registro, a partir de eventos (p. ej. una traza)."""
+    aggregates: Dict[str, _Aggregate] = {}
+    for event in events:
+        aggregates.setdefault(event["name"], _Aggregate()).add(event)
+    return [agg.row(name) for name, agg in sorted(aggregates.items())]
+
+
+def load_trace(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def list_traces(directory: str = METRICS_DIR) -> List[str]:
+    """Trazas guardadas, la más reciente primero."""
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".jsonl")]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def format_summary(rows: List[Dict]) -> str:
+    """Tabla de texto para el final de cada script."""
+    lines = ["\n📈 Llamadas a APIs:",
+             f"   {'llamada':<24}{'n':>6}{'err':>5}{'cache':>7}{'retry':>7}{'p50':>8}{'p95':>8}"
+             f"{'tokens in':>11}{'out':>8}{'USD':>9}"]
+    for r in rows:
+        p50 = f"{r['p50_s']:.2f}s" if r["p50_s"] is not None else "-"
+        p95 = f"{r['p95_s']:.2f}s" if r["p95_s"] is not None else "-"
+        lines.append(f"   {r['name']:<24}{r['calls']:>6}{r['errors']:>5}{r['cache_hits']:>7}{r['retries']:>7}"
+                     f"{p50:>8}{p95:>8}{r['prompt_tokens']:>11}{r['completion_tokens']:>8}{r['cost_usd']:>9.4f}")
+    return "\n".join(lines)
+
+
+def print_summary():
+    rows = registry.summary()
+    if rows:
+        print(format_summary(rows))
@@ -4,6 +4,19 @@ import os
 import subprocess
 import sys
 import random
+import threading
+import api_metrics
+import dataset_schema
+from app_profiler import start_profiler
+from csv_storage import (
+    DATA_FILE, LockTimeoutError, file_version, update_rows_from
+)
+from final_export import (
+    EXPORT_FORMATS, FINAL_COLUMNS, OUTPUT_FILE as FINAL_OUTPUT_FILE,
+    stream_final_export, write_excel_streaming, write_final_export
+)
+from hook_prompts import email_context_for
+from language_detect import non_english_mask
 
 # Configuración de la página
 st.set_page_config(
@@ -12,27 +25,71 @@ st.set_page_config(
     layout="wide"
 )
 
+# Perfilado opcional del rerun (APP_PROFILE=1 o toggle del sidebar)
+profiler = start_profiler()
+
 st.title("📧 VC Outreach Email Editor")
 st.markdown("Edita hooks personalizados y cualquier columna de tu base de datos de VC.")
 
 # Tabs para organizar funcionalidades
-tab1, tab2, tab3, tab4 = st.tabs(["📝 Editor de Datos", "🤖 Generador de Hooks", "👀 Revisión de Hooks", "🎲 Vista Previa Aleatoria"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Editor de Datos", "🤖 Generador de Hooks", "👀 Revisión de Hooks", "🎲 Vista Previa Aleatoria", "📈 Métricas"])
 
 # Cargar datos
-@st.cache_data
+@st.cache_resource
+def data_cache():
+    # DataFrame en memoria y versión del CSV (mtime + tamaño) de la que proviene,
+    # compartidos entre sesiones: el lock protege el cambio de la pareja
+    return {"df": None, "version": None, "lock": threading.Lock()}
+
 def load_data():
-    if os.path.exists("857-vc-funds-with-email-template.csv"):
-        return pd.read_csv("857-vc-funds-with-email-template.csv")
-    return None
+    """Relee el CSV solo si cambió en disco (un script en segundo plano u otra pestaña)."""
+    if not os.path.exists(DATA_FILE):
+        return None
+    cache = data_cache()
+    with cache["lock"]:
+        if cache["df"] is None or cache["version"] != file_version(DATA_FILE):
+            # Categorías, Int8 y cuerpos derivados de la plantilla (ver dataset_schema.py)
+            cache["df"], cache["version"] = dataset_schema.load_compact(DATA_FILE)
+        return cache["df"]
+
+def save_rows(updates: dict) -> bool:
+    """
+    Guarda solo las celdas modificadas ({índice: {columna: valor}}) con lock y
+    escritura atómica, y las aplica a una copia del DataFrame en memoria que
+    sustituye a la compartida (copy-on-write: otras sesiones que estén leyendo
+    la anterior no la ven cambiar a medias). El DataFrame que ya tenga el
+    llamador no cambia: hay que hacer st.rerun() o volver a llamar a load_data().
+    """
+    cache = data_cache()
+    with cache["lock"]:
+        base_df, base_version = cache["df"], cache["version"]
+    try:
+        version, in_sync = update_rows_from(updates, base_version, DATA_FILE)
+    except LockTimeoutError as e:
+        st.error(f"❌ {e}. Otro proceso está escribiendo el CSV, intenta de nuevo.")
+        return False
+    if in_sync and base_df is not None:
+        updated = base_df.copy()
+        for idx, values in updates.items():
+            if idx in updated.index:
+                for col, value in values.items():
+                    dataset_schema.set_value(updated, idx, col, value)
+        with cache["lock"]:
+            # Si otra sesión ya cambió la caché, load_data() releerá el CSV
+            if cache["version"] == base_version:
+                cache["df"], cache["version"] = updated, version
+    return True
 
-df = load_data()
+with profiler.block("carga de datos"):
+    df = load_data()
 
 if df is None:
     st.error("❌ No se encontró el archivo '857-vc-funds-with-email-template.csv'")
     st.info("💡 Ejecuta primero: `python generate_personalized_emails.py`")
     st.stop()
 
-with tab1:
+with tab1, profiler.block("tab1 · Editor de Datos"):
+    profiler.checkpoint("filtros")
     # Sidebar con filtros
     st.sidebar.header("🔍 Filtros")
 
@@ -53,6 +110,7 @@ with tab1:
 
     st.sidebar.metric("Registros mostrados", len(filtered_df))
 
+    profiler.checkpoint("editor")
     # Editor de datos
     st.header("📝 Editor de Datos")
 
@@ -72,10 +130,13 @@ with tab1:
 
     if selected_columns:
         # Crear editor de datos - limpiar NaN values
-        editor_df = filtered_df[["Primary Contact"] + selected_columns].copy()
+        # Asunto y cuerpo solo se materializan si se van a editar
+        editor_source = (dataset_schema.with_bodies(filtered_df)
+                         if {"Email_Subject", "Email_Body"} & set(selected_columns) else filtered_df)
+        editor_df = editor_source[["Primary Contact"] + selected_columns].copy()
         for col in selected_columns:
             if col in editor_df.columns:
-                editor_df[col] = editor_df[col].fillna("").astype(str)
+                editor_df[col] = editor_df[col].astype(object).fillna("").astype(str)
         
         edited_df = st.data_editor(
             editor_df,
@@ -90,26 +151,27 @@ with tab1:
         with col1:
             if st.button("💾 Guardar cambios al CSV", type="primary"):
                 # Actualizar el DataFrame original con los cambios
+                updates = {}
                 for idx, row in edited_df.iterrows():
                     # Usar el índice original del filtered_df
                     original_idx = filtered_df.index[idx]
                     for col in selected_columns:
                         if col in row:
-                            df.at[original_idx, col] = row[col]
+                            updates.setdefault(original_idx, {})[col] = row[col]
                 
-                # Guardar CSV
-                df.to_csv("857-vc-funds-with-email-template.csv", index=False)
-                st.success("✅ Cambios guardados en CSV")
-                st.cache_data.clear()
+                # Guardar solo las celdas editadas en el CSV
+                if save_rows(updates):
+                    st.success("✅ Cambios guardados en CSV")
         
         with col2:
             if st.button("📊 Exportar a Excel"):
-                df.to_excel("857-vc-funds-with-email-template-updated.xlsx", index=False)
+                write_excel_streaming(df, "857-vc-funds-with-email-template-updated.xlsx")
                 st.success("✅ Exportado a Excel")
         
         with col3:
             if st.button("🔄 Regenerar emails"):
                 # Regenerar emails con los nuevos hooks
+                updates = {}
                 for idx, row in df.iterrows():
                     if pd.notna(row.get("Person_Hook")) and row["Person_Hook"].strip():
                         # Actualizar el email body con el nuevo hook
@@ -117,55 +179,60 @@ with tab1:
                         new_hook = row["Person_Hook"]
                         
                         if "Email_Body" in df.columns:
-                            df.at[idx, "Email_Body"] = df.at[idx, "Email_Body"].replace(old_hook, new_hook)
+                            updates[idx] = {"Email_Body": dataset_schema.email_body(row).replace(old_hook, new_hook)}
                 
-                df.to_csv("857-vc-funds-with-email-template.csv", index=False)
-                st.success("✅ Emails regenerados con nuevos hooks")
-                st.cache_data.clear()
-                st.rerun()
+                if save_rows(updates):
+                    st.success("✅ Emails regenerados con nuevos hooks")
+                    st.rerun()
     
+    profiler.checkpoint("exportación")
     # Botón Finalizar - Generar CSV con 8 columnas específicas
     st.divider()
     st.subheader("🎯 Finalizar - Exportar CSV Final")
     
     if st.button("✅ Finalizar - Generar CSV Final", type="primary", help="Genera un CSV con las 8 columnas necesarias para el envío"):
-        # Crear DataFrame con las 8 columnas solicitadas
-        final_df = pd.DataFrame()
-        
-        # Mapear columnas del DataFrame original a las columnas finales
-        final_df["Full_name"] = df["Primary Contact"].fillna("")
-        final_df["email"] = df["Primary Contact Email"].fillna("")
-        final_df["body"] = df["Email_Body"].fillna("")
-        final_df["subject"] = df["Email_Subject"].fillna("")
-        final_df["first_name"] = df["First Name"].fillna("")
-        final_df["last_name"] = df["Last Name"].fillna("")
-        final_df["fund_name"] = df["Investors"].fillna("")
-        final_df["fund_short_name"] = df["Short_Name"].fillna("")
-        
-        # Guardar CSV final
-        output_file = "857-vc-funds-final.csv"
-        final_df.to_csv(output_file, index=False)
-        
-        st.success(f"✅ CSV final generado: {output_file}")
-        st.info(f"📊 {len(final_df)} registros exportados con 8 columnas")
+        # Escribir por bloques a un temporal y renombrar (ver final_export.py)
+        stats = write_final_export(df, FINAL_OUTPUT_FILE)
+        
+        st.success(f"✅ CSV final generado: {FINAL_OUTPUT_FILE}")
+        st.info(f"📊 {stats['total']} registros exportados con {len(FINAL_COLUMNS)} columnas")
         
         # Mostrar preview del CSV
         st.subheader("📋 Preview del CSV Final")
-        st.dataframe(final_df.head(10), use_container_width=True)
+        if stats["preview"] is not None:
+            st.dataframe(stats["preview"], use_container_width=True)
         
         # Mostrar estadísticas
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total registros", len(final_df))
+            st.metric("Total registros", stats["total"])
         with col2:
-            emails_with_data = len(final_df[final_df["email"].str.strip() != ""])
-            st.metric("Con email", emails_with_data)
+            st.metric("Con email", stats["with_email"])
         with col3:
-            hooks_with_data = len(final_df[final_df["body"].str.contains("your leadership at", case=False, na=False) == False])
-            st.metric("Con hooks personalizados", hooks_with_data)
+            st.metric("Con hooks personalizados", stats["with_hooks"])
         with col4:
-            st.metric("Columnas", 8)
+            st.metric("Columnas", len(FINAL_COLUMNS))
+
+    # Descargas generadas al hacer clic (Streamlit las sirve desde memoria; data callable requiere streamlit>=1.50)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Descargar CSV final",
+            data=lambda: stream_final_export(df, "csv"),
+            file_name=FINAL_OUTPUT_FILE,
+            mime=EXPORT_FORMATS["csv"]["mime"],
+            on_click="ignore"
+        )
+    with col2:
+        st.download_button(
+            "⬇️ Descargar JSONL (mail-merge)",
+            data=lambda: stream_final_export(df, "jsonl"),
+            file_name=os.path.splitext(FINAL_OUTPUT_FILE)[0] + EXPORT_FORMATS["jsonl"]["extension"],
+            mime=EXPORT_FORMATS["jsonl"]["mime"],
+            on_click="ignore"
+        )
 
+    profiler.checkpoint("vista previa")
     # Vista previa de emails
     st.header("👀 Vista Previa de Emails")
 
@@ -183,11 +250,11 @@ with tab1:
         
         with col1:
             st.subheader("📧 Asunto")
-            st.code(selected_row.get("Email_Subject", "N/A"))
+            st.code(dataset_schema.email_subject(selected_row) or "N/A")
         
         with col2:
             st.subheader("📝 Cuerpo")
-            st.code(selected_row.get("Email_Body", "N/A"))
+            st.code(dataset_schema.email_body(selected_row) or "N/A")
         
         # Información del contacto
         st.subheader("👤 Información del Contacto")
@@ -198,6 +265,7 @@ with tab1:
             if pd.notna(selected_row[col]):
                 st.write(f"**{col}:** {selected_row[col]}")
 
+    profiler.checkpoint("estadísticas")
     # Estadísticas
     st.header("📊 Estadísticas")
     col1, col2, col3, col4 = st.columns(4)
@@ -234,7 +302,7 @@ with tab1:
     """)
 
 # Tab 2: Generador de Hooks
-with tab2:
+with tab2, profiler.block("tab2 · Generador de Hooks"):
     st.header("🤖 Generador Automático de Hooks")
     
     # Verificar API keys
@@ -312,7 +380,6 @@ with tab2:
                             
                             if result.returncode == 0:
                                 st.success("✅ Hooks generados exitosamente")
-                                st.cache_data.clear()
                                 st.rerun()
                             else:
                                 st.error(f"❌ Error: {result.stderr}")
@@ -331,25 +398,27 @@ import os
 import pandas as pd
 import requests
 import time
+from csv_storage import update_rows
 from generate_hooks import generate_hook
+from hook_prompts import email_context_for
 
 df = pd.read_csv("857-vc-funds-with-email-template.csv")
 empty_hooks = df[df["Person_Hook"].isna() | (df["Person_Hook"] == "")]
 batch = empty_hooks.head({batch_size})
 
 generated_count = 0
+updates = {{}}
 for idx, row in batch.iterrows():
     print(f"Procesando {{row['Primary Contact']}}...")
-    email_context = f"Subject: {{row.get('Email_Subject', '')}}\\nBody: {{row.get('Email_Body', '')}}"
+    email_context = email_context_for(row)
     hook = generate_hook(row.to_dict(), email_context)
     if hook:
-        df.at[idx, "Person_Hook"] = hook
-        df.at[idx, "Hook_Confidence"] = "8"
+        updates[idx] = {{"Person_Hook": hook, "Hook_Confidence": "8"}}
         generated_count += 1
         print(f"  ✅ Hook generado: {{hook}}")
     time.sleep(0.5)
 
-df.to_csv("857-vc-funds-with-email-template.csv", index=False)
+update_rows(updates)
 print(f"✅ Lote completado: {{generated_count}} hooks generados")
 """
                             
@@ -365,7 +434,6 @@ print(f"✅ Lote completado: {{generated_count}} hooks generados")
                             
                             if result.returncode == 0:
                                 st.success(f"✅ Lote de {batch_size} hooks generado")
-                                st.cache_data.clear()
                                 st.rerun()
                             else:
                                 st.error(f"❌ Error: {result.stderr}")
@@ -399,7 +467,6 @@ print(f"✅ Lote completado: {{generated_count}} hooks generados")
                                 
                                 if result.returncode == 0:
                                     st.success("✅ Hooks con búsqueda web generados exitosamente")
-                                    st.cache_data.clear()
                                     st.rerun()
                                 else:
                                     st.error(f"❌ Error: {result.stderr}")
@@ -418,28 +485,29 @@ import os
 import pandas as pd
 import requests
 import time
+from csv_storage import update_rows
 from generate_hooks_with_web_search import generate_hook_with_web_context
+from hook_prompts import email_context_for
 
 df = pd.read_csv("857-vc-funds-with-email-template.csv")
 empty_hooks = df[df["Person_Hook"].isna() | (df["Person_Hook"] == "")]
 batch = empty_hooks.head({web_batch_size})
 
 generated_count = 0
+updates = {{}}
 for idx, row in batch.iterrows():
     print(f"Procesando {{row['Primary Contact']}}...")
-    email_context = f"Subject: {{row.get('Email_Subject', '')}}\\nBody: {{row.get('Email_Body', '')}}"
+    email_context = email_context_for(row)
     hook, source_url, confidence = generate_hook_with_web_context(row.to_dict(), email_context)
     if hook:
-        df.at[idx, "Person_Hook"] = hook
-        df.at[idx, "Hook_Source_URL"] = source_url
-        df.at[idx, "Hook_Confidence"] = confidence
+        updates[idx] = {{"Person_Hook": hook, "Hook_Source_URL": source_url, "Hook_Confidence": confidence}}
         generated_count += 1
         print(f"  ✅ Hook generado: {{hook}}")
         if source_url:
             print(f"  📰 Fuente: {{source_url}}")
     time.sleep(2)  # Pausa más larga para búsquedas web
 
-df.to_csv("857-vc-funds-with-email-template.csv", index=False)
+update_rows(updates)
 print(f"✅ Lote web completado: {{generated_count}} hooks generados")
 """
                                 
@@ -455,7 +523,6 @@ print(f"✅ Lote web completado: {{generated_count}} hooks generados")
                                 
                                 if result.returncode == 0:
                                     st.success(f"✅ Lote web de {web_batch_size} hooks generado")
-                                    st.cache_data.clear()
                                     st.rerun()
                                 else:
                                     st.error(f"❌ Error: {result.stderr}")
@@ -469,38 +536,30 @@ print(f"✅ Lote web completado: {{generated_count}} hooks generados")
             with col1:
                 if st.button("🔄 Regenerar todos los hooks"):
                     # Limpiar hooks existentes
-                    df["Person_Hook"] = ""
-                    df["Hook_Confidence"] = ""
-                    df.to_csv("857-vc-funds-with-email-template.csv", index=False)
-                    st.success("✅ Hooks limpiados. Ejecuta 'Generar hooks automáticamente' para regenerar")
-                    st.cache_data.clear()
-                    st.rerun()
+                    updates = {idx: {"Person_Hook": "", "Hook_Confidence": ""} for idx in df.index}
+                    if save_rows(updates):
+                        st.success("✅ Hooks limpiados. Ejecuta 'Generar hooks automáticamente' para regenerar")
+                        st.rerun()
             
             with col2:
                 if st.button("🔧 Regenerar hooks en español"):
-                    # Buscar hooks que puedan estar en español
-                    spanish_hooks = df[
-                        (df["Person_Hook"].str.contains("tu|tu liderazgo|tu experiencia|tu enfoque", case=False, na=False)) |
-                        (df["Person_Hook"].str.contains("su|su liderazgo|su experiencia|su enfoque", case=False, na=False))
-                    ]
+                    # Buscar hooks que no estén en inglés (stopwords con límites de palabra)
+                    spanish_hooks = df[non_english_mask(df["Person_Hook"])]
                     
                     if len(spanish_hooks) > 0:
                         st.warning(f"⚠️ Encontrados {len(spanish_hooks)} hooks que parecen estar en español")
                         
                         # Limpiar solo esos hooks
-                        for idx in spanish_hooks.index:
-                            df.at[idx, "Person_Hook"] = ""
-                            df.at[idx, "Hook_Confidence"] = ""
-                        
-                        df.to_csv("857-vc-funds-with-email-template.csv", index=False)
-                        st.success("✅ Hooks en español limpiados. Ejecuta 'Generar hooks automáticamente' para regenerar")
-                        st.cache_data.clear()
-                        st.rerun()
+                        updates = {idx: {"Person_Hook": "", "Hook_Confidence": ""} for idx in spanish_hooks.index}
+                        if save_rows(updates):
+                            st.success("✅ Hooks en español limpiados. Ejecuta 'Generar hooks automáticamente' para regenerar")
+                            st.rerun()
                     else:
                         st.info("✅ No se encontraron hooks en español")
 
 # Tab 3: Revisión de Hooks
-with tab3:
+with tab3, profiler.block("tab3 · Revisión de Hooks"):
+    profiler.checkpoint("búsqueda")
     st.header("👀 Revisión y Edición de Hooks")
     
     # Buscador de registros específicos
@@ -562,6 +621,7 @@ with tab3:
     
     st.divider()
     
+    profiler.checkpoint("filtros y tarjetas")
     # Filtros para revisión
     st.subheader("🔧 Filtros de Revisión")
     col1, col2, col3 = st.columns(3)
@@ -602,8 +662,7 @@ with tab3:
             review_df = review_df[
                 (review_df["Person_Hook"].notna()) & 
                 (review_df["Person_Hook"] != "") &
-                (review_df["Hook_Confidence"].astype(str).str.isdigit()) &
-                (review_df["Hook_Confidence"].astype(int) < confidence_threshold)
+                (pd.to_numeric(review_df["Hook_Confidence"], errors="coerce").astype(float) < confidence_threshold)
             ]
         
         if country_review != "Todos":
@@ -623,7 +682,7 @@ with tab3:
         if "Hook_Source_URL" in review_df_clean.columns:
             review_df_clean["Hook_Source_URL"] = review_df_clean["Hook_Source_URL"].fillna("").astype(str)
         if "Hook_Confidence" in review_df_clean.columns:
-            review_df_clean["Hook_Confidence"] = review_df_clean["Hook_Confidence"].fillna("").astype(str)
+            review_df_clean["Hook_Confidence"] = review_df_clean["Hook_Confidence"].astype(object).fillna("").astype(str)
         
         edited_hooks = st.data_editor(
             review_df_clean,
@@ -650,6 +709,7 @@ with tab3:
         with col1:
             if st.button("💾 Guardar cambios de hooks", type="primary"):
                 # Actualizar el DataFrame original
+                updates = {}
                 if st.session_state.get('selected_contact_idx') is not None:
                     # Si estamos viendo un registro específico
                     original_idx = st.session_state['selected_contact_idx']
@@ -657,23 +717,23 @@ with tab3:
                         row = edited_hooks.iloc[0]  # Solo hay una fila
                         for col in available_hook_cols:
                             if col in ["Person_Hook", "Hook_Confidence", "Hook_Source_URL"] and col in row:
-                                df.at[original_idx, col] = row[col]
+                                updates.setdefault(original_idx, {})[col] = row[col]
                 else:
                     # Si estamos viendo todos los registros
                     for idx, row in edited_hooks.iterrows():
                         original_idx = review_df.index[idx]
                         for col in available_hook_cols:
                             if col in ["Person_Hook", "Hook_Confidence", "Hook_Source_URL"] and col in row:
-                                df.at[original_idx, col] = row[col]
+                                updates.setdefault(original_idx, {})[col] = row[col]
                 
-                df.to_csv("857-vc-funds-with-email-template.csv", index=False)
-                st.success("✅ Cambios de hooks guardados")
-                st.cache_data.clear()
-                st.rerun()
+                if save_rows(updates):
+                    st.success("✅ Cambios de hooks guardados")
+                    st.rerun()
         
         with col2:
             if st.button("🔄 Regenerar emails con nuevos hooks"):
                 # Regenerar emails con los hooks actualizados
+                updates = {}
                 for idx, row in df.iterrows():
                     if pd.notna(row.get("Person_Hook")) and row["Person_Hook"].strip():
                         # Actualizar el email body con el nuevo hook
@@ -681,12 +741,11 @@ with tab3:
                         new_hook = row["Person_Hook"]
                         
                         if "Email_Body" in df.columns:
-                            df.at[idx, "Email_Body"] = df.at[idx, "Email_Body"].replace(old_hook, new_hook)
+                            updates[idx] = {"Email_Body": dataset_schema.email_body(row).replace(old_hook, new_hook)}
                 
-                df.to_csv("857-vc-funds-with-email-template.csv", index=False)
-                st.success("✅ Emails regenerados con hooks actualizados")
-                st.cache_data.clear()
-                st.rerun()
+                if save_rows(updates):
+                    st.success("✅ Emails regenerados con hooks actualizados")
+                    st.rerun()
         
         # Vista previa de hooks
         st.subheader("🔍 Vista Previa de Hooks")
@@ -731,79 +790,62 @@ with tab3:
                 
                 with col1:
                     if st.button("🔄 Regenerar hook (rápido)", key=f"regenerate_{hook_idx}"):
-                        with st.spinner("Regenerando hook..."):
-                            try:
-                                # Importar función de generación
-                                import sys
-                                sys.path.append('.')
-                                from generate_hooks import generate_hook
-                                
-                                # Crear contexto del email
-                                email_context = f"""
-Subject: {selected_hook_row.get('Email_Subject', '')}
-Body: {selected_hook_row.get('Email_Body', '')}
-"""
-                                
-                                # Generar nuevo hook
-                                new_hook = generate_hook(selected_hook_row.to_dict(), email_context)
-                                
-                                if new_hook:
-                                    # Actualizar en el DataFrame
-                                    original_idx = review_df.index[hook_idx]
-                                    df.at[original_idx, "Person_Hook"] = new_hook
-                                    df.at[original_idx, "Hook_Confidence"] = "8"
-                                    
-                                    # Guardar cambios
-                                    df.to_csv("857-vc-funds-with-email-template.csv", index=False)
+                        try:
+                            from generate_hooks import clean_hook, stream_hook
+                            
+                            # Crear contexto del email (solo la frase donde va el hook)
+                            email_context = email_context_for(selected_hook_row)
+                            
+                            # Generar nuevo hook mostrando el texto a medida que llega
+                            new_hook = clean_hook(st.write_stream(stream_hook(selected_hook_row.to_dict(), email_context)))
+                            
+                            if new_hook:
+                                # Guardar solo esta fila
+                                original_idx = review_df.index[hook_idx]
+                                if save_rows({original_idx: {"Person_Hook": new_hook, "Hook_Confidence": "8"}}):
                                     st.success(f"✅ Hook regenerado: {new_hook}")
-                                    st.cache_data.clear()
                                     st.rerun()
-                                else:
-                                    st.error("❌ Error regenerando hook")
-                            except Exception as e:
-                                st.error(f"❌ Error: {e}")
+                            else:
+                                st.error("❌ Error regenerando hook")
+                        except Exception as e:
+                            st.error(f"❌ Error: {e}")
                 
                 with col2:
                     if st.button("🌐 Regenerar con búsqueda web", key=f"regenerate_web_{hook_idx}"):
-                        with st.spinner("Regenerando hook con búsqueda web..."):
-                            try:
-                                # Importar función de generación con web
-                                import sys
-                                sys.path.append('.')
-                                from generate_hooks_with_web_search import generate_hook_with_web_context
-                                
-                                # Crear contexto del email
-                                email_context = f"""
-Subject: {selected_hook_row.get('Email_Subject', '')}
-Body: {selected_hook_row.get('Email_Body', '')}
-"""
-                                
-                                # Generar nuevo hook con búsqueda web
-                                new_hook, source_url, confidence = generate_hook_with_web_context(selected_hook_row.to_dict(), email_context)
-                                
-                                if new_hook:
-                                    # Actualizar en el DataFrame
-                                    original_idx = review_df.index[hook_idx]
-                                    df.at[original_idx, "Person_Hook"] = new_hook
-                                    df.at[original_idx, "Hook_Source_URL"] = source_url
-                                    df.at[original_idx, "Hook_Confidence"] = confidence
-                                    
-                                    # Guardar cambios
-                                    df.to_csv("857-vc-funds-with-email-template.csv", index=False)
+                        try:
+                            from generate_hooks import clean_hook
+                            from generate_hooks_with_web_search import stream_hook_with_web_context
+                            
+                            # Crear contexto del email (solo la frase donde va el hook)
+                            email_context = email_context_for(selected_hook_row)
+                            
+                            # Búsqueda web y luego el hook en streaming
+                            with st.spinner("Buscando información en la web..."):
+                                chunks, source_url, confidence = stream_hook_with_web_context(selected_hook_row.to_dict(), email_context)
+                            new_hook = clean_hook(st.write_stream(chunks))
+                            
+                            if new_hook:
+                                # Guardar solo esta fila
+                                original_idx = review_df.index[hook_idx]
+                                updates = {original_idx: {
+                                    "Person_Hook": new_hook,
+                                    "Hook_Source_URL": source_url,
+                                    "Hook_Confidence": confidence,
+                                }}
+                                if save_rows(updates):
                                     st.success(f"✅ Hook regenerado: {new_hook}")
                                     if source_url:
                                         st.info(f"📰 Fuente: {source_url}")
-                                    st.cache_data.clear()
                                     st.rerun()
-                                else:
-                                    st.error("❌ Error regenerando hook")
-                            except Exception as e:
-                                st.error(f"❌ Error: {e}")
+                            else:
+                                st.error("❌ Error regenerando hook")
+                        except Exception as e:
+                            st.error(f"❌ Error: {e}")
     else:
         st.info("No hay contactos que coincidan con los filtros seleccionados")
 
 # Tab 4: Vista Previa Aleatoria
-with tab4:
+with tab4, profiler.block("tab4 · Vista Previa Aleatoria"):
     st.header("🎲 Vista Previa Aleatoria")
     st.markdown("Explora contactos aleatorios y ve cómo se ven los emails completos.")
     
@@ -886,36 +928,25 @@ with tab4:
         
         with col2:
             if st.button("🔄 Regenerar hook", key=f"regenerate_random_{random_idx}"):
-                with st.spinner("Regenerando hook..."):
-                    try:
-                        # Importar función de generación
-                        import sys
-                        sys.path.append('.')
-                        from generate_hooks import generate_hook
-                        
-                        # Crear contexto del email
-                        email_context = f"""
-Subject: {selected_contact.get('Email_Subject', '')}
-Body: {selected_contact.get('Email_Body', '')}
-"""
-                        
-                        # Generar nuevo hook
-                        new_hook = generate_hook(selected_contact.to_dict(), email_context)
-                        
-                        if new_hook:
-                            # Actualizar en el DataFrame
-                            df.at[random_idx, "Person_Hook"] = new_hook
-                            df.at[random_idx, "Hook_Confidence"] = "8"
-                            
-                            # Guardar cambios
-                            df.to_csv("857-vc-funds-with-email-template.csv", index=False)
+                try:
+                    from generate_hooks import clean_hook, stream_hook
+                    
+                    # Crear contexto del email (solo la frase donde va el hook)
+                    email_context = email_context_for(selected_contact)
+                    
+                    # Generar nuevo hook mostrando el texto a medida que llega
+                    new_hook = clean_hook(st.write_stream(stream_hook(selected_contact.to_dict(), email_context)))
+                    
+                    if new_hook:
+                        # Guardar solo esta fila y releerla para que la vista previa de abajo la use
+                        if save_rows({random_idx: {"Person_Hook": new_hook, "Hook_Confidence": "8"}}):
                             st.success(f"✅ Hook regenerado: {new_hook}")
-                            st.cache_data.clear()
-                            st.rerun()
-                        else:
-                            st.error("❌ Error regenerando hook")
-                    except Exception as e:
-                        st.error(f"❌ Error: {e}")
+                            selected_contact = load_data().loc[random_idx]
+                            current_hook = selected_contact.get("Person_Hook", new_hook)
+                    else:
+                        st.error("❌ Error regenerando hook")
+                except Exception as e:
+                    st.error(f"❌ Error: {e}")
         
         st.divider()
         
@@ -924,11 +955,11 @@ Body: {selected_contact.get('Email_Body', '')}
         
         # Asunto
         st.markdown("**Asunto:**")
-        st.code(selected_contact.get('Email_Subject', 'N/A'))
+        st.code(dataset_schema.email_subject(selected_contact) or 'N/A')
         
         # Cuerpo del email
         st.markdown("**Cuerpo del email:**")
-        email_body = selected_contact.get('Email_Body', 'N/A')
+        email_body = dataset_schema.email_body(selected_contact) or 'N/A'
         
         # Resaltar el hook en el email
         if current_hook and current_hook != 'Sin hook':
@@ -1005,7 +1036,7 @@ Body: {selected_contact.get('Email_Body', '')}
                     new_hook = selected_contact.get('Person_Hook')
                     
                     # Intentar diferentes variaciones del hook genérico
-                    email_body = df.at[random_idx, "Email_Body"]
+                    email_body = dataset_schema.email_body(df.loc[random_idx])
                     updated_body = email_body
                     
                     # Reemplazar diferentes variaciones
@@ -1019,11 +1050,9 @@ Body: {selected_contact.get('Email_Body', '')}
                         pattern = r"your leadership at [^,]*caught my attention"
                         updated_body = re.sub(pattern, new_hook, email_body)
                     
-                    df.at[random_idx, "Email_Body"] = updated_body
-                    df.to_csv("857-vc-funds-with-email-template.csv", index=False)
-                    st.success("✅ Email regenerado con hook actual")
-                    st.cache_data.clear()
-                    st.rerun()
+                    if save_rows({random_idx: {"Email_Body": updated_body}}):
+                        st.success("✅ Email regenerado con hook actual")
+                        st.rerun()
                 else:
                     st.warning("⚠️ No hay hook personalizado para regenerar")
         
@@ -1045,3 +1074,51 @@ Body: {selected_contact.get('Email_Body', '')}
     else:
         st.warning("⚠️ No hay contactos que coincidan con los filtros seleccionados")
         st.info("💡 Cambia los filtros para ver más contactos")
+
+with tab5, profiler.block("tab5 · Métricas"):
+    st.header("📈 Métricas de APIs")
+    st.markdown("Latencias, tokens, coste estimado, errores y aciertos de caché por tipo de llamada.")
+
+    # Esta sesión = llamadas hechas desde la app; las trazas vienen de los scripts
+    traces = api_metrics.list_traces()
+    source = st.selectbox(
+        "Fuente",
+        ["Esta sesión"] + traces,
+        format_func=lambda s: s if s == "Esta sesión" else f"🧾 {os.path.basename(s)}"
+    )
+    if source == "Esta sesión":
+        metric_rows = api_metrics.registry.summary()
+    else:
+        metric_rows = api_metrics.summarize_events(api_metrics.load_trace(source))
+
+    if not metric_rows:
+        st.info("💡 Aún no hay llamadas registradas. Ejecuta un script de generación o una revisión para crear una traza.")
+    else:
+        metrics_df = pd.DataFrame([
+            {**{k: v for k, v in r.items() if k not in ("statuses", "histogram")},
+             "statuses": ", ".join(f"{code}: {n}" for code, n in sorted(r["statuses"].items()))}
+            for r in metric_rows
+        ])
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Llamadas", int(metrics_df["calls"].sum()))
+        with col2:
+            st.metric("Errores", int(metrics_df["errors"].sum()))
+        with col3:
+            st.metric("Cache hits", int(metrics_df["cache_hits"].sum()))
+        with col4:
+            st.metric("Coste estimado", f"${metrics_df['cost_usd'].sum():.4f}")
+
+        st.dataframe(metrics_df, use_container_width=True, hide_index=True)
+
+        selected_call = st.selectbox("Histograma de latencias", [r["name"] for r in metric_rows if r["calls"]])
+        if selected_call:
+            histogram = next(r["histogram"] for r in metric_rows if r["name"] == selected_call)
+            st.bar_chart(pd.Series(histogram, name="llamadas"))
+
+    if source == "Esta sesión" and st.button("🗑️ Reiniciar métricas de la sesión"):
+        api_metrics.registry.reset()
+        st.rerun()
+
+# Panel del perfilador (al final: mide todo el rerun)
+profiler.render()
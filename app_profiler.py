@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Perfilado opcional de cada rerun de app.py (Streamlit re-ejecuta el script
+completo en cada clic).
+
+- APP_PROFILE=1 o el toggle "⏱️ Perfilar reruns" del sidebar lo activan.
+- `with profiler.block("tab1"):` mide un bloque (tiempo + delta de memoria
+  con tracemalloc); profiler.checkpoint("tab1/filtros") parte el bloque
+  actual en tramos sin tener que re-indentar el código.
+- profiler.render() dibuja al final del script el desglose del rerun y el
+  historial de los últimos reruns.
+- Con APP_PROFILE_CPROFILE=1 o el checkbox correspondiente se guarda además
+  el cProfile del rerun en PROFILES_DIR (ábrelo con snakeviz o pstats).
+
+Desactivado, block() devuelve un nullcontext y checkpoint() no hace nada.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+import streamlit as st
+
+PROFILE_ENV = "APP_PROFILE"
+CPROFILE_ENV = "APP_PROFILE_CPROFILE"
+PROFILES_DIR = "app_profiles"
+HISTORY_SIZE = 20
+TOP_FUNCTIONS = 25
+# Frames que guarda tracemalloc por asignación (1 = el más barato)
+TRACEMALLOC_FRAMES = 1
+
+TOGGLE_KEY = "app_profile_enabled"
+CPROFILE_KEY = "app_profile_cprofile"
+HISTORY_KEY = "app_profile_history"
+ACTIVE_KEY = "app_profile_active"
+
+# tracemalloc es global al proceso: se detiene cuando termina el último rerun perfilado
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started_here = False
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class RerunProfiler:
+    """Tiempos y memoria por bloque de un rerun."""
+
+    def __init__(self, enabled: bool = False, cprofile: bool = False):
+        self.enabled = enabled
+        self.records: List[Dict] = []
+        self.total_seconds = 0.0
+        self.peak_bytes = 0
+        self.profile_path: Optional[str] = None
+        self.top_functions = ""
+        self._stack: List[Dict] = []
+        self._started = None
+        self._cprofile = cProfile.Profile() if enabled and cprofile else None
+
+    def start(self):
+        global _tracing_users, _tracing_started_here
+        if not self.enabled:
+            return
+        with _tracing_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                _tracing_started_here = True
+            _tracing_users += 1
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        if self._cprofile is not None:
+            try:
+                self._cprofile.enable()
+            except ValueError:  # Python 3.12+: otro perfilador ya activo (otra sesión)
+                self._cprofile = None
+
+    def _stop(self):
+        global _tracing_users, _tracing_started_here
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self._started = None
+        with _tracing_lock:
+            _tracing_users = max(_tracing_users - 1, 0)
+            if _tracing_users == 0 and _tracing_started_here:
+                tracemalloc.stop()
+                _tracing_started_here = False
+
+    def abort(self):
+        """Detiene un rerun que no llegó a render() (st.rerun() / st.stop() a mitad del script)."""
+        if self._started is not None:
+            self._stop()
+
+    def _frame(self, name: str, depth: int) -> Dict:
+        return {"name": name, "depth": depth, "started": time.perf_counter(),
+                "memory": tracemalloc.get_traced_memory()[0], "segment": None}
+
+    def _record(self, frame: Dict):
+        self.records.append({
+            "bloque": "  " * frame["depth"] + frame["name"],
+            "ms": (time.perf_counter() - frame["started"]) * 1000,
+            "memoria_kb": (tracemalloc.get_traced_memory()[0] - frame["memory"]) / 1024,
+            "_order": frame["started"],
+        })
+
+    def _end_segment(self, frame: Dict):
+        if frame["segment"] is not None:
+            self._record(frame["segment"])
+            frame["segment"] = None
+
+    @contextmanager
+    def _block(self, name: str):
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            # Un bloque anidado cierra el tramo abierto del padre
+            self._end_segment(parent)
+        frame = self._frame(name, len(self._stack))
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._end_segment(frame)
+            self._stack.pop()
+            self._record(frame)
+
+    def block(self, name: str):
+        """Mide el bloque `with` como `name` (anidable)."""
+        return self._block(name) if self.enabled and self._started is not None else nullcontext()
+
+    def checkpoint(self, name: str):
+        """Cierra el tramo anterior del bloque actual y abre el tramo `name`."""
+        if not self.enabled or not self._stack:
+            return
+        parent = self._stack[-1]
+        self._end_segment(parent)
+        parent["segment"] = self._frame(name, parent["depth"] + 1)
+
+    def finish(self):
+        if not self.enabled or self._started is None:
+            return
+        self.total_seconds = time.perf_counter() - self._started
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        self._stop()
+        if self._cprofile is not None:
+            self._dump_cprofile()
+
+    def _dump_cprofile(self):
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        self.profile_path = os.path.join(PROFILES_DIR, f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+        self._cprofile.dump_stats(self.profile_path)
+        out = io.StringIO()
+        pstats.Stats(self._cprofile, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        self.top_functions = out.getvalue()
+
+    def breakdown(self) -> pd.DataFrame:
+        """Bloques en orden de ejecución, con su % del rerun."""
+        if not self.records:
+            return pd.DataFrame(columns=["bloque", "ms", "% rerun", "memoria_kb"])
+        table = pd.DataFrame(self.records).sort_values("_order").drop(columns="_order")
+        total_ms = self.total_seconds * 1000 or 1
+        table["% rerun"] = table["ms"] / total_ms * 100
+        return table[["bloque", "ms", "% rerun", "memoria_kb"]].round(1)
+
+    def render(self):
+        """Toggle (siempre) y, si está activo, el panel del rerun en el sidebar."""
+        self.finish()
+        st.sidebar.divider()
+        st.sidebar.toggle("⏱️ Perfilar reruns", value=_env_flag(PROFILE_ENV), key=TOGGLE_KEY)
+        if not self.enabled:
+            return
+        st.sidebar.checkbox("Guardar cProfile de cada rerun", value=_env_flag(CPROFILE_ENV), key=CPROFILE_KEY)
+
+        history = st.session_state.setdefault(HISTORY_KEY, [])
+        history.append({"rerun": datetime.now().strftime("%H:%M:%S"), "ms": round(self.total_seconds * 1000, 1),
+                        "pico_mb": round(self.peak_bytes / 1024 / 1024, 2)})
+        del history[:-HISTORY_SIZE]
+
+        with st.sidebar.expander("⏱️ Perfil del rerun", expanded=True):
+            st.metric("Tiempo del rerun", f"{self.total_seconds * 1000:,.0f} ms")
+            st.caption(f"Pico de memoria (tracemalloc): {self.peak_bytes / 1024 / 1024:,.2f} MB")
+            st.dataframe(self.breakdown(), hide_index=True, use_container_width=True)
+            if len(history) > 1:
+                st.caption(f"Últimos {len(history)} reruns (ms)")
+                st.line_chart(pd.DataFrame(history).set_index("rerun")["ms"])
+            if self.profile_path:
+                st.caption(f"🧾 cProfile: {self.profile_path}")
+                st.code(self.top_functions, language=None)
+
+
+def start_profiler() -> RerunProfiler:
+    """
+    Crea y arranca el perfilador del rerun. El estado del toggle se lee de
+    session_state al principio: el widget se dibuja al final (en render) y
+    Streamlit ya guardó su valor antes de re-ejecutar el script.
+    """
+    previous = st.session_state.get(ACTIVE_KEY)
+    if previous is not None:
+        previous.abort()
+    enabled = st.session_state.get(TOGGLE_KEY, _env_flag(PROFILE_ENV))
+    cprofile = st.session_state.get(CPROFILE_KEY, _env_flag(CPROFILE_ENV))
+    profiler = RerunProfiler(enabled, cprofile)
+    profiler.start()
+    st.session_state[ACTIVE_KEY] = profiler
+    return profiler
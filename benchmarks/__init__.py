@@ -0,0 +1,6 @@
+"""
+Benchmarks del pipeline sobre datasets sintéticos con el esquema del CSV real.
+
+    python -m benchmarks.run --sizes 1k,10k
+    python -m benchmarks.run --sizes 1k,10k --save-baseline
+"""
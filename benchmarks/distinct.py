@@ -0,0 +1,77 @@
+"""
+Speedup de distinct_apply frente al .apply en serie para las funciones por
+fila del pipeline, sobre un dataset sintético:
+
+    python -m benchmarks.distinct --rows 100k
+
+Para cada función mide la versión en serie y la deduplicada, y comprueba que
+las dos dan el mismo resultado.
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from add_country_from_hq import resolve_country
+from honorifics import build_salutation, honorific_from_title, split_name
+from add_short_name import extract_short_name
+from benchmarks.synthetic import generate_dataset, parse_size
+from distinct_apply import map_distinct
+
+SALUTATION_COLUMNS = ["Honorific", "First Name", "Last Name", "Primary Contact"]
+
+# nombre -> (función, columnas de entrada)
+FUNCTIONS: Dict[str, tuple] = {
+    "resolve_country": (resolve_country, ["HQ Location"]),
+    "extract_short_name": (extract_short_name, ["Investors"]),
+    "split_name": (split_name, ["Primary Contact"]),
+    "honorific_from_title": (honorific_from_title, ["Primary Contact Title"]),
+    "build_salutation": (build_salutation, SALUTATION_COLUMNS),
+}
+
+
+def _timed(fn: Callable) -> tuple:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def compare_function(df: pd.DataFrame, func: Callable, columns: List[str]) -> Dict:
+    star = len(columns) > 1
+    values = list(zip(*(df[col].tolist() for col in columns))) if star else df[columns[0]].tolist()
+
+    serial_s, serial = _timed(lambda: [func(*v) for v in values] if star else [func(v) for v in values])
+    distinct_s, deduped = _timed(lambda: map_distinct(func, values, star=star))
+    return {
+        "serial_s": round(serial_s, 3), "distinct_s": round(distinct_s, 3),
+        "speedup": round(serial_s / distinct_s, 2) if distinct_s else None,
+        "identical": serial == deduped,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Speedup de distinct_apply sobre datos sintéticos")
+    parser.add_argument("--rows", default="100k", help="Filas del dataset (1k, 100k, 1m)")
+    parser.add_argument("--functions", default=",".join(FUNCTIONS), help="Funciones separadas por coma")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rows = parse_size(args.rows)
+    df = generate_dataset(rows, args.seed)
+    print(f"📊 {rows:,} filas")
+    print(f"   {'función':<22}{'serie':>9}{'dedupe':>9}{'speedup':>10}")
+    ok = True
+    for name in [f.strip() for f in args.functions.split(",") if f.strip()]:
+        func, columns = FUNCTIONS[name]
+        r = compare_function(df, func, columns)
+        ok &= r["identical"]
+        print(f"   {name:<22}{r['serial_s']:>8.2f}s{r['distinct_s']:>8.2f}s{r['speedup']:>9.2f}x"
+              f"  {'✅' if r['identical'] else '❌ difiere'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Paridad y speedup de las versiones vectorizadas de split_name,
+honorific_from_title y build_salutation (honorifics.py) frente al
+.apply / df.apply(axis=1) fila a fila:
+
+    python -m benchmarks.honorifics --rows 100k
+
+Al dataset sintético se le añaden EDGE_CASES (varios títulos en la misma
+celda, comas, espacios repetidos, saltos de línea, celdas vacías). Sale con
+código 1 si algún resultado difiere.
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import honorifics
+from benchmarks.synthetic import generate_dataset, parse_size
+
+# (Primary Contact, Primary Contact Title)
+EDGE_CASES = [
+    ("  Ali   bin \t Hamad  ", "Mr. Dr. Founding Partner"),
+    ("Smith, John", "Doctoral Fellow"),
+    ("Omar Al-Saud, PhD, CFA", "Sheikh, Mr. Chairman"),
+    ("Cher", "Miss Universe Partner"),
+    ("", "madam chair"),
+    ("   ", "H.E. Board Member"),
+    (np.nan, "his excellency, ms"),
+    ("Line\nBreak Name", "MRS\nPartner"),
+    ("Nour, \nEl Khoury", "h.e.x"),
+    ("Zoë Núñez", "Mr"),
+    ("Rania Haddad", "Dr"),
+    ("Hamad", ""),
+]
+
+
+def _timed(fn: Callable) -> tuple:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def _dataset(rows: int, seed: int) -> pd.DataFrame:
+    df = generate_dataset(rows, seed)[["Primary Contact", "Primary Contact Title"]]
+    edge = pd.DataFrame(EDGE_CASES, columns=df.columns)
+    return pd.concat([df, edge], ignore_index=True).astype(object)
+
+
+def compare(df: pd.DataFrame) -> Dict[str, tuple]:
+    """(segundos con apply, segundos vectorizado, resultados idénticos) por función."""
+    names, titles = df["Primary Contact"], df["Primary Contact Title"]
+    results = {}
+
+    apply_s, split = _timed(lambda: names.apply(honorifics.split_name).tolist())
+    vector_s, (first, last) = _timed(lambda: honorifics.split_names(names))
+    results["split_name"] = (apply_s, vector_s, split == list(zip(first, last)))
+
+    apply_s, honorific = _timed(lambda: titles.apply(honorifics.honorific_from_title).tolist())
+    vector_s, by_title = _timed(lambda: honorifics.honorifics_from_titles(titles))
+    results["honorific_from_title"] = (apply_s, vector_s, honorific == by_title.tolist())
+
+    rows = pd.DataFrame({"Honorific": by_title, "First Name": first, "Last Name": last, "Primary Contact": names})
+    apply_s, salutation = _timed(lambda: rows.apply(
+        lambda r: honorifics.build_salutation(r["Honorific"], r["First Name"], r["Last Name"], r["Primary Contact"]),
+        axis=1).tolist())
+    vector_s, salutations = _timed(lambda: honorifics.build_salutations(
+        rows["Honorific"], rows["First Name"], rows["Last Name"], rows["Primary Contact"]))
+    results["build_salutation"] = (apply_s, vector_s, salutation == salutations.tolist())
+    return results
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Paridad y speedup de honoríficos vectorizados")
+    parser.add_argument("--rows", default="100k", help="Filas del dataset (1k, 100k, 1m)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    df = _dataset(parse_size(args.rows), args.seed)
+    print(f"📊 {len(df):,} filas ({len(EDGE_CASES)} casos límite)")
+    print(f"   {'función':<22}{'apply':>9}{'vector':>9}{'speedup':>10}")
+    ok = True
+    for func, (scalar_s, vector_s, identical) in compare(df).items():
+        ok &= identical
+        print(f"   {func:<22}{scalar_s:>8.2f}s{vector_s:>8.2f}s{scalar_s / max(vector_s, 1e-9):>9.1f}x"
+              f"  {'✅' if identical else '❌ difiere'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Ejecuta las etapas de benchmarks.stages sobre datasets sintéticos y guarda
+los tiempos en JSON. Con --baseline compara contra una ejecución guardada y
+marca como regresión toda etapa más lenta que baseline × (1 + tolerancia).
+
+    python -m benchmarks.run --sizes 1k,10k,100k
+    python -m benchmarks.run --sizes 1k,10k --save-baseline
+    python -m benchmarks.run --sizes 1m --stages csv_save,csv_load,app_filters
+
+Sale con código 1 si hay regresiones (útil en CI).
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from benchmarks.stages import SINGLE_RUN_STAGES, STAGES
+from benchmarks.synthetic import generate_dataset, parse_size
+from csv_storage import atomic_open
+from mock_api_server import start_server
+
+DEFAULT_SIZES = "1k,10k"
+RESULTS_FILE = "bench_results.json"
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+TOLERANCE = 0.25
+# Diferencias menores que esto (segundos) son ruido aunque superen la tolerancia
+MIN_DELTA_SECONDS = 0.02
+
+
+def time_stage(name: str, df: pd.DataFrame, ctx: Dict, repeat: int) -> Dict:
+    """Mejor tiempo de `repeat` ejecuciones (el mínimo es el menos afectado por ruido)."""
+    runs = 1 if name in SINGLE_RUN_STAGES else repeat
+    best, rows = None, 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = STAGES[name](df, ctx)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": round(best, 4), "rows": rows, "rows_per_second": round(rows / best) if best else None}
+
+
+def run_benchmarks(sizes: List[int], stages: List[str], repeat: int = 3, hook_sample: int = 200,
+                   mock_latency="0.05", seed: int = 42) -> Dict:
+    server = start_server(latency=mock_latency)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp_dir:
+            ctx = {"csv_path": os.path.join(tmp_dir, "contacts.csv"),
+                   "delta_path": os.path.join(tmp_dir, "contacts-delta.csv"),
+                   "mock_url": server.base_url, "hook_sample": hook_sample}
+            for size in sizes:
+                started = time.perf_counter()
+                df = generate_dataset(size, seed)
+                print(f"\n📊 {size:,} filas (generadas en {time.perf_counter() - started:.2f}s)")
+                results[str(size)] = {}
+                for name in stages:
+                    result = time_stage(name, df, ctx, repeat)
+                    results[str(size)][name] = result
+                    print(f"   {name:<22} {result['seconds']:>9.4f}s  {result['rows_per_second'] or 0:>12,} filas/s")
+    finally:
+        server.shutdown()
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "hook_sample": hook_sample,
+            "mock_latency": mock_latency,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = TOLERANCE) -> List[Dict]:
+    """Etapas (por tamaño) más lentas que la baseline por encima de la tolerancia."""
+    regressions = []
+    for size, stages in current["results"].items():
+        for name, result in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base:
+                continue
+            delta = result["seconds"] - base["seconds"]
+            if result["seconds"] > base["seconds"] * (1 + tolerance) and delta > MIN_DELTA_SECONDS:
+                regressions.append({"size": size, "stage": name, "baseline": base["seconds"],
+                                    "current": result["seconds"],
+                                    "change": round(delta / base["seconds"], 3) if base["seconds"] else None})
+    return regressions
+
+
+def load_json(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data: Dict, path: str):
+    with atomic_open(path, suffix=".tmp") as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline sobre datasets sintéticos")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Tamaños separados por coma (1k, 10k, 100k, 1m)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Etapas a medir, separadas por coma")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por etapa (se guarda la mejor)")
+    parser.add_argument("--hook-sample", type=int, default=200, help="Contactos para hook_generation")
+    parser.add_argument("--mock-latency", default="0.05",
+                        help="Latencia del LLM mock: segundos o distribución (\"lognormal:0.05,0.5\")")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=RESULTS_FILE, help="JSON de resultados")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="JSON de referencia")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Margen antes de marcar regresión")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar esta ejecución como baseline")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"Etapas desconocidas: {', '.join(unknown)} (disponibles: {', '.join(STAGES)})")
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    current = run_benchmarks(sizes, stages, args.repeat, args.hook_sample, args.mock_latency, args.seed)
+    save_json(current, args.out)
+    print(f"\n💾 Resultados: {args.out}")
+
+    if args.save_baseline:
+        save_json(current, args.baseline)
+        print(f"📌 Baseline actualizada: {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline)
+    if baseline is None:
+        print(f"ℹ️ Sin baseline en {args.baseline} (créala con --save-baseline)")
+        return 0
+    regressions = compare(current, baseline, args.tolerance)
+    if not regressions:
+        print(f"✅ Sin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%})")
+        return 0
+    print(f"⚠️ {len(regressions)} regresiones frente a {args.baseline}:")
+    for r in regressions:
+        print(f"   - {r['stage']} @ {int(r['size']):,} filas: {r['baseline']:.4f}s → {r['current']:.4f}s "
+              f"(+{r['change']:.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
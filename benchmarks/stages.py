@@ -0,0 +1,172 @@
+"""
+Etapas del pipeline que mide benchmarks.run. Cada etapa recibe el DataFrame
+y el contexto de la ejecución, hace el mismo trabajo que el script original
+(sin escribir en los archivos reales) y devuelve las filas procesadas.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+import pandas as pd
+
+import generate_hooks
+from add_country_from_hq import resolve_country
+from honorifics import build_salutations, honorifics_from_titles, split_names
+from add_short_name import extract_short_name
+from csv_storage import read_csv_versioned, write_csv_atomic
+from regenerate_emails_with_short_name import build_email_body, build_email_subject
+from template_store import STORAGE_ENV
+
+MOCK_RPM = 100_000  # Sin límite práctico: se mide el pipeline, no la cuota
+
+
+def stage_csv_save(df: pd.DataFrame, ctx: Dict) -> int:
+    write_csv_atomic(df, ctx["csv_path"])
+    return len(df)
+
+
+def stage_csv_load(df: pd.DataFrame, ctx: Dict) -> int:
+    loaded, _ = read_csv_versioned(ctx["csv_path"])
+    return len(loaded)
+
+
+def stage_delta_save(df: pd.DataFrame, ctx: Dict) -> int:
+    """El mismo guardado en formato template-delta (solo tokens + versión de plantilla)."""
+    saved = os.environ.get(STORAGE_ENV)
+    os.environ[STORAGE_ENV] = "delta"
+    try:
+        write_csv_atomic(df, ctx["delta_path"])
+    finally:
+        if saved is None:
+            os.environ.pop(STORAGE_ENV, None)
+        else:
+            os.environ[STORAGE_ENV] = saved
+    return len(df)
+
+
+def stage_delta_load(df: pd.DataFrame, ctx: Dict) -> int:
+    """Carga del CSV delta sin renderizar los emails (como load_compact en app.py)."""
+    loaded, _ = read_csv_versioned(ctx["delta_path"], compact=True)
+    return len(loaded)
+
+
+def stage_resolve_country(df: pd.DataFrame, ctx: Dict) -> int:
+    df["HQ Location"].apply(resolve_country)
+    return len(df)
+
+
+def stage_extract_short_name(df: pd.DataFrame, ctx: Dict) -> int:
+    df["Investors"].apply(extract_short_name)
+    return len(df)
+
+
+def stage_split_name(df: pd.DataFrame, ctx: Dict) -> int:
+    first, last = split_names(df["Primary Contact"])
+    return len(first)
+
+
+def stage_honorific_from_title(df: pd.DataFrame, ctx: Dict) -> int:
+    honorifics_from_titles(df["Primary Contact Title"])
+    return len(df)
+
+
+def stage_build_salutation(df: pd.DataFrame, ctx: Dict) -> int:
+    build_salutations(df["Honorific"], df["First Name"], df["Last Name"], df["Primary Contact"])
+    return len(df)
+
+
+def stage_render_templates(df: pd.DataFrame, ctx: Dict) -> int:
+    """Mismo bucle que regenerate_emails_with_short_name.main()."""
+    rendered = 0
+    for _, row in df.iterrows():
+        subject = build_email_subject(row)
+        body = build_email_body(row)
+        f"Subject: {subject}\n\n{body}"
+        rendered += 1
+    return rendered
+
+
+def stage_app_filters(df: pd.DataFrame, ctx: Dict) -> int:
+    """Los filtros de app.py: país / honorífico (sidebar), búsqueda (Tab 3) y estado del hook (Tab 4)."""
+    country = df["country"].iloc[0]
+    filtered = df.copy()
+    filtered = filtered[filtered["country"] == country]
+    filtered = filtered[filtered["Honorific"] == "Mr."]
+
+    search_term = "al"
+    df[
+        df['Primary Contact'].str.contains(search_term, case=False, na=False) |
+        df['Investors'].str.contains(search_term, case=False, na=False) |
+        df['country'].str.contains(search_term, case=False, na=False) |
+        df['HQ Location'].str.contains(search_term, case=False, na=False)
+    ]
+
+    random_df = df.copy()
+    random_df = random_df[random_df["country"] == country]
+    random_df[random_df["Person_Hook"].notna() & (random_df["Person_Hook"] != "")]
+    random_df[random_df["Person_Hook"].isna() | (random_df["Person_Hook"] == "")]
+    return len(df)
+
+
+@contextmanager
+def mock_llm(base_url: str):
+    """El router de generate_hooks apunta solo al servidor mock mientras dura el bloque."""
+    keys = ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "LLM_PROVIDERS")
+    saved = {key: os.environ.get(key) for key in keys}
+    os.environ.pop("OPENAI_API_KEY", None)
+    os.environ.pop("ANTHROPIC_API_KEY", None)
+    os.environ["LLM_PROVIDERS"] = json.dumps([{
+        "name": "mock", "kind": "openai", "base_url": f"{base_url}/v1", "api_key": "mock",
+        "model": "mock", "rpm": MOCK_RPM,
+    }])
+    generate_hooks._router = None
+    try:
+        yield generate_hooks.get_router()
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        generate_hooks._router = None
+
+
+def stage_hook_generation(df: pd.DataFrame, ctx: Dict) -> int:
+    """
+    Como generate_hooks.main(): paquetes de HOOKS_PER_CALL contactos sin hook
+    en paralelo contra el servidor mock (hasta ctx["hook_sample"] contactos).
+    """
+    pending = df[df["Person_Hook"].isna() | (df["Person_Hook"] == "")].head(ctx["hook_sample"])
+    pack_size = generate_hooks.HOOKS_PER_CALL
+    packs = [pending.iloc[start:start + pack_size] for start in range(0, len(pending), pack_size)]
+
+    def run_pack(pack):
+        email_contexts = [generate_hooks.build_email_context(row) for _, row in pack.iterrows()]
+        return generate_hooks.generate_hooks_packed([row.to_dict() for _, row in pack.iterrows()], email_contexts)
+
+    with mock_llm(ctx["mock_url"]) as router:
+        with ThreadPoolExecutor(max_workers=router.concurrency()) as pool:
+            generated = sum(sum(1 for hook in hooks if hook) for hooks, _ in pool.map(run_pack, packs))
+    return generated
+
+
+# Orden de ejecución: *_save antes que *_load (leen el archivo que escriben)
+STAGES: Dict[str, Callable[[pd.DataFrame, Dict], int]] = {
+    "csv_save": stage_csv_save,
+    "csv_load": stage_csv_load,
+    "delta_save": stage_delta_save,
+    "delta_load": stage_delta_load,
+    "resolve_country": stage_resolve_country,
+    "extract_short_name": stage_extract_short_name,
+    "split_name": stage_split_name,
+    "honorific_from_title": stage_honorific_from_title,
+    "build_salutation": stage_build_salutation,
+    "render_templates": stage_render_templates,
+    "app_filters": stage_app_filters,
+    "hook_generation": stage_hook_generation,
+}
+# Etapas con red (mock): se ejecutan una sola vez aunque se pida --repeat
+SINGLE_RUN_STAGES = {"hook_generation"}
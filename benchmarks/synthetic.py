@@ -0,0 +1,169 @@
+"""
+Datasets sintéticos con el mismo esquema (27 columnas, mismo orden) que
+857-vc-funds-with-email-template.csv: nombres con acentos, HQ de MENA en
+varios formatos y cuerpos de email multilínea renderizados con BODY_TEMPLATE.
+
+La generación es vectorizada (numpy + concatenación de Series), de modo que
+1M de filas se generan en segundos.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from regenerate_emails_with_short_name import BODY_TEMPLATE, LANDING_PAGE, SUBJECT_TEMPLATE
+
+COLUMNS = [
+    "Investors", "Preferred Investment Types", "Preferred Verticals", "Primary Contact Phone", "Description",
+    "Primary Contact Title", "Website", "Primary Contact Email", "Primary Contact", "Preferred Geography",
+    "Preferred Industry", "Last Investment Date", "Last Investment Company", "Primary Investor Type",
+    "HQ Location", "First Name", "Last Name", "Honorific", "country", "Salutation", "Email_Subject",
+    "Email_Body", "Email_Template", "Person_Hook", "Hook_Source_URL", "Hook_Confidence", "Short_Name",
+]
+
+FIRST_NAMES = [
+    "Doğukan", "Çağla", "Ömer", "Şükrü", "José", "Zoë", "Hélène", "Noémie", "Søren", "Aïcha", "Mohammed",
+    "Fatima", "Ahmed", "Layla", "Omar", "Sara", "Karim", "Yousef", "Nour", "Rania", "Khalid", "Hessa",
+    "Tariq", "Maha", "Ali", "Reem", "Faisal", "Dina", "Hamad", "Lina",
+]
+LAST_NAMES = [
+    "Çetin", "Öztürk", "Yılmaz", "Gökşen", "Al-Maktoum", "Al Saud", "El Khoury", "Haddad", "Núñez", "Ben Ali",
+    "Mansour", "Hassan", "Al-Thani", "Abu Dhabi", "Kaya", "Şahin", "Al Nahyan", "Fares", "Qasim", "Zoghbi",
+]
+TITLES = [
+    "Managing Partner", "Vice President", "Principal", "Investment Director", "Partner", "Founder & CEO",
+    "Dr. Managing Director", "Sheikh, Chairman", "H.E. Board Member", "Mr. Founding Partner",
+    "Ms. Associate", "Mrs. General Partner", "Head of Ventures", "Chief Investment Officer",
+]
+# HQ en los formatos que aparecen en el CSV -> país resuelto
+HQ_LOCATIONS = {
+    "Dubai, United Arab Emirates": "United Arab Emirates", "Abu Dhabi, UAE": "United Arab Emirates",
+    "DIFC, Dubai": "United Arab Emirates", "Sharjah, U.A.E.": "United Arab Emirates",
+    "Ras Al Khaimah, United Arab Emirates": "United Arab Emirates", "Riyadh, Saudi Arabia": "Saudi Arabia",
+    "Jeddah, KSA": "Saudi Arabia", "Al Khobar, Eastern Province, Saudi Arabia": "Saudi Arabia",
+    "Cairo, Egypt": "Egypt", "Giza, Egypt": "Egypt", "Istanbul, Turkey": "Turkey", "İstanbul, Türkiye": "Turkey",
+    "Ankara, Turkey": "Turkey", "Doha, Qatar": "Qatar", "Manama, Bahrain": "Bahrain",
+    "Kuwait City, Kuwait": "Kuwait", "Muscat, Oman": "Oman", "Amman, Jordan": "Jordan",
+    "Beirut, Lebanon": "Lebanon", "Tel Aviv, Israel": "Israel", "Casablanca, Morocco": "Morocco",
+    "Tunis, Tunisia": "Tunisia",
+}
+FUND_WORDS = [
+    "Falcon", "Oasis", "Nakheel", "Sahara", "Cedar", "Gulf", "Levant", "Atlas", "Najd", "Bosphorus",
+    "Pearl", "Zayed", "Golden", "Crescent", "Dune", "Marina", "Nile", "Anatolia", "Mosaic", "Horizon",
+    "Wadi", "Qanat", "Sadu", "Majlis", "Souk", "Dhow", "Palm", "Sidra", "Areej", "Noor",
+]
+FUND_SUFFIXES = [
+    "Ventures", "Capital", "Venture Partners", "Venture Capital", "Investment Management", "Partners",
+    "Holding", "Fund", "Growth Partners", "Ventures LLC",
+]
+INVESTMENT_TYPES = [
+    "Early Stage VC, Later Stage VC, Seed Round", "Early Stage VC, Seed Round", "Seed Round",
+    "Later Stage VC, PE Growth/Expansion", "Accelerator/Incubator, Seed Round",
+]
+VERTICALS = [
+    "AdTech, AgTech, B2B Payments, Big Data, CleanTech", "FinTech, InsurTech, SaaS", "HealthTech, EdTech",
+    "Mobility Tech, Supply Chain Tech, Internet of Things", "Cybersecurity, Artificial Intelligence & Machine Learning",
+]
+INDUSTRIES = ["Financial Services, Software", "Healthcare, Energy", "Consumer Products and Services (B2C)",
+              "Business Products and Services (B2B), Information Technology"]
+INVESTOR_TYPES = ["Venture Capital", "Corporate Venture Capital", "Angel Group", "Family Office"]
+GEOGRAPHIES = ["Middle East", "GCC", "MENA", "Turkey", "Saudi Arabia", "Egypt, Jordan"]
+COMPANIES = ["Circle Games", "Tabby", "Tamara", "Sary", "Breadfast", "Getir", "Careem", "Anghami", "Kitopi"]
+HOOKS = [
+    "your journey from investment banking to venture capital is impressive",
+    "your recent ventures in the fintech space caught my attention",
+    "I followed your path from Careem to your current fund",
+]
+
+_TOKEN_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+def _pick(rng: np.random.Generator, pool, n: int) -> pd.Series:
+    return pd.Series(np.asarray(pool, dtype=object)[rng.integers(0, len(pool), n)])
+
+
+def _with_missing(rng: np.random.Generator, values: pd.Series, rate: float) -> pd.Series:
+    """Deja vacías (NaN) ~rate de las celdas, como en el CSV real."""
+    return values.mask(rng.random(len(values)) < rate)
+
+
+def _render(template: str, tokens: dict) -> pd.Series:
+    """Reemplaza los {{token}} de la plantilla concatenando Series (vectorizado)."""
+    parts = _TOKEN_RE.split(template)
+    result = pd.Series(parts[0], index=next(iter(tokens.values())).index, dtype=object)
+    for i in range(1, len(parts), 2):
+        result = result + tokens[parts[i]].astype(object) + parts[i + 1]
+    return result
+
+
+def generate_dataset(rows: int, seed: int = 42, hook_rate: float = 0.6) -> pd.DataFrame:
+    """
+    Dataset sintético de `rows` contactos con las 27 columnas del CSV real.
+
+    Args:
+        rows: Número de filas
+        seed: Semilla (mismo seed = mismo dataset)
+        hook_rate: Proporción de filas que ya tienen Person_Hook
+    """
+    rng = np.random.default_rng(seed)
+    ids = pd.Series(np.arange(rows)).astype(str)
+
+    first = _pick(rng, FIRST_NAMES, rows)
+    last = _pick(rng, LAST_NAMES, rows)
+    full = first + " " + last
+    fund_base = _pick(rng, FUND_WORDS, rows) + " " + _pick(rng, FUND_WORDS, rows)
+    fund = fund_base + " " + _pick(rng, FUND_SUFFIXES, rows)
+    short = fund_base
+    slug = fund_base.str.lower().str.replace(" ", "", regex=False)
+    hq = _pick(rng, list(HQ_LOCATIONS), rows)
+    honorific = _with_missing(rng, _pick(rng, ["Mr.", "Ms.", "Dr."], rows), 0.11)
+    hook = _pick(rng, HOOKS, rows).mask(rng.random(rows) >= hook_rate)
+
+    hook_sentence = hook.fillna("your leadership at " + fund + " caught my attention")
+    body = _render(BODY_TEMPLATE, {
+        "honorific": honorific.fillna(""), "last_name": last, "fund_name": fund, "short_name": short,
+        "person_hook_sentence": hook_sentence, "landing_page": pd.Series(LANDING_PAGE, index=ids.index),
+    })
+    subject = _render(SUBJECT_TEMPLATE, {"fund_name": fund})
+
+    df = pd.DataFrame({
+        "Investors": fund,
+        "Preferred Investment Types": _with_missing(rng, _pick(rng, INVESTMENT_TYPES, rows), 0.03),
+        "Preferred Verticals": _with_missing(rng, _pick(rng, VERTICALS, rows), 0.18),
+        "Primary Contact Phone": _with_missing(
+            rng, "+971 (0)4 " + pd.Series(rng.integers(1000000, 9999999, rows)).astype(str), 0.36),
+        "Description": _with_missing(
+            rng, fund + " is a venture capital firm based in " + hq + ". The firm invests in "
+            + _pick(rng, VERTICALS, rows) + " startups across the region.", 0.01),
+        "Primary Contact Title": _pick(rng, TITLES, rows),
+        "Website": _with_missing(rng, "www." + slug + ".com", 0.03),
+        "Primary Contact Email": first.str.lower() + "." + ids + "@" + slug + ".com",
+        "Primary Contact": full,
+        "Preferred Geography": _with_missing(rng, _pick(rng, GEOGRAPHIES, rows), 0.43),
+        "Preferred Industry": _with_missing(rng, _pick(rng, INDUSTRIES, rows), 0.13),
+        "Last Investment Date": _with_missing(rng, _pick(rng, ["09-Jul-2025", "12-Mar-2024", "30-Nov-2023"], rows), 0.12),
+        "Last Investment Company": _with_missing(rng, _pick(rng, COMPANIES, rows), 0.11),
+        "Primary Investor Type": _pick(rng, INVESTOR_TYPES, rows),
+        "HQ Location": hq,
+        "First Name": first,
+        "Last Name": last,
+        "Honorific": honorific,
+        "country": hq.map(HQ_LOCATIONS),
+        "Salutation": "Dear " + honorific.fillna("").str.cat(last, sep=" ").str.strip() + ",",
+        "Email_Subject": subject,
+        "Email_Body": body,
+        "Email_Template": "Subject: " + subject + "\n\n" + body,
+        "Person_Hook": hook,
+        "Hook_Source_URL": np.nan,
+        "Hook_Confidence": np.where(hook.notna(), 8.0, np.nan),
+        "Short_Name": short,
+    })
+    return df[COLUMNS]
+
+
+def parse_size(text: str) -> int:
+    """'1k' -> 1000, '1m' -> 1000000, '2500' -> 2500."""
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Escrituras seguras para 857-vc-funds-with-email-template.csv.
+
+Todas las rutas que sobrescriben el CSV (app.py, generate_hooks*.py,
+add_short_name.py, regenerate_emails_with_short_name.py) pasan por aquí:
+- write-to-temp + fsync + os.replace (nunca queda un archivo truncado)
+- lock consultivo (archivo .lock) con timeout
+- versión del contenido (mtime + tamaño) para detectar lecturas obsoletas
+- formato template-delta opcional (ver template_store.py), transparente
+  para quien lee y escribe por aquí
+"""
+
+import os
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_FILE = "857-vc-funds-with-email-template.csv"
+
+# Segundos máximos esperando el lock antes de rendirse
+LOCK_TIMEOUT = 30
+LOCK_POLL_SECONDS = 0.05
+
+
+class LockTimeoutError(TimeoutError):
+    """No se pudo obtener el lock del archivo dentro del timeout."""
+
+
+class StaleDataError(RuntimeError):
+    """El archivo cambió en disco desde que se leyó (otra escritura intermedia)."""
+
+
+def _try_lock(fh) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str = DATA_FILE, timeout: float = LOCK_TIMEOUT):
+    """
+    Lock consultivo exclusivo sobre `path` (usa un archivo hermano `path.lock`).
+
+    Raises:
+        LockTimeoutError: si otro proceso mantiene el lock más de `timeout` segundos
+    """
+    lock_path = f"{path}.lock"
+    fh = open(lock_path, "a+")
+    deadline = time.monotonic() + timeout
+    try:
+        while not _try_lock(fh):
+            if time.monotonic() >= deadline:
+                raise LockTimeoutError(f"Timeout ({timeout}s) esperando el lock de {path}")
+            time.sleep(LOCK_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            _unlock(fh)
+    finally:
+        fh.close()
+
+
+def file_version(path: str = DATA_FILE) -> Optional[str]:
+    """Versión del contenido en disco (mtime en ns + tamaño), o None si no existe."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def _decode(df: pd.DataFrame, path: str, compact: bool) -> pd.DataFrame:
+    # Import diferido: template_store importa csv_storage (vía regenerate_emails_with_short_name)
+    from template_store import decode
+    return decode(df, path, compact)
+
+
+def read_csv_versioned(path: str = DATA_FILE, compact: bool = False,
+                       **read_kwargs) -> tuple[pd.DataFrame, Optional[str]]:
+    """
+    Lee el CSV y devuelve (df, versión). Si el archivo se reemplaza durante
+    la lectura, vuelve a leer para que versión y contenido coincidan.
+
+    Un CSV en modo template-delta se devuelve con los emails renderizados,
+    salvo con compact=True (celdas derivadas vacías, se renderizan al usarlas).
+    """
+    for _ in range(5):
+        before = file_version(path)
+        df = pd.read_csv(path, **read_kwargs)
+        if file_version(path) == before:
+            return _decode(df, path, compact), before
+    return _decode(df, path, compact), file_version(path)
+
+
+def _fsync_dir(directory: str):
+    # Persistir también la entrada del directorio (rename) cuando el SO lo permite
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp crea el temporal con 0600; un archivo nuevo debe quedar como con open()
+_NEW_FILE_MODE = 0o666 & ~_umask()
+
+
+def _target_mode(path: str) -> int:
+    """Permisos del archivo que se va a reemplazar (o los de un archivo nuevo)."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return _NEW_FILE_MODE
+
+
+@contextmanager
+def atomic_path(path: str, suffix: str = ".tmp"):
+    """
+    Entrega una ruta temporal en el mismo directorio que `path`; al salir sin
+    errores la renombra sobre `path` con os.replace. Si falla, la borra.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=suffix, dir=directory)
+    os.close(fd)
+    try:
+        yield tmp_path
+        # os.replace conserva los permisos del temporal: se copian los del destino
+        os.chmod(tmp_path, _target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+@contextmanager
+def atomic_open(path: str, suffix: str = ".tmp"):
+    """Como atomic_path, pero entrega el archivo abierto en texto y hace fsync antes del rename."""
+    with atomic_path(path, suffix) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _write_atomic(df: pd.DataFrame, path: str):
+    from template_store import to_disk
+    df = to_disk(df, path)
+    with atomic_open(path, suffix=".csv") as f:
+        df.to_csv(f, index=False)
+
+
+def write_csv_atomic(df: pd.DataFrame, path: str = DATA_FILE, expected_version: Optional[str] = None,
+                     timeout: float = LOCK_TIMEOUT) -> Optional[str]:
+    """
+    Sobrescribe el CSV completo de forma atómica y bajo lock.
+
+    Args:
+        df: DataFrame a guardar
+        path: Ruta del CSV
+        expected_version: Versión obtenida al leer; si el archivo cambió desde
+            entonces se lanza StaleDataError en lugar de pisar la otra escritura
+        timeout: Segundos máximos esperando el lock
+
+    Returns:
+        La nueva versión del archivo
+    """
+    with file_lock(path, timeout):
+        if expected_version is not None and file_version(path) != expected_version:
+            raise StaleDataError(f"{path} cambió en disco desde la última lectura")
+        _write_atomic(df, path)
+        return file_version(path)
+
+
+def set_cell(df: pd.DataFrame, idx, col: str, value):
+    """df.at[idx, col] = value, ampliando la columna a object si el dtype no admite el valor."""
+    if col not in df.columns:
+        df[col] = pd.Series([None] * len(df), index=df.index, dtype=object)
+    try:
+        df.at[idx, col] = value
+    except (TypeError, ValueError):
+        df[col] = df[col].astype(object)
+        df.at[idx, col] = value
+
+
+def _apply_updates_locked(updates: dict, path: str) -> str:
+    from template_store import set_value
+    df = _decode(pd.read_csv(path), path, compact=True)
+    for idx, values in updates.items():
+        if idx not in df.index:
+            continue
+        for col, value in values.items():
+            # En modo delta fija antes los emails que dependen de la celda
+            set_value(df, idx, col, value)
+    _write_atomic(df, path)
+    return file_version(path)
+
+
+def update_rows(updates: dict, path: str = DATA_FILE, timeout: float = LOCK_TIMEOUT) -> Optional[str]:
+    """
+    Read-modify-write bajo lock que solo toca las celdas indicadas, de modo que
+    una generación de hooks en segundo plano y una edición en la UI no se pisan.
+
+    Args:
+        updates: {índice_de_fila: {columna: valor}}
+        path: Ruta del CSV
+        timeout: Segundos máximos esperando el lock
+
+    Returns:
+        La nueva versión del archivo
+    """
+    if not updates:
+        return file_version(path)
+    with file_lock(path, timeout):
+        return _apply_updates_locked(updates, path)
+
+
+def update_rows_from(updates: dict, base_version: Optional[str], path: str = DATA_FILE,
+                     timeout: float = LOCK_TIMEOUT) -> Tuple[Optional[str], bool]:
+    """
+    Como update_rows, pero indica además si el archivo seguía en base_version
+    justo antes de escribir (comprobado bajo el mismo lock). Si es así, quien
+    tiene en memoria la copia de base_version puede aplicarle los mismos
+    cambios y quedarse con la nueva versión sin releer el CSV.
+
+    Returns:
+        (nueva versión, True si nadie más escribió desde base_version)
+    """
+    with file_lock(path, timeout):
+        in_sync = file_version(path) == base_version
+        if not updates:
+            return file_version(path), in_sync
+        return _apply_updates_locked(updates, path), in_sync
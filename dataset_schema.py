@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Representación compacta en memoria de 857-vc-funds-with-email-template.csv.
+
+- Columnas de baja cardinalidad (country, Honorific, Primary Investor Type,
+  Template_Version) como category; el resto del texto como string de Arrow;
+  Hook_Confidence como Int8 cuando todos sus valores son enteros.
+- Email_Subject, Email_Body y Email_Template no se guardan: se derivan de la
+  plantilla y los tokens de la fila (ver template_store.py). Solo se
+  conservan, como "override", las celdas que no coinciden con lo derivado
+  (ediciones a mano, cuerpos antiguos), así que la conversión no pierde nada.
+
+Uso:
+    df, version = load_compact()          # en lugar de read_csv_versioned
+    email_body(row) / email_subject(row)  # valor de una fila (override o derivado)
+    with_bodies(frame)                    # frame con los emails completos
+    set_value(df, idx, col, value)        # en lugar de set_cell
+
+    python dataset_schema.py              # informe de memoria antes / después
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import template_store
+from csv_storage import DATA_FILE, read_csv_versioned
+from template_store import COMPACT_ATTR, DERIVED_COLUMNS, VERSION_COLUMN
+
+CATEGORY_COLUMNS = ["country", "Honorific", "Primary Investor Type", VERSION_COLUMN]
+INTEGER_COLUMNS = {"Hook_Confidence": "Int8"}
+
+
+def _string_dtype():
+    """str respaldado por Arrow con NaN como faltante (el "str" de pandas 3)."""
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except (TypeError, ImportError):  # pandas < 2.3 o sin pyarrow
+        return object
+
+
+STRING_DTYPE = _string_dtype()
+
+
+def bodies(frame: pd.DataFrame) -> pd.Series:
+    """Email_Body de cada fila: el override si existe, si no el derivado."""
+    if not template_store.is_compact(frame):
+        return frame["Email_Body"]
+    return template_store.resolve(frame)["Email_Body"]
+
+
+def email_body(row) -> Optional[str]:
+    """Cuerpo de una fila (Series de df.loc / iterrows o dict)."""
+    return template_store.render_row(row)["Email_Body"]
+
+
+def email_subject(row) -> Optional[str]:
+    """Asunto de una fila (Series de df.loc / iterrows o dict)."""
+    return template_store.render_row(row)["Email_Subject"]
+
+
+def with_bodies(frame: pd.DataFrame) -> pd.DataFrame:
+    """Copia de `frame` con los emails materializados (para exportar o editar)."""
+    if not template_store.is_compact(frame):
+        return frame
+    full = template_store.expand(frame, keep_version=False)
+    for col in DERIVED_COLUMNS:
+        if col in full.columns:
+            full[col] = full[col].astype(STRING_DTYPE)
+    return full
+
+
+def _as_integer(values: pd.Series, dtype: str) -> Optional[pd.Series]:
+    """La columna como entero nullable, o None si algún valor no es entero."""
+    numeric = pd.to_numeric(values, errors="coerce")
+    if (numeric.isna() != values.isna()).any():
+        return None
+    valid = numeric.dropna()
+    if not np.array_equal(valid, np.round(valid)) or (len(valid) and valid.abs().max() > np.iinfo(dtype.lower()).max):
+        return None
+    return numeric.round().astype(dtype)
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Versión compacta (y sin pérdida) del DataFrame leído del CSV."""
+    out = template_store.encode(df)
+    for col in out.columns:
+        if col in CATEGORY_COLUMNS:
+            out[col] = out[col].astype("category")
+        elif col in INTEGER_COLUMNS:
+            converted = _as_integer(out[col], INTEGER_COLUMNS[col])
+            if converted is not None:
+                out[col] = converted
+        elif out[col].dtype == object or pd.api.types.is_string_dtype(out[col].dtype) or col in DERIVED_COLUMNS:
+            out[col] = out[col].astype(STRING_DTYPE)
+    return out
+
+
+def load_compact(path: str = DATA_FILE, **read_kwargs) -> Tuple[pd.DataFrame, Optional[str]]:
+    """read_csv_versioned() + compact(); un CSV en modo delta se lee sin renderizar nada."""
+    df, version = read_csv_versioned(path, compact=True, **read_kwargs)
+    return compact(df), version
+
+
+def set_value(df: pd.DataFrame, idx, col: str, value):
+    """
+    set_cell() que respeta el esquema compacto: amplía las categorías, convierte
+    a entero la confianza ("8" -> 8, "" -> NA) y, si el cambio afecta a un
+    email derivado, lo fija antes como override para que siga igual al CSV.
+    """
+    if col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and pd.notna(value) and value not in dtype.categories:
+            df[col] = df[col].cat.add_categories([value])
+        elif col in INTEGER_COLUMNS and str(dtype) == INTEGER_COLUMNS[col]:
+            number = pd.to_numeric(pd.Series([value], dtype=object).replace("", np.nan), errors="coerce").iloc[0]
+            if pd.isna(number):
+                value = pd.NA
+            elif float(number).is_integer():
+                value = int(number)
+    template_store.set_value(df, idx, col, value)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Bytes por columna (deep) antes y después de compact()."""
+    used_before = before.memory_usage(deep=True, index=False)
+    used_after = after.memory_usage(deep=True, index=False).reindex(used_before.index, fill_value=0)
+    report = pd.DataFrame({
+        "dtype_antes": before.dtypes.astype(str),
+        "dtype_despues": after.dtypes.reindex(used_before.index).astype(str),
+        "kb_antes": (used_before / 1024).round(1),
+        "kb_despues": (used_after / 1024).round(1),
+    })
+    return report.sort_values("kb_antes", ascending=False)
+
+
+def print_memory_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, float]:
+    report = memory_report(before, after)
+    total_before = report["kb_antes"].sum()
+    total_after = report["kb_despues"].sum()
+    print(report.to_string())
+    print(f"\n📉 Memoria: {total_before / 1024:,.2f} MB → {total_after / 1024:,.2f} MB "
+          f"({total_before / max(total_after, 0.001):.1f}x menos)")
+    return {"before_kb": total_before, "after_kb": total_after}
+
+
+def main():
+    print(f"📂 Leyendo {DATA_FILE}...")
+    original, _ = read_csv_versioned(DATA_FILE)
+    compacted = compact(original)
+    print_memory_report(original, compacted)
+
+    overrides = int(compacted["Email_Body"].notna().sum()) if "Email_Body" in compacted.columns else 0
+    print(f"✍️ {overrides} cuerpos difieren de la plantilla y se guardan como override")
+    full = with_bodies(compacted)
+    lossless = all(
+        full[col].astype(object).fillna("").equals(original[col].astype(object).fillna(""))
+        for col in DERIVED_COLUMNS if col in original.columns
+    )
+    print("✅ Sin pérdida: asunto, cuerpo y Email_Template reconstruidos idénticos" if lossless
+          else "❌ La reconstrucción no coincide con el CSV")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Aplicación deduplicada de las funciones por fila del pipeline
+(resolve_country, extract_short_name): HQ Location y los nombres de fondo se
+repiten mucho, así que cada valor distinto se calcula una sola vez y el
+resultado se reexpande en el orden original.
+
+Se ejecuta en el proceso actual: medido con benchmarks/distinct.py, un pool
+de procesos no mejoraba a la versión en serie y toda la ganancia venía de
+no repetir valores.
+"""
+
+from typing import Callable, Iterable
+
+import pandas as pd
+
+
+def _key(value):
+    # NaN != NaN: todas las celdas vacías comparten una clave
+    if isinstance(value, tuple):
+        return tuple(_key(v) for v in value)
+    return None if value is None or (isinstance(value, float) and value != value) else value
+
+
+def map_distinct(func: Callable, values: Iterable, star: bool = False) -> list:
+    """
+    [func(v) for v in values] (o func(*v) con star=True) calculando cada valor
+    distinto una sola vez.
+
+    Returns:
+        Lista de resultados en el mismo orden que `values`
+    """
+    values = list(values)
+    distinct = {}
+    for value in values:
+        distinct.setdefault(_key(value), value)
+    lookup = {key: func(*value) if star else func(value) for key, value in distinct.items()}
+    return [lookup[_key(value)] for value in values]
+
+
+def apply_distinct(series: pd.Series, func: Callable) -> pd.Series:
+    """series.apply(func) con map_distinct; conserva el índice."""
+    return pd.Series(map_distinct(func, series.tolist()), index=series.index, dtype=object)
+
@@ -0,0 +1,731 @@
+#!/usr/bin/env python3
+"""
+Lógica de revisión de emails usada por spell_checker.py.
+
+Separada de la UI para poder ejecutarla en hilos: un ejecutor con límite de
+peticiones en vuelo, presupuesto de tokens por minuto, reintentos con
+backoff y caché por cuerpo de email (review_cache.json).
+
+Modo plantilla: como casi todo el cuerpo es BODY_TEMPLATE, se revisa la
+plantilla una sola vez y solo las líneas variables (saludo, hook, fondo),
+deduplicadas entre filas y agrupadas en pocas llamadas a la AI.
+
+Cliente AI: SDK openai>=1.0 (OpenAI().chat.completions) en modo JSON. Varios
+emails cortos van en una sola petición, cada uno con su id; las respuestas que
+no se pueden parsear (o a las que les faltan ids) se vuelven a pedir.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from openai import OpenAI
+
+import api_metrics
+from csv_storage import atomic_open
+from language_detect import is_english
+from llm_router import OPENAI_BASE_URL
+from regenerate_emails_with_short_name import BODY_TEMPLATE, LANDING_PAGE
+
+REVIEW_CACHE_FILE = "review_cache.json"
+# Modelo con soporte de response_format={"type": "json_object"}
+AI_MODEL = os.getenv("REVIEW_MODEL", "gpt-4o")
+# Tokens de respuesta por email (o por paquete de fragmentos)
+AI_MAX_TOKENS = 500
+AI_TIMEOUT_SECONDS = 60
+
+# Valores por defecto del ejecutor concurrente
+MAX_IN_FLIGHT = 8
+TOKENS_PER_MINUTE = 40_000
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 1.0
+
+# Emails completos por llamada a la AI (solo se agrupan los cortos)
+EMAILS_PER_REQUEST = 5
+MAX_CHARS_PER_REQUEST = 8000
+# Reintentos inmediatos cuando la respuesta no es JSON válido o faltan ids
+PARSE_RETRIES = 2
+
+# Fragmentos variables por llamada a la AI en modo plantilla
+FRAGMENTS_PER_REQUEST = 20
+# Puntuación de un fragmento que la AI no reporta con problemas
+CLEAN_FRAGMENT_SCORE = 10
+# Puntuación cuando la AI revisa un email (o fragmento) pero omite overall_score
+DEFAULT_SCORE = 8
+
+TEMPLATE_SLOT_RE = re.compile(r"\{\{\w+\}\}")
+
+
+# Palabras comunes mal escritas (ampliable con load_misspellings)
+MISSPELLINGS = {
+    "recieve": "receive",
+    "seperate": "separate",
+    "definately": "definitely",
+    "occured": "occurred",
+    "begining": "beginning",
+    "accomodate": "accommodate",
+    "acheive": "achieve",
+    "beleive": "believe",
+    "calender": "calendar",
+    "cemetary": "cemetery",
+    "concious": "conscious",
+    "embarass": "embarrass",
+    "existance": "existence",
+    "goverment": "government",
+    "independant": "independent",
+    "occassion": "occasion",
+    "priviledge": "privilege",
+    "rythm": "rhythm",
+    "seige": "siege",
+    "tommorrow": "tomorrow",
+    "untill": "until",
+    "writting": "writing"
+}
+
+# Diccionario externo opcional: export MISSPELLINGS_FILE="misspellings.txt"
+MISSPELLINGS_FILE = os.getenv("MISSPELLINGS_FILE")
+
+# Un solo escaneo por texto (en minúsculas) que produce tres tipos de token:
+# - palabras completas, que se buscan en el diccionario con una intersección
+#   de sets (sin coste por entrada, aunque tenga decenas de miles)
+# - " " seguido de otro espacio (doble espacio)
+# - espacio + signo de puntuación
+SCAN_RE = re.compile(r"[a-z]+(?:'[a-z]+)*| (?= )|\s[.,!?;:]")
+DOUBLE_SPACE_TOKEN = " "
+
+
+DOUBLE_SPACE_ISSUE = {"type": "formatting", "issue": "Double spaces found", "severity": "low"}
+SPACE_PUNCT_ISSUE = {"type": "formatting", "issue": "Spaces before punctuation", "severity": "low"}
+
+
+def _is_punct_token(token: str) -> bool:
+    return len(token) == 2 and token[0].isspace()
+
+
+def load_misspellings(path: str) -> int:
+    """
+    Agrega un diccionario externo de errores a MISSPELLINGS.
+    Acepta líneas "error->corrección" (formato de la lista de Wikipedia) o
+    CSV "error,corrección". Las entradas con espacios se ignoran.
+
+    Returns:
+        Número de entradas cargadas
+    """
+    loaded = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            sep = "->" if "->" in line else ","
+            wrong, _, right = line.partition(sep)
+            wrong, right = wrong.strip().lower(), right.strip()
+            if wrong and right and " " not in wrong:
+                MISSPELLINGS[wrong] = right
+                loaded += 1
+    return loaded
+
+
+if MISSPELLINGS_FILE and os.path.exists(MISSPELLINGS_FILE):
+    load_misspellings(MISSPELLINGS_FILE)
+
+
+def _spelling_issue(mistake: str) -> Dict:
+    return {
+        "type": "spelling",
+        "issue": f"'{mistake}' should be '{MISSPELLINGS[mistake]}'",
+        "severity": "medium"
+    }
+
+
+# Función para revisión básica de ortografía
+def basic_spell_check(text: str) -> List[Dict]:
+    """Revisión básica de ortografía y formato en una sola pasada."""
+    tokens = set(SCAN_RE.findall(text.lower()))
+    issues = [_spelling_issue(m) for m in sorted(tokens & MISSPELLINGS.keys())]
+    if DOUBLE_SPACE_TOKEN in tokens:
+        issues.append(dict(DOUBLE_SPACE_ISSUE))
+    if any(_is_punct_token(t) for t in tokens):
+        issues.append(dict(SPACE_PUNCT_ISSUE))
+    return issues
+
+
+def basic_spell_check_series(texts: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de basic_spell_check para una columna completa.
+    Devuelve una Serie (mismo índice) con la lista de issues de cada texto.
+    """
+    token_sets = texts.fillna("").astype(str).str.lower().str.findall(SCAN_RE).map(set)
+    # Palabras de todo el texto de la columna que están en el diccionario (una sola intersección)
+    vocabulary = set().union(*token_sets) if len(token_sets) else set()
+    misspelled = vocabulary & MISSPELLINGS.keys()
+    punct_tokens = {t for t in vocabulary if _is_punct_token(t)}
+
+    issues = []
+    for tokens in token_sets:
+        row = [_spelling_issue(m) for m in sorted(tokens & misspelled)] if misspelled else []
+        if DOUBLE_SPACE_TOKEN in tokens:
+            row.append(dict(DOUBLE_SPACE_ISSUE))
+        if not punct_tokens.isdisjoint(tokens):
+            row.append(dict(SPACE_PUNCT_ISSUE))
+        issues.append(row)
+    return pd.Series(issues, index=texts.index, dtype=object)
+
+
+SYSTEM_PROMPT = (
+    "You are a meticulous English copy editor for professional outreach emails. "
+    "Always answer with a single JSON object and nothing else."
+)
+
+ISSUE_SCHEMA = """{
+                    "type": "spelling|grammar|style|clarity",
+                    "issue": "description of the issue",
+                    "suggestion": "suggested improvement",
+                    "severity": "low|medium|high"
+                }"""
+
+
+def build_review_prompt(emails: Dict[str, str]) -> str:
+    numbered = "\n\n".join(f"=== EMAIL {eid} ===\n{text}" for eid, text in emails.items())
+    return f"""
+        Review each email below for:
+        1. Spelling errors
+        2. Grammar mistakes
+        3. Natural English flow
+        4. Professional tone
+        5. Clarity and directness
+
+        {numbered}
+
+        Respond in JSON format with one entry per email id (all ids: {", ".join(emails)}):
+        {{
+            "results": [
+                {{
+                    "id": "email id",
+                    "issues": [
+                        {ISSUE_SCHEMA}
+                    ],
+                    "overall_score": 1-10,
+                    "is_english": true/false
+                }}
+            ]
+        }}
+        """
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación barata de tokens (≈ 4 caracteres por token)."""
+    return max(1, len(text) // 4)
+
+
+class ReviewParseError(ValueError):
+    """La respuesta de la AI no es JSON válido o no tiene el formato esperado."""
+
+
+@lru_cache(maxsize=8)
+def get_client(api_key: str) -> OpenAI:
+    """Cliente OpenAI compartido entre hilos (uno por API key).
+    Los reintentos los gestiona with_retries, no el SDK."""
+    return OpenAI(api_key=api_key, base_url=OPENAI_BASE_URL, max_retries=0, timeout=AI_TIMEOUT_SECONDS)
+
+
+def _parse_item(item) -> Dict:
+    """Valida y normaliza el resultado de un email o fragmento."""
+    if not isinstance(item, dict):
+        raise ReviewParseError(f"Resultado no es un objeto: {item!r}")
+    issues = item.get("issues") or []
+    if not isinstance(issues, list):
+        raise ReviewParseError(f"'issues' no es una lista: {issues!r}")
+    try:
+        score = int(round(float(item.get("overall_score", DEFAULT_SCORE))))
+    except (TypeError, ValueError):
+        raise ReviewParseError(f"'overall_score' inválido: {item.get('overall_score')!r}")
+    result = {
+        "issues": [issue for issue in issues if isinstance(issue, dict)],
+        "overall_score": min(max(score, 1), 10),
+    }
+    if isinstance(item.get("is_english"), bool):
+        result["is_english"] = item["is_english"]
+    return result
+
+
+@api_metrics.instrument("llm.review")
+def chat_json(prompt: str, api_key: str, max_tokens: int = AI_MAX_TOKENS) -> Dict:
+    """
+    Una llamada en modo JSON. Lanza ReviewParseError si la respuesta llega
+    cortada o no es un objeto JSON; los errores de la API se propagan.
+    """
+    response = get_client(api_key).chat.completions.create(
+        model=AI_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=max_tokens,
+        temperature=0.3
+    )
+    api_metrics.annotate(status=200, model=AI_MODEL, **api_metrics.usage_from(response))
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        raise ReviewParseError("Respuesta cortada por max_tokens")
+    try:
+        parsed = json.loads(choice.message.content or "")
+    except json.JSONDecodeError as e:
+        raise ReviewParseError(f"JSON inválido: {e}")
+    if not isinstance(parsed, dict):
+        raise ReviewParseError("La respuesta no es un objeto JSON")
+    return parsed
+
+
+def _results_by_id(parsed: Dict, ids) -> Dict[str, Dict]:
+    """{id: resultado} para los ids pedidos; ignora ids desconocidos."""
+    items = parsed.get("results")
+    if not isinstance(items, list):
+        raise ReviewParseError("Falta la lista 'results'")
+    by_id = {}
+    for item in items:
+        if isinstance(item, dict) and str(item.get("id")) in ids:
+            by_id[str(item["id"])] = _parse_item(item)
+    return by_id
+
+
+# Función para revisión con AI
+def ai_review_batch(emails: Dict[str, str], api_key: str, parse_retries: int = PARSE_RETRIES) -> Dict[str, Dict]:
+    """
+    Revisa varios emails en una sola llamada. Devuelve {id: resultado}.
+    Si la respuesta no se puede parsear o le faltan ids, se vuelven a pedir
+    solo los emails que faltan (hasta parse_retries veces).
+    Lanza la excepción en caso de error para que el ejecutor pueda reintentar.
+    """
+    results = {}
+    remaining = dict(emails)
+    last_error = None
+    for _ in range(parse_retries + 1):
+        try:
+            parsed = chat_json(build_review_prompt(remaining), api_key, AI_MAX_TOKENS * len(remaining))
+            results.update(_results_by_id(parsed, remaining))
+        except ReviewParseError as e:
+            last_error = e
+        remaining = {eid: text for eid, text in remaining.items() if eid not in results}
+        if not remaining:
+            return results
+    raise ReviewParseError(f"Sin resultado para {sorted(remaining)}: {last_error or 'ids ausentes'}")
+
+
+def ai_review(text: str, api_key: str) -> Dict:
+    """Revisión avanzada de un solo email (ver ai_review_batch)."""
+    return ai_review_batch({"e1": text}, api_key)["e1"]
+
+
+def _combine_review(body: str, row_idx: int, ai_result: Optional[Dict]) -> Dict:
+    """Une la revisión básica con el resultado de la AI (o el valor por defecto sin AI)."""
+    if pd.isna(body) or not body.strip():
+        return {"issues": [], "score": 0, "is_english": False, "row_idx": row_idx}
+
+    # Revisión básica
+    basic_issues = basic_spell_check(body)
+    ai_result = ai_result or {"issues": [], "overall_score": 8}
+
+    return {
+        "issues": basic_issues + ai_result.get("issues", []),
+        "score": ai_result.get("overall_score", 8),
+        # Detector local; la respuesta de la AI tiene prioridad si la trae
+        "is_english": ai_result.get("is_english", is_english(body)),
+        "row_idx": row_idx
+    }
+
+
+def _needs_ai(body) -> bool:
+    return isinstance(body, str) and bool(body.strip())
+
+
+# Función principal de revisión
+def review_email_body(body: str, row_idx: int, api_key: Optional[str] = None) -> Dict:
+    """Revisar un email body completo."""
+    ai_result = ai_review(body, api_key) if api_key and _needs_ai(body) else None
+    return _combine_review(body, row_idx, ai_result)
+
+
+class ReviewCache:
+    """Caché persistente de resultados por hash del cuerpo (y modo de revisión)."""
+
+    def __init__(self, path: str = REVIEW_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                try:
+                    self._data = json.load(f)
+                except Exception:
+                    self._data = {}
+
+    @staticmethod
+    def key(body: str, mode: str) -> str:
+        return hashlib.sha256(f"{mode}\0{body}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key: str, result: Dict):
+        with self._lock:
+            self._data[key] = result
+
+    def save(self):
+        # Escritura atómica: un corte a mitad no deja un JSON truncado
+        with self._lock:
+            snapshot = dict(self._data)
+        with atomic_open(self.path, suffix=".tmp") as f:
+            json.dump(snapshot, f)
+
+
+class TokenBudget:
+    """Ventana deslizante de 60 s: bloquea hasta que haya presupuesto de tokens."""
+
+    def __init__(self, tokens_per_minute: int = TOKENS_PER_MINUTE):
+        self.tokens_per_minute = tokens_per_minute
+        self._events = deque()  # (timestamp, tokens)
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int):
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._events and now - self._events[0][0] >= 60:
+                    self._used -= self._events.popleft()[1]
+                if self._used + tokens <= self.tokens_per_minute:
+                    self._events.append((now, tokens))
+                    self._used += tokens
+                    return
+                wait_seconds = 60 - (now - self._events[0][0])
+            time.sleep(min(max(wait_seconds, 0.05), 1.0))
+
+
+def with_retries(fn: Callable, max_retries: int = MAX_RETRIES, backoff: float = BACKOFF_BASE_SECONDS):
+    """Ejecuta fn() reintentando con backoff exponencial + jitter."""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt == max_retries:
+                raise
+            api_metrics.note_retry("llm.review")
+            time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
+
+
+def _pack_rows(rows: Iterable[Tuple[int, str]], emails_per_request: int,
+               max_chars: int = MAX_CHARS_PER_REQUEST) -> Iterator[List[Tuple[int, str]]]:
+    """Agrupa filas en paquetes de hasta emails_per_request y max_chars caracteres."""
+    pack, chars = [], 0
+    for row_idx, body in rows:
+        size = len(body) if isinstance(body, str) else 0
+        if pack and (len(pack) >= emails_per_request or chars + size > max_chars):
+            yield pack
+            pack, chars = [], 0
+        pack.append((row_idx, body))
+        chars += size
+    if pack:
+        yield pack
+
+
+def review_concurrently(rows: Iterable[Tuple[int, str]], api_key: Optional[str] = None,
+                        max_in_flight: int = MAX_IN_FLIGHT, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                        max_retries: int = MAX_RETRIES, cache: Optional[ReviewCache] = None,
+                        emails_per_request: int = EMAILS_PER_REQUEST) -> Iterator[Dict]:
+    """
+    Revisa emails en paralelo y entrega cada resultado en cuanto termina
+    (no en el orden de entrada; usar result["row_idx"]).
+
+    Args:
+        rows: Iterable de (row_idx, body)
+        api_key: OpenAI API key; sin ella solo se hace la revisión básica
+        max_in_flight: Máximo de llamadas simultáneas
+        tokens_per_minute: Presupuesto de tokens por minuto para la AI
+        max_retries: Reintentos por llamada ante errores de la API
+        cache: Caché de resultados; las filas cacheadas no se vuelven a revisar
+        emails_per_request: Emails cortos agrupados en una sola llamada
+
+    Yields:
+        Resultado de review_email_body, con "cached" y, si falló, "error"
+    """
+    mode = f"ai:{AI_MODEL}" if api_key else "basic"
+    budget = TokenBudget(tokens_per_minute)
+
+    def run(pack):
+        emails = {f"e{i}": body for i, (_, body) in enumerate(pack, 1) if _needs_ai(body)}
+        ai_results, error = {}, None
+        if api_key and emails:
+            budget.acquire(estimate_tokens(build_review_prompt(emails)) + AI_MAX_TOKENS * len(emails))
+            try:
+                ai_results = with_retries(lambda: ai_review_batch(emails, api_key), max_retries)
+            except Exception as e:
+                # Sin AI tras agotar reintentos: queda la revisión básica
+                error = str(e)
+        results = []
+        for i, (row_idx, body) in enumerate(pack, 1):
+            result = _combine_review(body, row_idx, ai_results.get(f"e{i}"))
+            if error and f"e{i}" in emails:
+                result["error"] = error
+            results.append(result)
+        return results
+
+    def uncached():
+        # Las filas cacheadas se entregan de inmediato; el resto pasa a los paquetes
+        for row_idx, body in rows:
+            key = ReviewCache.key(body, mode) if cache is not None and isinstance(body, str) else None
+            cached = cache.get(key) if key else None
+            if cached is not None:
+                api_metrics.record_cache_hit("review_cache")
+                hits.append({**cached, "row_idx": row_idx, "cached": True})
+            else:
+                yield row_idx, body
+
+    hits = []
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        pending = {}
+        for pack in _pack_rows(uncached(), emails_per_request if api_key else 1):
+            yield from hits
+            hits.clear()
+            pending[pool.submit(run, pack)] = pack
+            # Limitar las peticiones en vuelo: esperar a que termine alguna
+            while len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from _finish(future, pending.pop(future), mode, cache)
+
+        yield from hits
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from _finish(future, pending.pop(future), mode, cache)
+
+    if cache is not None:
+        cache.save()
+
+
+def _finish(future, pack: List[Tuple[int, str]], mode: str, cache: Optional[ReviewCache]) -> List[Dict]:
+    results = future.result()
+    if cache is not None:
+        for (_, body), result in zip(pack, results):
+            if isinstance(body, str) and "error" not in result:
+                cache.put(ReviewCache.key(body, mode), {k: v for k, v in result.items() if k != "row_idx"})
+    return [{**result, "cached": False} for result in results]
+
+
+class TemplateSplitter:
+    """
+    Separa un cuerpo renderizado en la parte constante de la plantilla y las
+    líneas variables (las que contienen {{tokens}}), sin conocer los valores.
+    """
+
+    def __init__(self, template: str = BODY_TEMPLATE, constants: Optional[Dict[str, str]] = None):
+        constants = {"landing_page": LANDING_PAGE} if constants is None else constants
+        for name, value in constants.items():
+            template = template.replace("{{%s}}" % name, value)
+        self.template = template
+
+        patterns = []
+        for line in template.split("\n"):
+            pieces = TEMPLATE_SLOT_RE.split(line)
+            if len(pieces) > 1:
+                # Línea variable: se captura completa, cada token es [^\n]*?
+                patterns.append("(" + "[^\n]*?".join(map(re.escape, pieces)) + ")")
+            else:
+                patterns.append(re.escape(line))
+        self._body_re = re.compile(r"\A" + "\n".join(patterns) + r"\Z")
+
+    def variable_lines(self, body: str) -> Optional[List[str]]:
+        """Líneas variables del cuerpo, o None si no sigue la plantilla (editado a mano)."""
+        if not isinstance(body, str):
+            return None
+        match = self._body_re.match(body)
+        return list(match.groups()) if match else None
+
+
+def build_fragments_prompt(fragments: Dict[str, str]) -> str:
+    numbered = "\n".join(f'[{fid}] {text}' for fid, text in fragments.items())
+    return f"""
+        Below are independent fragments (single lines) taken from personalized
+        outreach emails. Review each one for spelling, grammar, natural English
+        flow and professional tone. Names of people and companies are correct.
+
+        Fragments:
+        {numbered}
+
+        Respond in JSON format, listing ONLY fragments that have problems:
+        {{
+            "results": [
+                {{
+                    "id": "fragment id",
+                    "issues": [
+                        {ISSUE_SCHEMA}
+                    ],
+                    "overall_score": 1-10,
+                    "is_english": true/false
+                }}
+            ]
+        }}
+        """
+
+
+def ai_review_fragments(fragments: Dict[str, str], api_key: str, parse_retries: int = PARSE_RETRIES) -> Dict[str, Dict]:
+    """
+    Revisa varios fragmentos en una sola llamada. Devuelve {id: resultado};
+    los fragmentos que la AI no menciona se consideran correctos. Las
+    respuestas que no se pueden parsear se vuelven a pedir.
+    """
+    prompt = build_fragments_prompt(fragments)
+    for attempt in range(parse_retries + 1):
+        try:
+            by_id = _results_by_id(chat_json(prompt, api_key), fragments)
+            break
+        except ReviewParseError:
+            if attempt == parse_retries:
+                raise
+    results = {fid: {"issues": [], "overall_score": CLEAN_FRAGMENT_SCORE} for fid in fragments}
+    results.update(by_id)
+    return results
+
+
+def review_with_template(rows: Iterable[Tuple[int, str]], api_key: Optional[str] = None,
+                         max_in_flight: int = MAX_IN_FLIGHT, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                         max_retries: int = MAX_RETRIES, cache: Optional[ReviewCache] = None,
+                         splitter: Optional[TemplateSplitter] = None,
+                         emails_per_request: int = EMAILS_PER_REQUEST,
+                         on_progress: Optional[Callable[[int, int], None]] = None,
+                         reviews: Optional[Dict[str, Dict]] = None) -> Iterator[Dict]:
+    """
+    Revisión deduplicada: la plantilla constante se revisa una vez y cada línea
+    variable única una sola vez (agrupadas de a FRAGMENTS_PER_REQUEST por llamada).
+    Los issues por fila se reconstruyen a partir de esos resultados; los cuerpos
+    que no siguen la plantilla se revisan completos con review_concurrently.
+    Las filas cuyos fragmentos ya están revisados salen en cuanto se leen.
+
+    Args:
+        rows, api_key, max_in_flight, tokens_per_minute, max_retries, cache:
+            Igual que en review_concurrently
+        splitter: Separador de plantilla (por defecto BODY_TEMPLATE)
+        emails_per_request: Igual que en review_concurrently (cuerpos fuera de plantilla)
+        on_progress: Callback (hechos, total) durante la revisión de fragmentos
+        reviews: {fragmento: revisión} compartido entre llamadas (p. ej. una por
+            bloque del CSV) para no volver a revisar los fragmentos repetidos;
+            solo guarda revisiones sin error
+
+    Yields:
+        Resultado por fila con el mismo formato que review_email_body
+    """
+    splitter = splitter or TemplateSplitter()
+    mode = f"ai:{AI_MODEL}" if api_key else "basic"
+    reviews = {} if reviews is None else reviews
+
+    def known(text: str) -> bool:
+        if text not in reviews and cache is not None:
+            cached = cache.get(ReviewCache.key(text, mode + ":fragment"))
+            if cached is not None:
+                api_metrics.record_cache_hit("review_cache")
+                reviews[text] = cached
+        return text in reviews
+
+    # Fragmentos cuya revisión AI falló en esta llamada: no van a `reviews`,
+    # así el siguiente bloque los vuelve a intentar
+    failed = {}
+
+    def rebuild(row_idx, body: str, lines: List[str]) -> Dict:
+        parts = [reviews[text] if text in reviews else failed[text] for text in [splitter.template] + lines]
+        # Como al revisar el cuerpo completo: cada issue una vez aunque salga en varias partes
+        issues = []
+        for issue in (issue for part in parts for issue in part["issues"]):
+            if issue not in issues:
+                issues.append(issue)
+        result = {
+            "issues": issues,
+            "score": min(part["score"] for part in parts),
+            "is_english": all(part.get("is_english", True) for part in parts) and is_english(body),
+            "row_idx": row_idx,
+            "cached": False,
+        }
+        errors = [part["error"] for part in parts if "error" in part]
+        if errors:
+            result["error"] = errors[0]
+        return result
+
+    # Fragmentos únicos a revisar (conjunto ordenado); la plantilla va como uno más
+    pending = {} if known(splitter.template) else {splitter.template: None}
+    matched, unmatched = [], []
+    for row_idx, body in rows:
+        lines = splitter.variable_lines(body)
+        if lines is None:
+            unmatched.append((row_idx, body))
+            continue
+        missing = [line for line in lines if line in pending or not known(line)]
+        if missing or splitter.template in pending:
+            pending.update(dict.fromkeys(missing))
+            matched.append((row_idx, body, lines))
+        else:
+            yield rebuild(row_idx, body, lines)
+    todo = list(pending)
+
+    # Revisión básica local (barata) + AI agrupada y concurrente
+    basic = dict(zip(todo, basic_spell_check_series(pd.Series(todo, dtype=object)))) if todo else {}
+    ai_results = {}
+    if api_key and todo:
+        budget = TokenBudget(tokens_per_minute)
+        template_first = [splitter.template] if splitter.template in todo else []
+        packs = [template_first] if template_first else []
+        rest = [t for t in todo if t != splitter.template]
+        packs += [rest[i:i + FRAGMENTS_PER_REQUEST] for i in range(0, len(rest), FRAGMENTS_PER_REQUEST)]
+
+        def run(pack):
+            fragments = {f"f{i}": text for i, text in enumerate(pack, 1)}
+            budget.acquire(estimate_tokens(build_fragments_prompt(fragments)) + AI_MAX_TOKENS)
+            try:
+                by_id = with_retries(lambda: ai_review_fragments(fragments, api_key), max_retries)
+            except Exception as e:
+                return {text: {"error": str(e)} for text in pack}
+            return {fragments[fid]: result for fid, result in by_id.items()}
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            futures = [pool.submit(run, pack) for pack in packs]
+            for done, future in enumerate(futures, 1):
+                ai_results.update(future.result())
+                if on_progress:
+                    on_progress(done, len(packs))
+
+    for text in todo:
+        ai = ai_results.get(text, {})
+        result = {
+            "issues": basic[text] + ai.get("issues", []),
+            "score": ai.get("overall_score", 8 if not api_key else CLEAN_FRAGMENT_SCORE),
+        }
+        if "is_english" in ai:
+            result["is_english"] = ai["is_english"]
+        if "error" in ai:
+            result["error"] = ai["error"]
+            failed[text] = result
+            continue
+        if cache is not None:
+            cache.put(ReviewCache.key(text, mode + ":fragment"), result)
+        reviews[text] = result
+
+    # Reconstruir el resultado de cada fila
+    for row_idx, body, lines in matched:
+        yield rebuild(row_idx, body, lines)
+
+    if cache is not None:
+        cache.save()
+
+    yield from review_concurrently(unmatched, api_key, max_in_flight, tokens_per_minute, max_retries, cache,
+                                   emails_per_request)
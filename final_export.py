@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Exportador del CSV final (botón "Finalizar" de app.py).
+Escribe las 8 columnas de envío por bloques, en CSV o JSONL, a un archivo
+temporal que se renombra de forma atómica al terminar (ver csv_storage.py).
+"""
+
+import io
+from typing import Iterator
+
+import pandas as pd
+
+from csv_storage import atomic_open, atomic_path
+from dataset_schema import with_bodies
+
+OUTPUT_FILE = "857-vc-funds-final.csv"
+CHUNK_SIZE = 5000
+
+# Columna final -> columna del dataset original
+FINAL_COLUMNS = {
+    "Full_name": "Primary Contact",
+    "email": "Primary Contact Email",
+    "body": "Email_Body",
+    "subject": "Email_Subject",
+    "first_name": "First Name",
+    "last_name": "Last Name",
+    "fund_name": "Investors",
+    "fund_short_name": "Short_Name",
+}
+
+# Formatos soportados: extensión y MIME para st.download_button
+EXPORT_FORMATS = {
+    "csv": {"extension": ".csv", "mime": "text/csv"},
+    "jsonl": {"extension": ".jsonl", "mime": "application/jsonl"},
+}
+
+
+def iter_final_chunks(df: pd.DataFrame, chunksize: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Genera bloques con las 8 columnas finales sin copiar el DataFrame completo.
+
+    Args:
+        df: DataFrame original (857-vc-funds-with-email-template.csv)
+        chunksize: Filas por bloque
+
+    Yields:
+        DataFrame de como máximo `chunksize` filas con las columnas finales
+    """
+    for start in range(0, len(df), chunksize):
+        # Cuerpos derivados de la plantilla (DataFrame compacto) se renderizan por bloque
+        block = with_bodies(df.iloc[start:start + chunksize])
+        chunk = pd.DataFrame(index=block.index)
+        for final_col, source_col in FINAL_COLUMNS.items():
+            if source_col in block.columns:
+                chunk[final_col] = block[source_col].fillna("").astype(str)
+            else:
+                chunk[final_col] = ""
+        yield chunk
+
+
+def format_chunk(chunk: pd.DataFrame, fmt: str, include_header: bool) -> str:
+    """Serializa un bloque en el formato pedido ('csv' o 'jsonl')."""
+    if fmt == "csv":
+        return chunk.to_csv(index=False, header=include_header)
+    if fmt == "jsonl":
+        text = chunk.to_json(orient="records", lines=True, force_ascii=False)
+        return text if text.endswith("\n") or not text else text + "\n"
+    raise ValueError(f"Formato de exportación no soportado: {fmt}")
+
+
+def iter_export_text(df: pd.DataFrame, fmt: str = "csv", chunksize: int = CHUNK_SIZE) -> Iterator[str]:
+    """Genera el archivo final como una secuencia de fragmentos de texto."""
+    first = True
+    for chunk in iter_final_chunks(df, chunksize):
+        yield format_chunk(chunk, fmt, include_header=first)
+        first = False
+    if first and fmt == "csv":
+        # Dataset vacío: al menos la cabecera
+        yield ",".join(FINAL_COLUMNS) + "\n"
+
+
+class GeneratorReader(io.RawIOBase):
+    """Archivo de solo lectura sobre un generador de bytes (para st.download_button)."""
+
+    def __init__(self, generator: Iterator[bytes]):
+        self._generator = generator
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._generator)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def stream_final_export(df: pd.DataFrame, fmt: str = "csv", chunksize: int = CHUNK_SIZE) -> io.BufferedReader:
+    """
+    Devuelve un objeto tipo archivo que genera el export bajo demanda.
+    Pensado para `st.download_button(data=lambda: stream_final_export(df, fmt))`:
+    se genera solo al hacer clic, pero Streamlit lo lee entero en memoria antes
+    de servirlo. Para memoria acotada usar write_final_export / write_excel_streaming.
+    """
+    generator = (text.encode("utf-8") for text in iter_export_text(df, fmt, chunksize))
+    return io.BufferedReader(GeneratorReader(generator))
+
+
+def write_final_export(df: pd.DataFrame, output_file: str = OUTPUT_FILE, fmt: str = "csv",
+                       chunksize: int = CHUNK_SIZE) -> dict:
+    """
+    Escribe el export final por bloques a un temporal y lo renombra atómicamente.
+
+    Returns:
+        Estadísticas acumuladas: total, con email, con hook personalizado y preview
+    """
+    stats = {"total": 0, "with_email": 0, "with_hooks": 0, "preview": None}
+    with atomic_open(output_file, suffix=".tmp") as f:
+        first = True
+        for chunk in iter_final_chunks(df, chunksize):
+            f.write(format_chunk(chunk, fmt, include_header=first))
+            if first:
+                stats["preview"] = chunk.head(10)
+            first = False
+            stats["total"] += len(chunk)
+            stats["with_email"] += int((chunk["email"].str.strip() != "").sum())
+            stats["with_hooks"] += int((~chunk["body"].str.contains("your leadership at", case=False)).sum())
+        if first and fmt == "csv":
+            f.write(",".join(FINAL_COLUMNS) + "\n")
+    return stats
+
+
+def write_excel_streaming(df: pd.DataFrame, output_file: str, chunksize: int = CHUNK_SIZE) -> int:
+    """
+    Exporta el DataFrame completo a Excel con openpyxl en modo write_only
+    (filas en streaming) y renombrado atómico. Devuelve el número de filas.
+    """
+    from openpyxl import Workbook
+
+    rows = 0
+    with atomic_path(output_file, suffix=".xlsx") as tmp_path:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        # Cabecera de las columnas ya renderizadas (sin Template_Version del frame compacto)
+        ws.append([str(c) for c in with_bodies(df.iloc[:0]).columns])
+        for start in range(0, len(df), chunksize):
+            block = with_bodies(df.iloc[start:start + chunksize])
+            block = block.astype(object).where(block.notna(), None)
+            for values in block.itertuples(index=False, name=None):
+                ws.append(list(values))
+            rows += len(block)
+        wb.save(tmp_path)
+    return rows
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Contexto a nivel de fondo, compartido por todos los contactos del mismo fondo.
+
+Antes cada socio de un fondo repetía las búsquedas del fondo (portfolio,
+noticias) y el prompt volvía a cargar su descripción y sectores. Aquí:
+
+1. Los contactos se agrupan por nombre de fondo normalizado.
+2. Por cada fondo se hacen una sola vez las búsquedas del fondo y se comprime
+   todo (sectores, última inversión, descripción y fragmentos web) en un
+   resumen de FUND_SUMMARY_TOKENS tokens como máximo.
+3. El resumen se guarda en FUND_CONTEXT_FILE, así que también se reutiliza
+   entre ejecuciones y al regenerar filas sueltas desde la UI.
+
+Las búsquedas y los tokens del fondo crecen con el número de fondos, no de contactos.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+import api_metrics
+from csv_storage import atomic_open
+from hook_prompts import trim_to_tokens
+
+FUND_CONTEXT_FILE = "fund_context_cache.json"
+FUND_CONTEXT_TTL_DAYS = 30  # Pasado este tiempo se vuelve a investigar el fondo
+
+# Búsquedas que solo dependen del fondo (antes se repetían por cada socio)
+FUND_QUERIES = [
+    '"{fund}" recent portfolio companies investments 2024',
+]
+FUND_RESULTS_PER_QUERY = 2
+SEARCH_PAUSE_SECONDS = 1
+
+# Presupuesto del resumen comprimido
+FUND_SUMMARY_TOKENS = 160
+SECTORS_TOKENS = 30
+DESCRIPTION_TOKENS = 60
+NEWS_SNIPPETS = 2
+NEWS_SNIPPET_TOKENS = 35
+
+# Sufijos legales que no distinguen un fondo de otro
+_LEGAL_SUFFIX_RE = re.compile(
+    r"\b(llc|l\.l\.c|ltd|limited|inc|incorporated|plc|lp|llp|co|corp|gmbh|sa|spc|fze|fzco|dmcc)\.?$"
+)
+_PARENS_RE = re.compile(r"\([^)]*\)")
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+SearchFn = Callable[[str, int], List[Dict]]
+
+
+def normalize_fund(name) -> str:
+    """
+    Nombre de fondo normalizado para agrupar contactos: minúsculas, sin
+    paréntesis, puntuación ni sufijos legales ("Foo Capital LLC" == "foo capital").
+    """
+    if name is None or (not isinstance(name, str) and pd.isna(name)):
+        return ""
+    text = " ".join(_PARENS_RE.sub(" ", str(name).lower()).replace(",", " ").split())
+    previous = None
+    while text and text != previous:
+        previous = text
+        text = _LEGAL_SUFFIX_RE.sub("", text).strip(" .,-&")
+    text = text.replace("&", " and ")
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+def _field(row: Dict, column: str) -> Optional[str]:
+    value = row.get(column)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    value = " ".join(str(value).split())
+    return value or None
+
+
+def research_fund(fund: str, search: SearchFn) -> List[Dict]:
+    """Búsquedas del fondo (una vez por fondo)."""
+    results = []
+    for query in FUND_QUERIES:
+        results.extend(search(query.format(fund=fund), FUND_RESULTS_PER_QUERY))
+        time.sleep(SEARCH_PAUSE_SECONDS)
+    return results
+
+
+def compress_fund_context(row: Dict, web_results: List[Dict]) -> str:
+    """
+    Resumen compacto del fondo a partir de las columnas del CSV y de los
+    fragmentos web, recortado a FUND_SUMMARY_TOKENS.
+    """
+    parts = []
+    sectors = _field(row, "Preferred Verticals") or _field(row, "Preferred Industry")
+    if sectors:
+        parts.append(f"Sectors: {trim_to_tokens(sectors, SECTORS_TOKENS)}")
+    last = _field(row, "Last Investment Company")
+    if last:
+        parts.append(f"Last investment: {last}")
+    description = _field(row, "Description")
+    if description:
+        parts.append(trim_to_tokens(description, DESCRIPTION_TOKENS))
+    snippets = [r.get("snippet", "") for r in web_results if r.get("snippet")][:NEWS_SNIPPETS]
+    if snippets:
+        parts.append("Recent: " + " | ".join(trim_to_tokens(s, NEWS_SNIPPET_TOKENS) for s in snippets))
+    text = " ".join(part if part.endswith((".", "…", "!", "?")) else part + "." for part in parts)
+    return trim_to_tokens(text, FUND_SUMMARY_TOKENS)
+
+
+class FundContextCache:
+    """Resúmenes por fondo normalizado en un JSON, con caducidad y escritura atómica."""
+
+    def __init__(self, path: str = FUND_CONTEXT_FILE, ttl_days: float = FUND_CONTEXT_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo leer {path}: {e}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        with self._lock:
+            self._entries[key] = entry
+
+    def save(self):
+        with self._lock:
+            snapshot = dict(self._entries)
+        with atomic_open(self.path, suffix=".tmp") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=1)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[FundContextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> FundContextCache:
+    """Caché compartida del proceso (se carga una sola vez)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FundContextCache()
+        return _cache
+
+
+def _build_entry(row: Dict, search: Optional[SearchFn]) -> Dict:
+    fund = _field(row, "Investors") or ""
+    web_results = research_fund(fund, search) if search and fund else []
+    return {
+        "fund": fund,
+        "summary": compress_fund_context(row, web_results),
+        "source_url": next((r.get("url", "") for r in web_results if r.get("url")), ""),
+        "web_results": len(web_results),
+        "fetched_at": time.time(),
+        "fetched": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def fund_context(contact_data: Dict, search: Optional[SearchFn] = None,
+                 cache: Optional[FundContextCache] = None, save: bool = True) -> Dict:
+    """
+    Contexto del fondo de un contacto: {"summary", "source_url", "web_results", ...}.
+    Sale de la caché si está vigente; si no, se investiga y se guarda.
+    """
+    cache = get_cache() if cache is None else cache
+    key = normalize_fund(contact_data.get("Investors"))
+    entry = cache.get(key) if key else None
+    if entry is not None:
+        api_metrics.record_cache_hit("fund_context")
+    else:
+        entry = _build_entry(contact_data, search)
+        if key:
+            cache.put(key, entry)
+            if save:
+                cache.save()
+    return entry
+
+
+def prepare_fund_contexts(df: pd.DataFrame, search: Optional[SearchFn] = None,
+                          cache: Optional[FundContextCache] = None) -> Dict[str, Dict]:
+    """
+    Agrupa los contactos por fondo normalizado y calcula el contexto de cada
+    fondo una sola vez. Devuelve {fondo normalizado: contexto}.
+    """
+    cache = get_cache() if cache is None else cache
+    keys = df["Investors"].map(normalize_fund)
+    contexts, researched = {}, 0
+    for key, group in df.groupby(keys, sort=False):
+        if not key:
+            continue
+        entry = cache.get(key)
+        if entry is None:
+            entry = _build_entry(group.iloc[0].to_dict(), search)
+            cache.put(key, entry)
+            researched += 1
+        else:
+            api_metrics.record_cache_hit("fund_context")
+        contexts[key] = entry
+    if researched:
+        cache.save()
+    print(f"🏦 {len(contexts)} fondos para {len(df)} contactos "
+          f"({researched} investigados, {len(contexts) - researched} desde caché)")
+    return contexts
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Índice offline nombre -> (género, probabilidad) para no ir a Genderize por
+nombres que ya conocemos (en este dataset se repiten mucho los nombres
+árabes, turcos y persas).
+
+- build_index() junta la caché acumulada (genderize_cache.json) y listas de
+  nombres importables (CSV name,gender[,probability] o JSON con el formato
+  de la caché); las listas, en el orden dado, prevalecen sobre la caché.
+- El índice son tres arrays numpy ordenados por nombre: nombres en UTF-8
+  (bytes de ancho fijo), género en int8 y probabilidad en centésimas
+  (uint8). Cada búsqueda es un np.searchsorted: unos pocos microsegundos.
+- Cada nombre se guarda también sin acentos ("ömer" -> "omer") si esa
+  forma no existe ya, y la búsqueda prueba las dos formas.
+- honorifics.lookup_genders() lo consulta después de la caché y antes de la
+  API: solo los nombres desconocidos llegan a Genderize.
+
+Uso:
+    python gender_index.py --build                       # desde la caché
+    python gender_index.py --build --names nombres.csv   # + listas importadas
+    python gender_index.py --lookup Omar Fatima
+"""
+
+import argparse
+import json
+import os
+import time
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from honorifics import CACHE_FILE, load_cache, name_key
+
+INDEX_FILE = "gender_index.npz"
+
+GENDERS = (None, "male", "female")
+GENDER_CODES = {"male": 1, "m": 1, "female": 2, "f": 2}
+
+
+def fold_name(name: str) -> str:
+    """Nombre sin acentos ni diacríticos (NFKD sin marcas combinantes)."""
+    return "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+
+
+class GenderIndex:
+    """Arrays ordenados nombre / género / probabilidad con búsqueda binaria."""
+
+    def __init__(self, names: np.ndarray, genders: np.ndarray, probabilities: np.ndarray):
+        self.names = names
+        self.genders = genders
+        self.probabilities = probabilities
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def nbytes(self) -> int:
+        return self.names.nbytes + self.genders.nbytes + self.probabilities.nbytes
+
+    def _position(self, key: str) -> Optional[int]:
+        encoded = key.encode("utf-8")
+        i = int(np.searchsorted(self.names, encoded))
+        return i if i < len(self.names) and self.names[i] == encoded else None
+
+    def lookup(self, name: str) -> Optional[Tuple[Optional[str], float]]:
+        """(gender, probability) del nombre, o None si no está en el índice."""
+        key = name_key(name)
+        if not key or not len(self.names):
+            return None
+        i = self._position(key)
+        if i is None:
+            folded = fold_name(key)
+            i = self._position(folded) if folded != key else None
+        if i is None:
+            return None
+        return GENDERS[self.genders[i]], self.probabilities[i] / 100
+
+    def lookup_many(self, names: Iterable[str]) -> Dict[str, Tuple[Optional[str], float]]:
+        """{nombre: (gender, probability)} de los nombres que están en el índice."""
+        found = {}
+        for name in names:
+            entry = self.lookup(name)
+            if entry is not None:
+                found[name] = entry
+        return found
+
+    def save(self, path: str = INDEX_FILE):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, names=self.names, genders=self.genders, probabilities=self.probabilities)
+        os.replace(tmp_path, path)
+
+
+def _read_name_list(path: str) -> Dict[str, Dict]:
+    """Lista importable: CSV name,gender[,probability] (probabilidad 1.0 si falta) o JSON tipo caché."""
+    if path.lower().endswith(".json"):
+        with open(path, "r") as f:
+            return json.load(f)
+    df = pd.read_csv(path, dtype={"name": str, "gender": str})
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    probabilities = df["probability"] if "probability" in df.columns else pd.Series(1.0, index=df.index)
+    return {
+        name: {"gender": gender, "probability": probability}
+        for name, gender, probability in zip(df["name"], df["gender"], probabilities)
+        if isinstance(name, str)
+    }
+
+
+def _merge(entries: Dict[str, Tuple[int, int]], source: Dict[str, Dict]):
+    for name, entry in source.items():
+        key = name_key(name)
+        if not key:
+            continue
+        gender = GENDER_CODES.get(str(entry.get("gender") or "").strip().lower(), 0)
+        probability = float(entry.get("probability") or 0) if gender else 0.0
+        entries[key] = (gender, int(round(min(max(probability, 0.0), 1.0) * 100)))
+
+
+def build_index(cache: Optional[Dict[str, Dict]] = None, name_lists: Iterable[str] = ()) -> GenderIndex:
+    """Índice con la caché de Genderize y las listas (estas prevalecen, en orden)."""
+    entries: Dict[str, Tuple[int, int]] = {}
+    _merge(entries, load_cache() if cache is None else cache)
+    for path in name_lists:
+        _merge(entries, _read_name_list(path))
+    # Alias sin acentos, sin pisar nombres que ya existen con esa forma
+    for key, entry in list(entries.items()):
+        entries.setdefault(fold_name(key), entry)
+
+    keys = sorted(k.encode("utf-8") for k in entries)
+    values = [entries[k.decode("utf-8")] for k in keys]
+    return GenderIndex(
+        np.array(keys, dtype=bytes) if keys else np.array([], dtype="S1"),
+        np.array([v[0] for v in values], dtype=np.int8),
+        np.array([v[1] for v in values], dtype=np.uint8),
+    )
+
+
+def load_index(path: str = INDEX_FILE) -> Optional[GenderIndex]:
+    """El índice guardado por --build, o None si todavía no existe."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return GenderIndex(data["names"], data["genders"], data["probabilities"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice offline nombre -> género")
+    parser.add_argument("--build", action="store_true", help=f"Construir {INDEX_FILE} desde {CACHE_FILE}")
+    parser.add_argument("--names", nargs="*", default=[], help="Listas de nombres a importar (CSV o JSON)")
+    parser.add_argument("--lookup", nargs="*", default=[], help="Nombres a consultar")
+    args = parser.parse_args()
+
+    if args.build:
+        index = build_index(name_lists=args.names)
+        index.save()
+        print(f"✅ {INDEX_FILE}: {len(index):,} nombres en {index.nbytes / 1024:,.1f} KB")
+    else:
+        index = load_index()
+        if index is None:
+            print(f"⚠️ No existe {INDEX_FILE}: ejecuta python gender_index.py --build")
+            return
+
+    if args.lookup:
+        for name in args.lookup:
+            started = time.perf_counter()
+            entry = index.lookup(name)
+            elapsed_us = (time.perf_counter() - started) * 1e6
+            result = f"{entry[0]} ({entry[1]:.2f})" if entry else "desconocido"
+            print(f"   {name:<20} {result:<18} {elapsed_us:,.1f} µs")
+    elif len(index):
+        sample = [n.decode("utf-8") for n in index.names[:: max(1, len(index) // 1000)]]
+        started = time.perf_counter()
+        index.lookup_many(sample)
+        print(f"⏱️ {(time.perf_counter() - started) / len(sample) * 1e6:,.1f} µs por búsqueda")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
+import argparse
 import os
 import pandas as pd
-import requests
 import json
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
+
+import api_metrics
+from csv_storage import read_csv_versioned, update_rows
+from hook_prompts import build_hook_prompt, build_packed_prompt, count_tokens, email_context_for
+from llm_router import (
+    DEFAULT_ANTHROPIC_MODEL, DEFAULT_OPENAI_MODEL, LLMRouter, NoProviderAvailable, ProviderError,
+    format_stats, providers_from_env
+)
 
 # Configuración
 INPUT_FILE = "857-vc-funds-with-email-template.csv"
@@ -11,188 +21,227 @@ OUTPUT_FILE = "857-vc-funds-with-email-template.csv"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # export OPENAI_API_KEY="tu_key"
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")  # export ANTHROPIC_API_KEY="tu_key"
 
-# Usar OpenAI por defecto, pero puedes cambiar a Anthropic
-USE_OPENAI = True  # Cambiar a False para usar Anthropic
+# Proveedor preferido: el router usa todos los que tengan API key (ver llm_router.py)
+USE_OPENAI = True  # Cambiar a False para preferir Anthropic
 
-def generate_hook_openai(contact_data: dict, email_context: str) -> Optional[str]:
-    """Genera un hook personalizado usando OpenAI GPT-4."""
-    if not OPENAI_API_KEY:
-        return None
-    
-    prompt = f"""
-You are an expert in venture capital and networking. Your task is to create a personalized and specific phrase for a Middle East VC contact.
-
-CONTACT CONTEXT:
-- Name: {contact_data.get('Primary Contact', 'N/A')}
-- Title: {contact_data.get('Primary Contact Title', 'N/A')}
-- Fund: {contact_data.get('Investors', 'N/A')}
-- Location: {contact_data.get('HQ Location', 'N/A')}
-- Country: {contact_data.get('country', 'N/A')}
-- Preferred investment types: {contact_data.get('Preferred Investment Types', 'N/A')}
-- Preferred sectors: {contact_data.get('Preferred Verticals', 'N/A')}
-- Last investment: {contact_data.get('Last Investment Company', 'N/A')}
-- Investment geography: {contact_data.get('Preferred Geography', 'N/A')}
-- Industry focus: {contact_data.get('Preferred Industry', 'N/A')}
-- Fund description: {contact_data.get('Description', 'N/A')}
-
-EMAIL CONTEXT:
-{email_context}
-
-INSTRUCTIONS:
-1. Create ONE natural, conversational phrase to replace "your leadership at [fund] caught my attention"
-2. Focus on their professional journey, achievements, or career path
-3. Sound like a real person who researched their background
-4. Be complimentary and show genuine interest in their work
-5. Maximum 20 words
-6. Professional but personal tone
-7. RESPOND ONLY IN ENGLISH - no Spanish, Arabic, or other languages
-
-GOOD EXAMPLES:
-- "I followed your path from [previous company] to [current fund]"
-- "your recent ventures in the [specific industry] space caught my attention"
-- "your journey from [background] to [current role] is impressive"
-- "your track record at [previous company] caught my attention"
-- "your insights on [specific topic] particularly interested me"
-
-AVOID:
-- Generic statements about their "focus" or "expertise"
-- Obvious facts they already know about themselves
-- Robotic AI-sounding phrases
-- Statements that sound like you're stating the obvious
-
-RESPONSE: Only the phrase, no quotes or explanations. Make it sound natural and researched.
-"""
+# Modelos y parámetros (compartidos por el modo síncrono y el modo batch)
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL)
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", DEFAULT_ANTHROPIC_MODEL)
+HOOK_MAX_TOKENS = 50
+HOOK_TEMPERATURE = 0.7
+
+# Contactos por llamada en modo empaquetado (1 = una llamada por contacto)
+HOOKS_PER_CALL = 10
+# Hooks más largos que esto en la respuesta empaquetada se regeneran solos
+PACKED_MAX_WORDS = 30
+
+# Cada cuántos hooks se guardan en el CSV (solo las celdas nuevas, bajo lock)
+FLUSH_EVERY = 25
+
+def build_email_context(row) -> str:
+    """Contexto del email que acompaña al prompt (solo la frase donde va el hook)."""
+    return email_context_for(row)
 
+def clean_hook(text: str) -> str:
+    """Quita espacios y comillas que el modelo a veces agrega."""
+    return text.strip().strip('"').strip("'")
+
+def openai_request_body(prompt: str, max_tokens: int = HOOK_MAX_TOKENS) -> dict:
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": HOOK_TEMPERATURE
+    }
+
+def anthropic_request_body(prompt: str, max_tokens: int = HOOK_MAX_TOKENS) -> dict:
+    return {
+        "model": ANTHROPIC_MODEL,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": HOOK_TEMPERATURE
+    }
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router() -> LLMRouter:
+    """Router compartido con los proveedores configurados (USE_OPENAI decide el preferido)."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter(providers_from_env(prefer="openai" if USE_OPENAI else "anthropic"))
+        return _router
+
+def complete(prompt: str, max_tokens: int = HOOK_MAX_TOKENS) -> Optional[str]:
+    """Llama al LLM a través del router (reparto por cuota, failover y hedging)."""
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-4",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 50,
-                "temperature": 0.7
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            hook = result["choices"][0]["message"]["content"].strip()
-            # Limpiar comillas si las hay
-            hook = hook.strip('"').strip("'")
-            return hook
-        else:
-            print(f"Error OpenAI: {response.status_code} - {response.text}")
-            return None
-            
-    except Exception as e:
+        text, _ = get_router().complete(prompt, max_tokens, HOOK_TEMPERATURE)
+        return text
+    except (NoProviderAvailable, ProviderError) as e:
         print(f"Error generando hook: {e}")
         return None
 
-def generate_hook_anthropic(contact_data: dict, email_context: str) -> Optional[str]:
-    """Genera un hook personalizado usando Anthropic Claude."""
-    if not ANTHROPIC_API_KEY:
+def generate_hook(contact_data: dict, email_context: str) -> Optional[str]:
+    """Genera hook usando los LLM configurados."""
+    text = complete(build_hook_prompt(contact_data, email_context))
+    return clean_hook(text) if text else None
+
+def _generate_hook_on(provider_name: str, contact_data: dict, email_context: str) -> Optional[str]:
+    provider = next((p for p in get_router().providers if p.name == provider_name), None)
+    if provider is None:
         return None
-    
-    prompt = f"""
-You are an expert in venture capital and networking. Your task is to create a personalized and specific phrase for a Middle East VC contact.
-
-CONTACT CONTEXT:
-- Name: {contact_data.get('Primary Contact', 'N/A')}
-- Title: {contact_data.get('Primary Contact Title', 'N/A')}
-- Fund: {contact_data.get('Investors', 'N/A')}
-- Location: {contact_data.get('HQ Location', 'N/A')}
-- Country: {contact_data.get('country', 'N/A')}
-- Preferred investment types: {contact_data.get('Preferred Investment Types', 'N/A')}
-- Preferred sectors: {contact_data.get('Preferred Verticals', 'N/A')}
-- Last investment: {contact_data.get('Last Investment Company', 'N/A')}
-- Investment geography: {contact_data.get('Preferred Geography', 'N/A')}
-- Industry focus: {contact_data.get('Preferred Industry', 'N/A')}
-- Fund description: {contact_data.get('Description', 'N/A')}
-
-EMAIL CONTEXT:
-{email_context}
-
-INSTRUCTIONS:
-1. Create ONE natural, conversational phrase to replace "your leadership at [fund] caught my attention"
-2. Focus on their professional journey, achievements, or career path
-3. Sound like a real person who researched their background
-4. Be complimentary and show genuine interest in their work
-5. Maximum 20 words
-6. Professional but personal tone
-7. RESPOND ONLY IN ENGLISH - no Spanish, Arabic, or other languages
-
-GOOD EXAMPLES:
-- "I followed your path from [previous company] to [current fund]"
-- "your recent ventures in the [specific industry] space caught my attention"
-- "your journey from [background] to [current role] is impressive"
-- "your track record at [previous company] caught my attention"
-- "your insights on [specific topic] particularly interested me"
-
-AVOID:
-- Generic statements about their "focus" or "expertise"
-- Obvious facts they already know about themselves
-- Robotic AI-sounding phrases
-- Statements that sound like you're stating the obvious
-
-RESPONSE: Only the phrase, no quotes or explanations. Make it sound natural and researched.
-"""
+    # La etapa agrupa la espera de cuota y la llamada (medida también como llm.<proveedor>)
+    with api_metrics.track(f"generate_hook_{provider_name}", stage="hook"):
+        while not provider.try_acquire():
+            time.sleep(min(max(provider.next_free_in(), 0.05), 1.0))
+        try:
+            text = provider.complete(build_hook_prompt(contact_data, email_context), HOOK_MAX_TOKENS, HOOK_TEMPERATURE)
+        except ProviderError as e:
+            api_metrics.annotate(error=str(e))
+            print(f"Error generando hook: {e}")
+            return None
+    return clean_hook(text) if text else None
 
+def generate_hook_openai(contact_data: dict, email_context: str) -> Optional[str]:
+    """Genera el hook solo con OpenAI, sin failover (None si no hay OPENAI_API_KEY)."""
+    return _generate_hook_on("openai", contact_data, email_context)
+
+def generate_hook_anthropic(contact_data: dict, email_context: str) -> Optional[str]:
+    """Genera el hook solo con Anthropic, sin failover (None si no hay ANTHROPIC_API_KEY)."""
+    return _generate_hook_on("anthropic", contact_data, email_context)
+
+def stream_hook(contact_data: dict, email_context: str) -> Iterator[str]:
+    """
+    Igual que generate_hook pero entrega el texto a medida que llega (para
+    st.write_stream). El hook final es clean_hook("".join(fragmentos)).
+    """
+    return get_router().stream(build_hook_prompt(contact_data, email_context), HOOK_MAX_TOKENS, HOOK_TEMPERATURE)
+
+def parse_packed_hooks(text: Optional[str], count: int) -> List[Optional[str]]:
+    """
+    Valida la respuesta empaquetada: JSON con "hooks", ids 1..count en orden y
+    cada hook no vacío y de longitud razonable. Devuelve una lista de `count`
+    elementos; None marca los contactos que hay que regenerar uno a uno.
+    """
+    hooks = [None] * count
+    if not text:
+        return hooks
+    start, end = text.find("{"), text.rfind("}")
     try:
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": ANTHROPIC_API_KEY,
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01"
-            },
-            json={
-                "model": "claude-3-sonnet-20240229",
-                "max_tokens": 50,
-                "messages": [{"role": "user", "content": prompt}]
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            hook = result["content"][0]["text"].strip()
-            # Limpiar comillas si las hay
-            hook = hook.strip('"').strip("'")
-            return hook
-        else:
-            print(f"Error Anthropic: {response.status_code} - {response.text}")
-            return None
-            
-    except Exception as e:
-        print(f"Error generando hook: {e}")
-        return None
+        items = json.loads(text[start:end + 1])["hooks"]
+    except (ValueError, KeyError, TypeError):
+        return hooks
+    if not isinstance(items, list) or len(items) != count:
+        # Si falta o sobra alguno no se puede confiar en el orden
+        return hooks
+    for position, item in enumerate(items, 1):
+        if not isinstance(item, dict) or str(item.get("id")) != str(position):
+            return [None] * count
+        hook = item.get("hook")
+        if isinstance(hook, str) and hook.strip() and len(hook.split()) <= PACKED_MAX_WORDS:
+            hooks[position - 1] = clean_hook(hook)
+    return hooks
 
-def generate_hook(contact_data: dict, email_context: str) -> Optional[str]:
-    """Genera hook usando el LLM configurado."""
-    if USE_OPENAI:
-        return generate_hook_openai(contact_data, email_context)
+def generate_hooks_packed(contacts: List[dict], email_contexts: List[str]) -> Tuple[List[Optional[str]], dict]:
+    """
+    Genera los hooks de varios contactos con una sola llamada; los que fallan
+    la validación se regeneran con generate_hook (una llamada por contacto).
+
+    Returns:
+        (hooks en el mismo orden que contacts, {"calls": llamadas al LLM,
+        "prompt_tokens": tokens de prompt enviados})
+    """
+    if len(contacts) == 1:
+        prompt_tokens = count_tokens(build_hook_prompt(contacts[0], email_contexts[0]))
+        return [generate_hook(contacts[0], email_contexts[0])], {"calls": 1, "prompt_tokens": prompt_tokens}
+    
+    prompt = build_packed_prompt(contacts, email_contexts)
+    stats = {"calls": 1, "prompt_tokens": count_tokens(prompt)}
+    hooks = parse_packed_hooks(complete(prompt, HOOK_MAX_TOKENS * len(contacts) + 50), len(contacts))
+    for i, hook in enumerate(hooks):
+        if hook is None:
+            hooks[i] = generate_hook(contacts[i], email_contexts[i])
+            stats["calls"] += 1
+            stats["prompt_tokens"] += count_tokens(build_hook_prompt(contacts[i], email_contexts[i]))
+    return hooks, stats
+
+def batch_backend(args) -> Optional[str]:
+    """
+    Proveedor al que llamará de verdad el modo batch: run_local (--local)
+    siempre usa /chat/completions de OpenAI y --collect usa el del batch
+    guardado (ninguno si fue local). None si no se llama a ninguna API.
+    """
+    if args.collect:
+        import hook_batch
+        state = hook_batch.load_state() or {}
+        return None if state.get("local") else state.get("provider")
+    if args.local:
+        return "openai"
+    return "openai" if USE_OPENAI else "anthropic"
+
+def main_batch(args):
+    """Modo batch: JSONL en formato Batch API, envío, sondeo y fusión por clave de contacto."""
+    import hook_batch
+
+    provider = "openai" if USE_OPENAI else "anthropic"
+    if args.collect:
+        state = hook_batch.load_state()
+        if not state:
+            print(f"❌ No hay batch pendiente ({hook_batch.BATCH_STATE_FILE})")
+            return
     else:
-        return generate_hook_anthropic(contact_data, email_context)
+        state = hook_batch.submit(INPUT_FILE, provider, local=args.local)
+        if not state:
+            return
+
+    written = hook_batch.collect(state, wait=not args.no_wait)
+    if written is None:
+        print("⏳ Batch en curso. Recoge los resultados con: python generate_hooks.py --batch --collect")
+        return
+
+    print(f"\n✅ Batch completado:")
+    print(f"   - Hooks generados: {written}")
+    print(f"   - Archivo actualizado: {OUTPUT_FILE}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Genera Person_Hook para los contactos sin hook")
+    parser.add_argument("--pack", type=int, default=HOOKS_PER_CALL,
+                        help="Contactos por llamada al LLM (1 = una llamada por contacto)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Usar la Batch API del proveedor (más barato, sin latencia interactiva)")
+    parser.add_argument("--local", action="store_true",
+                        help="Con --batch: ejecutar el JSONL con el sustituto local en vez de enviarlo")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Con --batch: enviar y salir sin esperar los resultados")
+    parser.add_argument("--collect", action="store_true",
+                        help="Con --batch: recoger y fusionar el último batch enviado")
+    args = parser.parse_args()
+
     # Verificar API key
-    if USE_OPENAI and not OPENAI_API_KEY:
-        print("❌ OPENAI_API_KEY no configurada")
-        print("Ejecuta: export OPENAI_API_KEY='tu_key'")
-        return
+    if args.batch:
+        backend = batch_backend(args)
+        if backend == "openai" and not OPENAI_API_KEY:
+            print("❌ OPENAI_API_KEY no configurada")
+            print("Ejecuta: export OPENAI_API_KEY='tu_key'")
+            return
+        
+        if backend == "anthropic" and not ANTHROPIC_API_KEY:
+            print("❌ ANTHROPIC_API_KEY no configurada")
+            print("Ejecuta: export ANTHROPIC_API_KEY='tu_key'")
+            return
+        
+        return main_batch(args)
     
-    if not USE_OPENAI and not ANTHROPIC_API_KEY:
-        print("❌ ANTHROPIC_API_KEY no configurada")
-        print("Ejecuta: export ANTHROPIC_API_KEY='tu_key'")
+    router = get_router()
+    if not router.providers:
+        print("❌ No hay ningún proveedor de LLM configurado")
+        print("Ejecuta: export OPENAI_API_KEY='tu_key' y/o export ANTHROPIC_API_KEY='tu_key'")
         return
+    print(f"🔀 Proveedores: {', '.join(f'{p.name} ({p.model}, {p.rpm} RPM)' for p in router.providers)}")
     
     # Cargar datos
-    df = pd.read_csv(INPUT_FILE)
+    df, _ = read_csv_versioned(INPUT_FILE)
     
     # Filtrar solo los que no tienen hook personalizado
     empty_hooks = df[df["Person_Hook"].isna() | (df["Person_Hook"] == "")]
@@ -202,38 +251,60 @@ def main():
         return
     
     print(f"🔄 Generando hooks para {len(empty_hooks)} contactos...")
+    api_metrics.start_run("hooks")
     
-    # Generar hooks
+    # Generar hooks: K contactos por llamada, fallback individual para los que fallan
     generated_count = 0
-    for idx, row in empty_hooks.iterrows():
-        print(f"Procesando {row['Primary Contact']} - {row.get('Investors', 'N/A')}...")
-        
+    calls = 0
+    prompt_tokens = 0
+    started = time.monotonic()
+    updates = {}
+    pack_size = max(1, args.pack)
+    packs = [empty_hooks.iloc[start:start + pack_size] for start in range(0, len(empty_hooks), pack_size)]
+    
+    def run_pack(pack):
         # Crear contexto del email
-        email_context = f"""
-Subject: {row.get('Email_Subject', '')}
-Body: {row.get('Email_Body', '')}
-"""
-        
-        # Generar hook
-        hook = generate_hook(row.to_dict(), email_context)
-        
-        if hook:
-            df.at[idx, "Person_Hook"] = hook
-            df.at[idx, "Hook_Confidence"] = "8"  # Confianza alta para LLM
-            generated_count += 1
-            print(f"  ✅ Hook generado: {hook}")
-        else:
-            print(f"  ❌ Error generando hook")
-        
-        # Pausa más corta para ser más eficiente
-        time.sleep(0.5)
+        email_contexts = [build_email_context(row) for _, row in pack.iterrows()]
+        # Generar hooks
+        return generate_hooks_packed([row.to_dict() for _, row in pack.iterrows()], email_contexts)
+    
+    # Los paquetes se reparten entre los proveedores en paralelo (el router respeta las cuotas)
+    with ThreadPoolExecutor(max_workers=router.concurrency()) as pool:
+        futures = {pool.submit(run_pack, pack): pack for pack in packs}
+        for future in as_completed(futures):
+            pack = futures[future]
+            hooks, stats = future.result()
+            calls += stats["calls"]
+            prompt_tokens += stats["prompt_tokens"]
+            print(f"Paquete de {len(pack)} contactos · 📏 Prompt: {stats['prompt_tokens']} tokens "
+                  f"({stats['prompt_tokens'] // len(pack)} por contacto)")
+            
+            for idx, hook in zip(pack.index, hooks):
+                name = f"{pack.at[idx, 'Primary Contact']} - {pack.at[idx, 'Investors']}"
+                if hook:
+                    updates[idx] = {"Person_Hook": hook, "Hook_Confidence": "8"}  # Confianza alta para LLM
+                    generated_count += 1
+                    print(f"  ✅ {name}: {hook}")
+                else:
+                    print(f"  ❌ Error generando hook ({name})")
+            
+            # Guardado parcial: la UI puede seguir editando otras filas mientras tanto
+            if len(updates) >= FLUSH_EVERY:
+                update_rows(updates, OUTPUT_FILE)
+                updates = {}
     
     # Guardar resultados
-    df.to_csv(OUTPUT_FILE, index=False)
+    update_rows(updates, OUTPUT_FILE)
     
     print(f"\n✅ Proceso completado:")
     print(f"   - Hooks generados: {generated_count}")
+    print(f"   - Llamadas al LLM: {calls} ({pack_size} contactos por llamada)")
+    print(f"   - Tokens de prompt: {prompt_tokens} ({prompt_tokens // max(len(empty_hooks), 1)} por contacto)")
+    print(f"   - Tiempo total: {time.monotonic() - started:.1f}s")
     print(f"   - Archivo actualizado: {OUTPUT_FILE}")
+    print("   - Latencia por proveedor:")
+    print(format_stats(router.stats()))
+    api_metrics.finish_run()
 
 if __name__ == "__main__":
     main()
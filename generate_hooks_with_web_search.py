@@ -3,19 +3,40 @@ import pandas as pd
 import requests
 import json
 import time
-from typing import Optional
+from typing import Iterator, Optional
 import re
 
+import api_metrics
+from csv_storage import read_csv_versioned, update_rows
+from fund_context import fund_context, normalize_fund, prepare_fund_contexts
+from generate_hooks import clean_hook, get_router
+from hook_prompts import build_web_hook_prompt, email_context_for
+from llm_router import NoProviderAvailable, ProviderError
+from web_ranking import best_source_url, enough_results, rank_web_results
+
 # Configuración
 INPUT_FILE = "857-vc-funds-with-email-template.csv"
 OUTPUT_FILE = "857-vc-funds-with-email-template.csv"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")  # export SERPAPI_KEY="tu_key"
 BING_API_KEY = os.getenv("BING_API_KEY")  # export BING_API_KEY="tu_key"
+# Endpoints sobrescribibles (p. ej. el mock local de mock_api_server.py)
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+BING_SEARCH_URL = os.getenv("BING_SEARCH_URL", "https://api.bing.microsoft.com/v7.0/search")
+
+# Parámetros del hook con contexto web (más creatividad para sonar natural)
+WEB_HOOK_MAX_TOKENS = 50
+WEB_HOOK_TEMPERATURE = 0.8
 
 # Usar SerpAPI por defecto (más confiable), pero puedes cambiar a Bing
 USE_SERPAPI = True  # Cambiar a False para usar Bing
 
+# Resultados pedidos por consulta (se deduplican y ordenan antes del prompt)
+RESULTS_PER_QUERY = 3
+
+# Cada cuántos hooks se guardan en el CSV (solo las celdas nuevas, bajo lock)
+FLUSH_EVERY = 10
+
+@api_metrics.instrument("search.serpapi")
 def search_web_serpapi(query: str, num_results: int = 3) -> list[dict]:
     """Busca información en web usando SerpAPI."""
     if not SERPAPI_KEY:
@@ -29,7 +50,8 @@ def search_web_serpapi(query: str, num_results: int = 3) -> list[dict]:
             "engine": "google"
         }
         
-        response = requests.get("https://serpapi.com/search", params=params, timeout=10)
+        response = requests.get(SERPAPI_URL, params=params, timeout=10)
+        api_metrics.annotate(status=response.status_code)
         
         if response.status_code == 200:
             data = response.json()
@@ -50,8 +72,10 @@ def search_web_serpapi(query: str, num_results: int = 3) -> list[dict]:
             
     except Exception as e:
         print(f"Error en búsqueda web: {e}")
+        api_metrics.annotate(error=str(e))
         return []
 
+@api_metrics.instrument("search.bing")
 def search_web_bing(query: str, num_results: int = 3) -> list[dict]:
     """Busca información en web usando Bing Search API."""
     if not BING_API_KEY:
@@ -66,11 +90,12 @@ def search_web_bing(query: str, num_results: int = 3) -> list[dict]:
         }
         
         response = requests.get(
-            "https://api.bing.microsoft.com/v7.0/search",
+            BING_SEARCH_URL,
             headers=headers,
             params=params,
             timeout=10
         )
+        api_metrics.annotate(status=response.status_code)
         
         if response.status_code == 200:
             data = response.json()
@@ -91,6 +116,7 @@ def search_web_bing(query: str, num_results: int = 3) -> list[dict]:
             
     except Exception as e:
         print(f"Error en búsqueda web: {e}")
+        api_metrics.annotate(error=str(e))
         return []
 
 def search_web(query: str, num_results: int = 3) -> list[dict]:
@@ -100,14 +126,15 @@ def search_web(query: str, num_results: int = 3) -> list[dict]:
     else:
         return search_web_bing(query, num_results)
 
-def generate_hook_with_web_context(contact_data: dict, email_context: str) -> tuple[Optional[str], str, str]:
+def search_contact_web(contact_data: dict) -> tuple[list[dict], str]:
     """
-    Genera un hook personalizado usando información de web search.
-    Retorna: (hook, source_url, confidence)
+    Busca información del contacto en la web. Las búsquedas que solo dependen
+    del fondo (portfolio) se hacen una vez por fondo en fund_context.py.
+    Las consultas van de la más productiva a la menos y se corta en cuanto hay
+    WEB_RESULTS_IN_PROMPT resultados buenos; al final se deduplican y ordenan
+    por relevancia (web_ranking.py).
+    Retorna: (mejores resultados, url del mejor resultado)
     """
-    if not OPENAI_API_KEY:
-        return None, "", ""
-    
     # Crear query de búsqueda
     fund_name = contact_data.get('Investors', '')
     person_name = contact_data.get('Primary Contact', '')
@@ -115,116 +142,75 @@ def generate_hook_with_web_context(contact_data: dict, email_context: str) -> tu
     
     # Query principal: buscar información sobre la trayectoria profesional
     search_queries = [
-        f'"{person_name}" "{person_title}" career background experience',
         f'"{person_name}" "{fund_name}" interview profile biography',
+        f'"{person_name}" "{person_title}" career background experience',
         f'"{person_name}" previous companies career path',
         f'"{fund_name}" "{person_name}" recent achievements awards',
-        f'"{person_name}" "{person_title}" speaking events conferences',
-        f'"{fund_name}" recent portfolio companies investments 2024'
+        f'"{person_name}" "{person_title}" speaking events conferences'
     ]
     
     web_results = []
-    source_url = ""
     
     # Buscar información web
-    for query in search_queries:
-        if query.strip():
-            results = search_web(query, 2)
-            web_results.extend(results)
-            if results and not source_url:
-                source_url = results[0].get("url", "")
-        
-        time.sleep(1)  # Pausa entre búsquedas
-    
-    # Crear contexto web
-    web_context = ""
-    if web_results:
-        web_context = "RECENT WEB INFORMATION:\n"
-        for i, result in enumerate(web_results[:3], 1):
-            web_context += f"{i}. {result['title']}\n"
-            web_context += f"   {result['snippet']}\n"
-            web_context += f"   Source: {result['url']}\n\n"
+    for i, query in enumerate(search_queries):
+        if i:
+            time.sleep(1)  # Pausa entre búsquedas
+        web_results.extend(search_web(query, RESULTS_PER_QUERY))
+        if enough_results(web_results, person_name, fund_name):
+            break
     
-    # Prompt mejorado con contexto web
-    prompt = f"""
-You are an expert in venture capital and networking. Create a personalized, natural-sounding phrase for a Middle East VC contact based on REAL, RECENT information.
-
-CONTACT INFO:
-- Name: {contact_data.get('Primary Contact', 'N/A')}
-- Title: {contact_data.get('Primary Contact Title', 'N/A')}
-- Fund: {contact_data.get('Investors', 'N/A')}
-- Location: {contact_data.get('HQ Location', 'N/A')}
-- Country: {contact_data.get('country', 'N/A')}
-
-{web_context}
+    ranked = rank_web_results(web_results, person_name, fund_name)
+    return ranked, best_source_url(ranked)
 
-EMAIL CONTEXT:
-{email_context}
-
-INSTRUCTIONS:
-1. Create ONE natural, conversational phrase to replace "your leadership at [fund] caught my attention"
-2. Use the WEB INFORMATION above to make it specific and personal
-3. Sound like a real person who actually researched this contact's CAREER and ACHIEVEMENTS
-4. Focus on their professional journey, achievements, or recent activities
-5. Be complimentary and show genuine interest in their work
-6. Maximum 20 words
-7. Professional but personal tone
-8. ENGLISH ONLY
-
-GOOD EXAMPLES (based on real info):
-- "I followed your path from [previous company] to [current fund]"
-- "your recent ventures in the [specific industry] space caught my attention"
-- "your insights on [specific topic] in [publication/interview] resonated with me"
-- "your journey from [background] to [current role] is impressive"
-- "your recent comments on [specific trend] particularly interested me"
-- "your track record at [previous company] caught my attention"
+def build_contact_prompt(contact_data: dict, email_context: str,
+                         fund: Optional[dict] = None) -> tuple[str, str, str]:
+    """
+    Búsquedas del contacto + resumen compartido de su fondo (de la caché si
+    ya se investigó ese fondo).
+    Retorna: (prompt, source_url, confidence)
+    """
+    fund = fund or fund_context(contact_data, search_web)
+    web_results, source_url = search_contact_web(contact_data)
+    prompt = build_web_hook_prompt(contact_data, web_results, email_context, fund.get("summary"))
+    # Confianza según si encontramos info web del contacto o de su fondo
+    confidence = "9" if web_results or fund.get("web_results") else "6"
+    return prompt, source_url or fund.get("source_url", ""), confidence
 
-AVOID:
-- Generic statements about their "focus" or "expertise"
-- Obvious facts they already know about themselves
-- Robotic AI-sounding phrases
-- Statements that sound like you're stating the obvious
+def generate_hook_with_web_context(contact_data: dict, email_context: str,
+                                   fund: Optional[dict] = None) -> tuple[Optional[str], str, str]:
+    """
+    Genera un hook personalizado usando información de web search.
+    fund: contexto del fondo ya preparado (prepare_fund_contexts); si falta se busca en la caché.
+    Va por el mismo router que stream_hook_with_web_context (cuotas, failover y modelo).
+    Retorna: (hook, source_url, confidence)
+    """
+    if not get_router().providers:
+        return None, "", ""
 
-RESPONSE: Only the phrase, no quotes or explanations. Make it sound like a real person who researched their career.
-"""
+    # Prompt con contexto web (fragmentos recortados a su presupuesto de tokens)
+    prompt, source_url, confidence = build_contact_prompt(contact_data, email_context, fund)
 
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-4",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 50,
-                "temperature": 0.8  # Más creatividad para sonar natural
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            hook = result["choices"][0]["message"]["content"].strip()
-            hook = hook.strip('"').strip("'")
-            
-            # Determinar confianza basada en si encontramos info web
-            confidence = "9" if web_results else "6"
-            
-            return hook, source_url, confidence
-        else:
-            print(f"Error OpenAI: {response.status_code}")
-            return None, "", ""
-            
-    except Exception as e:
+        text, _ = get_router().complete(prompt, WEB_HOOK_MAX_TOKENS, WEB_HOOK_TEMPERATURE)
+    except (NoProviderAvailable, ProviderError) as e:
         print(f"Error generando hook: {e}")
         return None, "", ""
+    hook = clean_hook(text) if text else None
+    return (hook, source_url, confidence) if hook else (None, "", "")
+
+def stream_hook_with_web_context(contact_data: dict, email_context: str) -> tuple[Iterator[str], str, str]:
+    """
+    Variante en streaming de generate_hook_with_web_context: hace las búsquedas
+    y devuelve un generador con el texto del hook a medida que llega.
+    Retorna: (fragmentos, source_url, confidence)
+    """
+    prompt, source_url, confidence = build_contact_prompt(contact_data, email_context)
+    return get_router().stream(prompt, WEB_HOOK_MAX_TOKENS, WEB_HOOK_TEMPERATURE), source_url, confidence
 
 def main():
-    # Verificar API keys
-    if not OPENAI_API_KEY:
-        print("❌ OPENAI_API_KEY no configurada")
+    # Verificar API keys (el router usa OPENAI_API_KEY y/o ANTHROPIC_API_KEY)
+    if not get_router().providers:
+        print("❌ Ni OPENAI_API_KEY ni ANTHROPIC_API_KEY están configuradas")
         return
     
     if USE_SERPAPI and not SERPAPI_KEY:
@@ -238,7 +224,7 @@ def main():
         return
     
     # Cargar datos
-    df = pd.read_csv(INPUT_FILE)
+    df, _ = read_csv_versioned(INPUT_FILE)
     
     # Filtrar solo los que no tienen hook personalizado
     empty_hooks = df[df["Person_Hook"].isna() | (df["Person_Hook"] == "")]
@@ -249,25 +235,26 @@ def main():
     
     print(f"🔄 Generando hooks con búsqueda web para {len(empty_hooks)} contactos...")
     print("⚠️ Esto tomará más tiempo debido a las búsquedas web...")
+    api_metrics.start_run("hooks_web")
+    
+    # Contexto de cada fondo una sola vez (y desde caché si ya se investigó)
+    fund_contexts = prepare_fund_contexts(empty_hooks, search_web)
     
     # Generar hooks
     generated_count = 0
+    updates = {}
     for idx, row in empty_hooks.iterrows():
         print(f"Procesando {row['Primary Contact']} - {row.get('Investors', 'N/A')}...")
         
         # Crear contexto del email
-        email_context = f"""
-Subject: {row.get('Email_Subject', '')}
-Body: {row.get('Email_Body', '')}
-"""
+        email_context = email_context_for(row)
         
         # Generar hook con búsqueda web
-        hook, source_url, confidence = generate_hook_with_web_context(row.to_dict(), email_context)
+        fund = fund_contexts.get(normalize_fund(row.get('Investors')))
+        hook, source_url, confidence = generate_hook_with_web_context(row.to_dict(), email_context, fund)
         
         if hook:
-            df.at[idx, "Person_Hook"] = hook
-            df.at[idx, "Hook_Source_URL"] = source_url
-            df.at[idx, "Hook_Confidence"] = confidence
+            updates[idx] = {"Person_Hook": hook, "Hook_Source_URL": source_url, "Hook_Confidence": confidence}
             generated_count += 1
             print(f"  ✅ Hook generado: {hook}")
             if source_url:
@@ -275,15 +262,21 @@ Body: {row.get('Email_Body', '')}
         else:
             print(f"  ❌ Error generando hook")
         
+        # Guardado parcial: la UI puede seguir editando otras filas mientras tanto
+        if len(updates) >= FLUSH_EVERY:
+            update_rows(updates, OUTPUT_FILE)
+            updates = {}
+        
         # Pausa más larga para no sobrecargar APIs
         time.sleep(2)
     
     # Guardar resultados
-    df.to_csv(OUTPUT_FILE, index=False)
+    update_rows(updates, OUTPUT_FILE)
     
     print(f"\n✅ Proceso completado:")
     print(f"   - Hooks generados: {generated_count}")
     print(f"   - Archivo actualizado: {OUTPUT_FILE}")
+    api_metrics.finish_run()
 
 if __name__ == "__main__":
     main()
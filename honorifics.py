@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Resolución de honoríficos compartida por add_honorifics.py y
+enrich_gender_honorifics.py (antes cada script tenía su propia versión, con
+regex ligeramente distintas, y ambos consultaban Genderize por los mismos
+nombres).
+
+resolve_honorifics(first_names, titles, cache) aplica por capas, una sola vez
+por par (nombre, título) distinto:
+  1. Título: TITLE_RE (Dr. > títulos regionales > Mr. > Ms.).
+  2. Caché de género compartida (CACHE_FILE), con los nombres ya consultados,
+     también los que Genderize no supo resolver.
+  3. Índice offline (gender_index.py, opcional): caché histórica + listas
+     de nombres importadas, en arrays ordenados.
+  4. Genderize en lotes de BATCH_SIZE nombres (name[]=...) solo para los
+     nombres que no están en ninguna de las anteriores; las respuestas se
+     guardan en la caché.
+
+También están aquí split_name / build_salutation y sus versiones
+vectorizadas (split_names, honorifics_from_titles, build_salutations).
+"""
+
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+
+import api_metrics
+from csv_storage import atomic_open, file_lock
+
+CACHE_FILE = "genderize_cache.json"
+GENDERIZE_KEY = os.getenv("GENDERIZE_KEY")  # export GENDERIZE_KEY="..."
+GENDERIZE_URL = os.getenv("GENDERIZE_URL", "https://api.genderize.io")
+
+# Probabilidad mínima para aceptar el género inferido
+PROB_THRESHOLD = 0.85
+# Nombres por request (límite de Genderize) y pausa entre requests
+BATCH_SIZE = 10
+SLEEP_SECONDS = 0.25
+
+TITLE_COLUMNS = {"primary contact title", "contact title", "title"}
+
+# Las reglas de título en un solo regex: cada alternativa es un lookahead
+# anclado al inicio, así gana la primera regla que encaje (no la primera
+# palabra del título). Los títulos regionales (Sheikh, H.E.) no se mapean a
+# Mr./Ms. por título: quedan para la capa de género o revisión manual.
+TITLE_RE = re.compile(
+    r"^(?:(?=.*?\b(?P<dr>dr|doctor)\b)"
+    r"|(?=.*?\b(?P<regional>sheikh|shaikh|h\.e\.|his excellency|her excellency)\b)"
+    r"|(?=.*?\b(?P<mr>mr)\b)"
+    r"|(?=.*?\b(?P<ms>ms|mrs|madam|miss)\b))",
+    re.S,
+)
+HONORIFIC_BY_GROUP = {"dr": "Dr.", "regional": "", "mr": "Mr.", "ms": "Ms."}
+
+SOURCE_TITLE, SOURCE_CACHE, SOURCE_INDEX, SOURCE_API = "title", "cache", "index", "genderize"
+
+
+# --- Reglas fila a fila (referencia de las versiones vectorizadas) ---
+
+def split_name(full_name: str):
+    if not isinstance(full_name, str) or not full_name.strip():
+        return "", ""
+    parts = re.sub(r",.*$", "", full_name).split()
+    if not parts:
+        return "", ""
+    return parts[0], " ".join(parts[1:])
+
+
+def honorific_from_title(title: str) -> str:
+    if not isinstance(title, str):
+        return ""
+    match = TITLE_RE.search(title.lower())
+    if not match:
+        return ""
+    return next(HONORIFIC_BY_GROUP[g] for g in HONORIFIC_BY_GROUP if match.group(g) is not None)
+
+
+def honorific_from_gender(gender: Optional[str], probability: float) -> str:
+    if gender and probability >= PROB_THRESHOLD:
+        return "Ms." if gender == "female" else "Mr."
+    return ""
+
+
+def build_salutation(honorific, first_name, last_name, full_name):
+    # Preferimos: Dear {Honorific} {Last Name},
+    if honorific and last_name:
+        return f"Dear {honorific} {last_name},"
+    # Fallbacks respetuosos si no hay honorific claro
+    if last_name:
+        return f"Dear {last_name},"
+    if full_name:
+        return f"Dear {full_name},"
+    return "Dear Sir or Madam,"
+
+
+# --- Versiones vectorizadas ---
+
+def distinct_values(values: pd.Series):
+    """(códigos, valores distintos): se calcula una vez por valor y se reexpande con expand_distinct."""
+    codes, uniques = pd.factorize(values.astype(object))
+    # El código -1 (celda vacía) apunta al NaN añadido al final
+    return codes, pd.Series(list(uniques) + [np.nan], dtype=object)
+
+
+def expand_distinct(result, codes, index) -> pd.Series:
+    return pd.Series(np.asarray(result, dtype=object)[codes], index=index, dtype=object)
+
+
+def _strings(values: pd.Series) -> pd.Series:
+    # Solo las celdas de texto; el resto (NaN, números) queda como NaN
+    return values.where([isinstance(v, str) for v in values])
+
+
+def split_names(full_names: pd.Series):
+    """split_name() vectorizado: (First Name, Last Name) de toda la columna."""
+    codes, names = distinct_values(full_names)
+    parts = _strings(names).str.replace(r",.*$", "", regex=True).str.strip().str.split(n=1)
+    first = parts.str[0].fillna("")
+    # " ".join(parts[1:]) deja un solo espacio entre palabras
+    last = parts.str[1].fillna("").str.replace(r"\s+", " ", regex=True)
+    return expand_distinct(first, codes, full_names.index), expand_distinct(last, codes, full_names.index)
+
+
+def honorifics_from_titles(titles: pd.Series) -> pd.Series:
+    """honorific_from_title() vectorizado con TITLE_RE."""
+    codes, distinct = distinct_values(titles)
+    groups = _strings(distinct).str.lower().str.extract(TITLE_RE)
+    honorific = np.select([groups[g].notna() for g in HONORIFIC_BY_GROUP],
+                          list(HONORIFIC_BY_GROUP.values()), default="")
+    return expand_distinct(honorific, codes, titles.index)
+
+
+def _truthy(values: pd.Series):
+    # bool() de cada celda, como los `if` de build_salutation (NaN cuenta como verdadero)
+    return np.asarray(values, dtype=object).astype(bool)
+
+
+def _text(values: pd.Series) -> pd.Series:
+    # str() de cada celda, como el f-string (NaN -> "nan")
+    return values.astype(str).fillna("nan")
+
+
+def build_salutations(honorific: pd.Series, first_name: pd.Series, last_name: pd.Series,
+                      full_name: pd.Series) -> pd.Series:
+    """build_salutation() vectorizado con np.select (mismas reglas, mismo orden)."""
+    has_honorific, has_last, has_full = _truthy(honorific), _truthy(last_name), _truthy(full_name)
+    honorific, last_name, full_name = _text(honorific), _text(last_name), _text(full_name)
+    salutation = np.select(
+        [has_honorific & has_last, has_last, has_full],
+        [np.asarray("Dear " + honorific + " " + last_name + ",", dtype=object),
+         np.asarray("Dear " + last_name + ",", dtype=object),
+         np.asarray("Dear " + full_name + ",", dtype=object)],
+        default="Dear Sir or Madam,",
+    )
+    return pd.Series(salutation, index=full_name.index, dtype=object)
+
+
+# --- Caché de género y Genderize ---
+
+def load_cache(path: str = CACHE_FILE) -> Dict[str, Dict]:
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                return json.load(f)
+            except Exception:
+                return {}
+    return {}
+
+
+def save_cache(cache: Dict[str, Dict], path: str = CACHE_FILE):
+    # Lock: add_honorifics.py y enrich_gender_honorifics.py comparten el archivo
+    with file_lock(path), atomic_open(path, suffix=".tmp") as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+
+
+def name_key(first_name) -> str:
+    return first_name.strip().lower() if isinstance(first_name, str) else ""
+
+
+def genderize_batch(names: List[str]) -> Dict[str, Dict]:
+    """Una request a Genderize con hasta BATCH_SIZE nombres; {} si falla."""
+    try:
+        with api_metrics.track("genderize", names=len(names)):
+            r = requests.get(GENDERIZE_URL, params={"name[]": names, "apikey": GENDERIZE_KEY}, timeout=10)
+            api_metrics.annotate(status=r.status_code)
+            r.raise_for_status()
+        data = r.json() or []
+    except Exception:  # track() ya registró el error; se reintentará en la próxima ejecución
+        return {}
+    if isinstance(data, dict):
+        data = [data]
+    # Genderize responde en el mismo orden en que se enviaron los nombres
+    return {name: {"gender": entry.get("gender"), "probability": float(entry.get("probability") or 0)}
+            for name, entry in zip(names, data) if isinstance(entry, dict)}
+
+
+def lookup_genders(names: Iterable[str], cache: Dict[str, Dict], use_api: bool = True,
+                   index=None) -> Dict[str, Tuple[Optional[str], float, str]]:
+    """
+    Género de cada nombre (ya normalizado con name_key): primero la caché,
+    después el índice offline (gender_index.GenderIndex, si se pasa) y, para
+    el resto, Genderize en lotes. Las respuestas nuevas se añaden a `cache`.
+
+    Returns:
+        {nombre: (gender, probability, fuente)} de los nombres resueltos
+    """
+    found, missing = {}, []
+    for name in dict.fromkeys(n for n in names if n):
+        if name in cache:
+            api_metrics.record_cache_hit("genderize")
+            entry = cache[name]
+            found[name] = (entry.get("gender"), float(entry.get("probability") or 0), SOURCE_CACHE)
+        else:
+            missing.append(name)
+
+    if missing and index is not None:
+        for name, (gender, probability) in index.lookup_many(missing).items():
+            api_metrics.record_cache_hit("gender_index")
+            found[name] = (gender, probability, SOURCE_INDEX)
+        missing = [name for name in missing if name not in found]
+
+    if missing and use_api and GENDERIZE_KEY:
+        for start in range(0, len(missing), BATCH_SIZE):
+            answered = genderize_batch(missing[start:start + BATCH_SIZE])
+            cache.update(answered)
+            for name, entry in answered.items():
+                found[name] = (entry["gender"], entry["probability"], SOURCE_API)
+            time.sleep(SLEEP_SECONDS)  # cortesía para rate limit
+    return found
+
+
+def resolve_honorifics(first_names: pd.Series, titles: Optional[pd.Series] = None,
+                       cache: Optional[Dict[str, Dict]] = None, use_api: bool = True,
+                       index=None) -> pd.DataFrame:
+    """
+    Honorific de cada fila por capas (título -> caché -> índice offline ->
+    Genderize), calculado una vez por par (nombre, título) distinto.
+
+    Returns:
+        DataFrame con el índice de `first_names` y las columnas Honorific,
+        Honorific_Source ("title", "cache", "index", "genderize" o "") y
+        Gender_Probability (1.0 si viene del título)
+    """
+    cache = {} if cache is None else cache
+    keys = [name_key(n) for n in first_names]
+    title_values = [""] * len(keys) if titles is None else _strings(titles.astype(object)).fillna("").tolist()
+    codes, pairs = pd.factorize(pd.Series(list(zip(keys, title_values)), dtype=object))
+    distinct = pd.DataFrame(list(pairs), columns=["key", "title"])
+
+    honorific = honorifics_from_titles(distinct["title"])
+    source = np.where(honorific != "", SOURCE_TITLE, "").astype(object)
+    probability = np.where(honorific != "", 1.0, 0.0)
+
+    pending = (honorific == "").to_numpy()
+    genders = lookup_genders(distinct.loc[pending, "key"], cache, use_api, index)
+    for i in np.flatnonzero(pending):
+        gender, prob, origin = genders.get(distinct.at[i, "key"], (None, 0.0, ""))
+        probability[i] = prob
+        honorific.iat[i] = honorific_from_gender(gender, prob)
+        source[i] = origin if honorific.iat[i] else ""
+
+    return pd.DataFrame({
+        "Honorific": np.asarray(honorific, dtype=object)[codes],
+        "Honorific_Source": source[codes],
+        "Gender_Probability": probability[codes],
+    }, index=first_names.index)
+
+
+# --- Utilidades de los scripts ---
+
+def find_title_column(df: pd.DataFrame) -> Optional[str]:
+    for c in df.columns:
+        if str(c).strip().lower() in TITLE_COLUMNS:
+            return c
+    return None
+
+
+def print_summary(resolved: pd.DataFrame):
+    honorific = resolved["Honorific"]
+    print("=== Honorific assignment summary ===")
+    print(f"Total contacts: {len(resolved)}")
+    print(f"Ms.: {(honorific == 'Ms.').sum()}")
+    print(f"Mr.: {(honorific == 'Mr.').sum()}")
+    print(f"Dr.: {(honorific == 'Dr.').sum()}")
+    print(f"Unknown / needs review: {(honorific == '').sum()}")
+    sources = resolved.loc[honorific != "", "Honorific_Source"].value_counts()
+    if not sources.empty:
+        print("By source: " + ", ".join(f"{name} {count}" for name, count in sources.items()))
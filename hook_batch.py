@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Modo batch de generate_hooks.py: regeneración masiva de hooks sin latencia interactiva.
+
+1. Escribe un prompt por contacto en un JSONL con el formato de la Batch API
+   del proveedor (custom_id = clave del contacto).
+2. Lo envía (OpenAI /v1/batches o Anthropic /v1/messages/batches) o lo
+   ejecuta con el sustituto local (mismo formato de salida, llamadas síncronas).
+3. Consulta el estado, descarga los resultados y los fusiona en
+   Person_Hook / Hook_Confidence por clave de contacto, con update_rows.
+
+El estado del último batch se guarda en BATCH_STATE_FILE, así se puede enviar
+hoy (--no-wait) y recoger mañana (--collect).
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+import requests
+
+from csv_storage import atomic_open, read_csv_versioned, update_rows
+from llm_router import ANTHROPIC_BASE_URL, OPENAI_BASE_URL
+from generate_hooks import (
+    ANTHROPIC_API_KEY, OPENAI_API_KEY, anthropic_request_body, build_email_context,
+    build_hook_prompt, clean_hook, openai_request_body
+)
+
+BATCH_DIR = "hook_batches"
+BATCH_STATE_FILE = os.path.join(BATCH_DIR, "batch_state.json")
+POLL_SECONDS = 60
+BATCH_CONFIDENCE = "8"  # Misma confianza que el modo síncrono
+
+OPENAI_API_URL = OPENAI_BASE_URL
+ANTHROPIC_API_URL = ANTHROPIC_BASE_URL
+CHAT_ENDPOINT = "/v1/chat/completions"
+
+# Estados finales de cada proveedor
+OPENAI_DONE = {"completed", "failed", "expired", "cancelled"}
+ANTHROPIC_DONE = {"ended"}
+
+
+def contact_key(row) -> str:
+    """
+    Clave estable del contacto: email + fondo (el email solo se repite entre fondos).
+    Apta como custom_id en ambos proveedores (^[a-zA-Z0-9_-]{1,64}$).
+    """
+    email = str(row.get("Primary Contact Email", "") or "").strip().lower()
+    fund = str(row.get("Investors", "") or "").strip().lower()
+    return "c-" + hashlib.sha1(f"{email}|{fund}".encode("utf-8")).hexdigest()[:24]
+
+
+def pending_contacts(df: pd.DataFrame) -> pd.DataFrame:
+    """Contactos sin hook personalizado (igual que el modo síncrono)."""
+    return df[df["Person_Hook"].isna() | (df["Person_Hook"] == "")]
+
+
+def build_batch_requests(df: pd.DataFrame, provider: str = "openai") -> Iterator[Dict]:
+    """Una línea de Batch API por contacto."""
+    for _, row in df.iterrows():
+        prompt = build_hook_prompt(row.to_dict(), build_email_context(row))
+        if provider == "openai":
+            yield {
+                "custom_id": contact_key(row),
+                "method": "POST",
+                "url": CHAT_ENDPOINT,
+                "body": openai_request_body(prompt),
+            }
+        else:
+            yield {"custom_id": contact_key(row), "params": anthropic_request_body(prompt)}
+
+
+def write_batch_file(df: pd.DataFrame, provider: str = "openai", path: Optional[str] = None) -> str:
+    """Escribe el JSONL del batch y devuelve su ruta."""
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    path = path or os.path.join(BATCH_DIR, f"hooks-{provider}-{datetime.now():%Y%m%d-%H%M%S}.jsonl")
+    with atomic_open(path, suffix=".tmp") as f:
+        for request in build_batch_requests(df, provider):
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def _read_jsonl(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_state(state: Dict):
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    with atomic_open(BATCH_STATE_FILE, suffix=".tmp") as f:
+        json.dump(state, f, indent=2)
+
+
+def load_state() -> Optional[Dict]:
+    if not os.path.exists(BATCH_STATE_FILE):
+        return None
+    with open(BATCH_STATE_FILE, "r") as f:
+        return json.load(f)
+
+
+# --- OpenAI Batch API ---
+
+def _openai_headers() -> Dict:
+    return {"Authorization": f"Bearer {OPENAI_API_KEY}"}
+
+
+def submit_openai(batch_file: str) -> str:
+    """Sube el JSONL (purpose=batch) y crea el batch. Devuelve el id del batch."""
+    with open(batch_file, "rb") as f:
+        upload = requests.post(
+            f"{OPENAI_API_URL}/files",
+            headers=_openai_headers(),
+            data={"purpose": "batch"},
+            files={"file": (os.path.basename(batch_file), f, "application/jsonl")},
+            timeout=300
+        )
+    upload.raise_for_status()
+    response = requests.post(
+        f"{OPENAI_API_URL}/batches",
+        headers=_openai_headers(),
+        json={
+            "input_file_id": upload.json()["id"],
+            "endpoint": CHAT_ENDPOINT,
+            "completion_window": "24h",
+        },
+        timeout=60
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def status_openai(batch_id: str) -> Dict:
+    response = requests.get(f"{OPENAI_API_URL}/batches/{batch_id}", headers=_openai_headers(), timeout=60)
+    response.raise_for_status()
+    batch = response.json()
+    return {"status": batch["status"], "done": batch["status"] in OPENAI_DONE,
+            "output_file_id": batch.get("output_file_id"), "counts": batch.get("request_counts")}
+
+
+def download_openai(output_file_id: str) -> List[Dict]:
+    response = requests.get(
+        f"{OPENAI_API_URL}/files/{output_file_id}/content", headers=_openai_headers(), timeout=300
+    )
+    response.raise_for_status()
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def parse_openai_results(lines: List[Dict]) -> Dict[str, str]:
+    hooks = {}
+    for line in lines:
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            continue
+        content = response["body"]["choices"][0]["message"]["content"]
+        if content and content.strip():
+            hooks[line["custom_id"]] = clean_hook(content)
+    return hooks
+
+
+# --- Anthropic Message Batches API ---
+
+def _anthropic_headers() -> Dict:
+    return {"x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01"}
+
+
+def submit_anthropic(batch_file: str) -> str:
+    response = requests.post(
+        f"{ANTHROPIC_API_URL}/messages/batches",
+        headers=_anthropic_headers(),
+        json={"requests": _read_jsonl(batch_file)},
+        timeout=300
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def status_anthropic(batch_id: str) -> Dict:
+    response = requests.get(
+        f"{ANTHROPIC_API_URL}/messages/batches/{batch_id}", headers=_anthropic_headers(), timeout=60
+    )
+    response.raise_for_status()
+    batch = response.json()
+    return {"status": batch["processing_status"], "done": batch["processing_status"] in ANTHROPIC_DONE,
+            "results_url": batch.get("results_url"), "counts": batch.get("request_counts")}
+
+
+def download_anthropic(results_url: str) -> List[Dict]:
+    response = requests.get(results_url, headers=_anthropic_headers(), timeout=300)
+    response.raise_for_status()
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def parse_anthropic_results(lines: List[Dict]) -> Dict[str, str]:
+    hooks = {}
+    for line in lines:
+        result = line.get("result") or {}
+        if result.get("type") != "succeeded":
+            continue
+        text = result["message"]["content"][0]["text"]
+        if text and text.strip():
+            hooks[line["custom_id"]] = clean_hook(text)
+    return hooks
+
+
+# --- Sustituto local ---
+
+def run_local(batch_file: str, output_file: Optional[str] = None) -> str:
+    """
+    Ejecuta un batch de OpenAI con llamadas síncronas a /chat/completions y
+    escribe la salida con el mismo formato que la Batch API. Sirve cuando la
+    cuenta no tiene Batch API o para probar el flujo completo en local.
+    """
+    output_file = output_file or batch_file.replace(".jsonl", "-output.jsonl")
+    with atomic_open(output_file, suffix=".tmp") as out:
+        for request in _read_jsonl(batch_file):
+            try:
+                response = requests.post(
+                    f"{OPENAI_API_URL}/chat/completions",
+                    headers=_openai_headers(),
+                    json=request["body"],
+                    timeout=30
+                )
+                line = {"custom_id": request["custom_id"], "error": None,
+                        "response": {"status_code": response.status_code, "body": response.json()}}
+            except Exception as e:
+                line = {"custom_id": request["custom_id"], "response": None,
+                        "error": {"message": str(e)}}
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return output_file
+
+
+# --- Flujo completo ---
+
+def merge_hooks(hooks: Dict[str, str], path: str) -> int:
+    """
+    Fusiona {clave de contacto: hook} en el CSV. Solo se escriben los contactos
+    que siguen sin hook (alguien pudo regenerar filas desde la UI mientras tanto).
+    """
+    df, _ = read_csv_versioned(path)
+    updates = {}
+    for idx, row in pending_contacts(df).iterrows():
+        hook = hooks.get(contact_key(row))
+        if hook:
+            updates[idx] = {"Person_Hook": hook, "Hook_Confidence": BATCH_CONFIDENCE}
+    update_rows(updates, path)
+    return len(updates)
+
+
+def submit(path: str, provider: str = "openai", local: bool = False) -> Optional[Dict]:
+    """Escribe el JSONL de los contactos sin hook y lo envía. Devuelve el estado guardado."""
+    df, _ = read_csv_versioned(path)
+    todo = pending_contacts(df)
+    if len(todo) == 0:
+        print("✅ Todos los hooks ya están generados")
+        return None
+
+    batch_file = write_batch_file(todo, "openai" if local else provider)
+    print(f"📝 Batch escrito: {batch_file} ({len(todo)} contactos)")
+
+    state = {"provider": provider, "local": local, "batch_file": batch_file, "data_file": path,
+             "contacts": len(todo), "submitted_at": datetime.now().isoformat(timespec="seconds")}
+    if local:
+        state["output_file"] = run_local(batch_file)
+        state["status"] = "completed"
+    elif provider == "openai":
+        state["batch_id"] = submit_openai(batch_file)
+        state["status"] = "submitted"
+    else:
+        state["batch_id"] = submit_anthropic(batch_file)
+        state["status"] = "submitted"
+    save_state(state)
+    print(f"🚀 Batch enviado: {state.get('batch_id', 'local')}")
+    return state
+
+
+def collect(state: Dict, wait: bool = True, poll_seconds: int = POLL_SECONDS) -> Optional[int]:
+    """
+    Consulta el batch hasta que termine (o una sola vez si wait=False),
+    descarga los resultados y los fusiona. Devuelve los hooks escritos, o
+    None si el batch sigue en curso.
+    """
+    provider = state["provider"]
+    if state.get("local"):
+        hooks = parse_openai_results(_read_jsonl(state["output_file"]))
+    else:
+        check = status_openai if provider == "openai" else status_anthropic
+        while True:
+            status = check(state["batch_id"])
+            print(f"⏳ Batch {state['batch_id']}: {status['status']} {status.get('counts') or ''}")
+            if status["done"] or not wait:
+                break
+            time.sleep(poll_seconds)
+        state["status"] = status["status"]
+        save_state(state)
+        if not status["done"]:
+            return None
+
+        if provider == "openai":
+            if not status.get("output_file_id"):
+                print(f"❌ Batch terminado sin resultados ({status['status']})")
+                return 0
+            hooks = parse_openai_results(download_openai(status["output_file_id"]))
+        else:
+            hooks = parse_anthropic_results(download_anthropic(status["results_url"]))
+
+    written = merge_hooks(hooks, state["data_file"])
+    state["status"] = "merged"
+    state["merged"] = written
+    save_state(state)
+    return written
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Constructor de prompts compartido por generate_hooks.py y generate_hooks_with_web_search.py.
+
+- Las instrucciones y ejemplos (la parte fija, ~70% del prompt) se arman una
+  sola vez al importar el módulo; por llamada solo se formatean los campos.
+- Los campos largos (Description, fragmentos web) se recortan a un
+  presupuesto de tokens y los vacíos se omiten en lugar de enviar "nan".
+- El contexto del email ya no es el cuerpo completo (BODY_TEMPLATE es igual
+  para todos): solo la frase donde va el hook, con el fondo del contacto.
+- count_tokens() permite reportar los tokens de cada prompt.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from regenerate_emails_with_short_name import BODY_TEMPLATE
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken es opcional: estimación ≈ 4 caracteres por token
+    _ENCODING = None
+
+# Campos del contacto: (columna, etiqueta, presupuesto de tokens)
+CONTACT_FIELDS = [
+    ("Primary Contact", "Name", 20),
+    ("Primary Contact Title", "Title", 20),
+    ("Investors", "Fund", 20),
+    ("HQ Location", "Location", 20),
+    ("country", "Country", 10),
+    ("Preferred Investment Types", "Preferred investment types", 30),
+    ("Preferred Verticals", "Preferred sectors", 40),
+    ("Last Investment Company", "Last investment", 20),
+    ("Preferred Geography", "Investment geography", 30),
+    ("Preferred Industry", "Industry focus", 30),
+    ("Description", "Fund description", 120),
+]
+# Versión corta que usa el prompt con búsqueda web (el contexto lo aporta la web)
+WEB_CONTACT_FIELDS = [
+    ("Primary Contact", "Name", 20),
+    ("Primary Contact Title", "Title", 20),
+    ("Investors", "Fund", 20),
+    ("HQ Location", "Location", 20),
+    ("country", "Country", 10),
+]
+WEB_SNIPPET_TOKENS = 80
+# Presupuesto del contexto del email de cada contacto en el prompt empaquetado
+PACKED_EMAIL_CONTEXT_TOKENS = 60
+WEB_RESULTS_IN_PROMPT = 3
+
+HOOK_SLOT = "{{person_hook_sentence}}"
+
+HOOK_INSTRUCTIONS = """INSTRUCTIONS:
+1. Create ONE natural, conversational phrase to replace "your leadership at [fund] caught my attention"
+2. Focus on their professional journey, achievements, or career path
+3. Sound like a real person who researched their background
+4. Be complimentary and show genuine interest in their work
+5. Maximum 20 words
+6. Professional but personal tone
+7. RESPOND ONLY IN ENGLISH - no Spanish, Arabic, or other languages
+
+GOOD EXAMPLES:
+- "I followed your path from [previous company] to [current fund]"
+- "your recent ventures in the [specific industry] space caught my attention"
+- "your journey from [background] to [current role] is impressive"
+- "your track record at [previous company] caught my attention"
+- "your insights on [specific topic] particularly interested me"
+
+AVOID:
+- Generic statements about their "focus" or "expertise"
+- Obvious facts they already know about themselves
+- Robotic AI-sounding phrases
+- Statements that sound like you're stating the obvious"""
+
+WEB_HOOK_INSTRUCTIONS = """INSTRUCTIONS:
+1. Create ONE natural, conversational phrase to replace "your leadership at [fund] caught my attention"
+2. Use the WEB INFORMATION above to make it specific and personal
+3. Sound like a real person who actually researched this contact's CAREER and ACHIEVEMENTS
+4. Focus on their professional journey, achievements, or recent activities
+5. Be complimentary and show genuine interest in their work
+6. Maximum 20 words
+7. Professional but personal tone
+8. ENGLISH ONLY
+
+GOOD EXAMPLES (based on real info):
+- "I followed your path from [previous company] to [current fund]"
+- "your recent ventures in the [specific industry] space caught my attention"
+- "your insights on [specific topic] in [publication/interview] resonated with me"
+- "your journey from [background] to [current role] is impressive"
+- "your recent comments on [specific trend] particularly interested me"
+- "your track record at [previous company] caught my attention"
+
+AVOID:
+- Generic statements about their "focus" or "expertise"
+- Obvious facts they already know about themselves
+- Robotic AI-sounding phrases
+- Statements that sound like you're stating the obvious"""
+
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s|$)")
+
+
+def _compile(*parts: str) -> str:
+    """Une las partes en una sola plantilla str.format (se hace una vez, al importar)."""
+    return "".join(parts)
+
+
+def _static(text: str) -> str:
+    """Escapa las llaves de un bloque fijo para que str.format no lo interprete."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+# Plantillas compiladas una sola vez
+SINGLE_TEMPLATE = _compile(
+    "\nYou are an expert in venture capital and networking. Your task is to create a personalized "
+    "and specific phrase for a Middle East VC contact.\n\n"
+    "CONTACT CONTEXT:\n{contact}\n\n"
+    "EMAIL CONTEXT:\n{email_context}\n\n",
+    _static(HOOK_INSTRUCTIONS),
+    "\n\nRESPONSE: Only the phrase, no quotes or explanations. Make it sound natural and researched.\n",
+)
+PACKED_TEMPLATE = _compile(
+    "\nYou are an expert in venture capital and networking. Your task is to create a personalized "
+    "and specific phrase for EACH of the following {count} Middle East VC contacts.\n\n"
+    "CONTACTS (each with its EMAIL CONTEXT: where its phrase is inserted):\n{contacts}\n\n",
+    _static(HOOK_INSTRUCTIONS),
+    "\n\nRESPONSE: Only a JSON object, no explanations, with exactly {count} entries in the same order "
+    "as the contacts:\n"
+    '{{"hooks": [{{"id": 1, "hook": "phrase for contact 1"}}, {{"id": 2, "hook": "phrase for contact 2"}}]}}\n'
+    "Each hook is only the phrase, without quotes. Make each one sound natural and researched.\n",
+)
+WEB_TEMPLATE = _compile(
+    "\nYou are an expert in venture capital and networking. Create a personalized, natural-sounding "
+    "phrase for a Middle East VC contact based on REAL, RECENT information.\n\n"
+    "CONTACT INFO:\n{contact}\n\n"
+    "{fund_context}"
+    "{web_context}"
+    "EMAIL CONTEXT:\n{email_context}\n\n",
+    _static(WEB_HOOK_INSTRUCTIONS),
+    "\n\nRESPONSE: Only the phrase, no quotes or explanations. Make it sound like a real person who "
+    "researched their career.\n",
+)
+
+# Frase de BODY_TEMPLATE donde va el hook (la única parte del cuerpo que le importa al modelo)
+HOOK_SENTENCE = next(line for line in BODY_TEMPLATE.split("\n") if HOOK_SLOT in line).strip()
+
+
+def count_tokens(text: str) -> int:
+    """Tokens del texto (tiktoken si está instalado; si no, ≈ 4 caracteres por token)."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return max(1, len(text) // 4)
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Recorta el texto a un presupuesto de tokens: hasta el último final de
+    oración que entre o, si no hay, hasta la última palabra completa (con "…").
+    """
+    text = " ".join(str(text).split())
+    if count_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4]
+    while count_tokens(cut) > max_tokens:
+        cut = cut[:int(len(cut) * 0.9)]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(cut)]
+    if ends and ends[-1] > len(cut) // 2:
+        return cut[:ends[-1]]
+    return cut.rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+def _value(contact_data: Dict, column: str) -> Optional[str]:
+    value = contact_data.get(column)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def format_contact(contact_data: Dict, fields: List[tuple] = CONTACT_FIELDS) -> str:
+    """Líneas '- Campo: valor' con los campos no vacíos, recortados a su presupuesto."""
+    lines = []
+    for column, label, budget in fields:
+        value = _value(contact_data, column)
+        if value is not None:
+            lines.append(f"- {label}: {trim_to_tokens(value, budget)}")
+    return "\n".join(lines) or "- Name: N/A"
+
+
+def email_context_for(contact_data: Dict) -> str:
+    """
+    Contexto compacto del email: la frase de la plantilla donde va el hook,
+    con el nombre del fondo. El resto de BODY_TEMPLATE es igual para todos y
+    no aporta nada al modelo.
+    """
+    fund = _value(contact_data, "Investors") or "[fund]"
+    sentence = HOOK_SENTENCE.replace("{{fund_name}}", fund).replace(HOOK_SLOT, "___")
+    return f'The phrase fills the blank in: "{sentence}"'
+
+
+def build_hook_prompt(contact_data: Dict, email_context: Optional[str] = None) -> str:
+    """Prompt de un contacto. Sin email_context se usa email_context_for()."""
+    return SINGLE_TEMPLATE.format(
+        contact=format_contact(contact_data),
+        email_context=email_context or email_context_for(contact_data),
+    )
+
+
+def build_packed_prompt(contacts: List[Dict], email_contexts: Optional[List[str]] = None) -> str:
+    """
+    Prompt para K contactos en una sola llamada: las instrucciones van una vez
+    y la respuesta es JSON con un hook por id (1..K, en orden). Cada contacto
+    lleva su contexto del email (por defecto email_context_for()), recortado,
+    igual que el prompt de un solo contacto.
+    """
+    if email_contexts is None:
+        email_contexts = [email_context_for(contact) for contact in contacts]
+    numbered = "\n\n".join(
+        f"[{i}]\n{format_contact(contact)}\n"
+        f"- EMAIL CONTEXT: {trim_to_tokens(context or email_context_for(contact), PACKED_EMAIL_CONTEXT_TOKENS)}"
+        for i, (contact, context) in enumerate(zip(contacts, email_contexts), 1)
+    )
+    return PACKED_TEMPLATE.format(count=len(contacts), contacts=numbered)
+
+
+def format_web_results(web_results: List[Dict], max_results: int = WEB_RESULTS_IN_PROMPT,
+                       snippet_tokens: int = WEB_SNIPPET_TOKENS) -> str:
+    """Bloque 'RECENT WEB INFORMATION' con los fragmentos recortados."""
+    if not web_results:
+        return ""
+    lines = ["RECENT WEB INFORMATION:"]
+    for i, result in enumerate(web_results[:max_results], 1):
+        lines.append(f"{i}. {trim_to_tokens(result.get('title', ''), 30)}")
+        lines.append(f"   {trim_to_tokens(result.get('snippet', ''), snippet_tokens)}")
+        lines.append(f"   Source: {result.get('url', '')}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def build_web_hook_prompt(contact_data: Dict, web_results: List[Dict], email_context: Optional[str] = None,
+                          fund_summary: Optional[str] = None) -> str:
+    """
+    Prompt del generador con búsqueda web. fund_summary es el resumen
+    compartido del fondo (fund_context.py); web_results, solo lo del contacto.
+    """
+    return WEB_TEMPLATE.format(
+        contact=format_contact(contact_data, WEB_CONTACT_FIELDS),
+        fund_context=f"FUND SUMMARY:\n{fund_summary}\n\n" if fund_summary else "",
+        web_context=format_web_results(web_results),
+        email_context=email_context or email_context_for(contact_data),
+    )
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Detector de idioma rápido para Person_Hook (y cuerpos de email).
+
+Cuenta stopwords en inglés y en español con regex compiladas con límites de
+palabra (\\b), así "su"/"tu" ya no coinciden dentro de "success" o "Istanbul".
+Se puntúa toda la columna en una sola pasada vectorizada (Series.str.count)
+y los resultados se cachean por hash del hook.
+"""
+
+import re
+
+import pandas as pd
+
+# Stopwords inequívocas (se excluyen palabras ambiguas como "a", "me", "no", "he")
+ENGLISH_WORDS = [
+    "the", "your", "you", "my", "in", "at", "of", "and", "to", "with", "for",
+    "is", "are", "was", "has", "have", "on", "from", "by", "this", "that",
+    "particularly", "caught", "attention", "impressive", "journey", "recent",
+    "interested", "leadership", "track", "record", "insights", "truly",
+]
+SPANISH_WORDS = [
+    "tu", "tus", "su", "sus", "el", "los", "las", "del", "en", "con", "por",
+    "para", "que", "una", "es", "muy", "mi", "sobre", "desde", "entre", "como",
+    "liderazgo", "experiencia", "enfoque", "trayectoria", "llamó", "atención",
+    "reciente", "recientes", "inversiones", "inversión", "especialmente",
+    "impresionante", "interesó", "fondo",
+]
+
+ENGLISH_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, ENGLISH_WORDS)) + r")\b", re.IGNORECASE)
+SPANISH_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, SPANISH_WORDS)) + r")\b", re.IGNORECASE)
+# Caracteres propios del español (no aparecen en nombres turcos o árabes transliterados)
+SPANISH_CHARS_RE = re.compile(r"[ñ¿¡]", re.IGNORECASE)
+# Escritura árabe/persa
+ARABIC_RE = re.compile("[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]")
+
+# Mínimo de stopwords en español para considerar un hook como no inglés
+MIN_SPANISH_HITS = 2
+
+# hash(hook) -> (idioma, puntos_en, puntos_es)
+_CACHE: dict[int, tuple[str, int, int]] = {}
+_CACHE_MAX = 200_000
+
+
+def _classify_counts(en: pd.Series, es: pd.Series, arabic: pd.Series, empty: pd.Series) -> pd.Series:
+    lang = pd.Series("en", index=en.index, dtype=object)
+    spanish = (es >= MIN_SPANISH_HITS) & (es > en)
+    lang[spanish] = "es"
+    lang[arabic] = "ar"
+    lang[empty] = ""
+    return lang
+
+
+def classify_texts(texts: pd.Series) -> pd.DataFrame:
+    """
+    Clasifica el idioma de cada texto en una pasada vectorizada.
+
+    Args:
+        texts: Serie de textos (p. ej. df["Person_Hook"])
+
+    Returns:
+        DataFrame alineado con `texts` con columnas:
+        lang ('en', 'es', 'ar' o '' si vacío), en_score, es_score
+    """
+    texts = texts.fillna("").astype(str)
+    keys = pd.util.hash_pandas_object(texts, index=False)
+
+    # Solo se puntúan los textos únicos que no están en caché
+    unique_keys = keys.drop_duplicates().tolist()
+    found = {k: _CACHE[k] for k in unique_keys if k in _CACHE}
+    missing = ~keys.isin(found.keys())
+    if missing.any():
+        todo = texts[missing].drop_duplicates()
+        todo_keys = keys[todo.index]
+        en = todo.str.count(ENGLISH_RE)
+        es = todo.str.count(SPANISH_RE) + todo.str.count(SPANISH_CHARS_RE) * MIN_SPANISH_HITS
+        arabic = todo.str.contains(ARABIC_RE)
+        empty = todo.str.strip() == ""
+        lang = _classify_counts(en, es, arabic, empty)
+        found.update(zip(todo_keys.tolist(), zip(lang.tolist(), en.tolist(), es.tolist())))
+
+    # Los resultados salen de `found`: vaciar la caché después no puede perder claves de esta llamada
+    results = [found[k] for k in keys.tolist()]
+    if len(_CACHE) + len(found) > _CACHE_MAX:
+        _CACHE.clear()
+    _CACHE.update(found)
+    return pd.DataFrame(results, index=texts.index, columns=["lang", "en_score", "es_score"])
+
+
+def non_english_mask(texts: pd.Series) -> pd.Series:
+    """True para los textos no vacíos que no están en inglés."""
+    lang = classify_texts(texts)["lang"]
+    return (lang != "en") & (lang != "")
+
+
+def is_english(text: str) -> bool:
+    """
+    Versión escalar: True si el texto parece inglés (o está vacío).
+    Mismas reglas que classify_texts, sin el coste de crear una Serie por llamada.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return True
+    if ARABIC_RE.search(text):
+        return False
+    en = len(ENGLISH_RE.findall(text))
+    es = len(SPANISH_RE.findall(text)) + len(SPANISH_CHARS_RE.findall(text)) * MIN_SPANISH_HITS
+    return not (es >= MIN_SPANISH_HITS and es > en)
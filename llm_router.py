@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Router de LLM independiente del proveedor (OpenAI / Anthropic / compatibles).
+
+- Reparte las llamadas entre los proveedores configurados según su límite
+  de peticiones por minuto (RPM): el throughput total es la suma de cuotas.
+- Ante 429 / 5xx / errores de red, el proveedor entra en enfriamiento y la
+  llamada pasa al siguiente (failover).
+- Hedging: si una llamada tarda más de hedge_after segundos, se lanza la
+  misma petición en otro proveedor y gana la primera respuesta válida.
+- Registra la latencia de cada proveedor (p50 / p95).
+- stream(): tokens a medida que llegan (SSE), con failover antes del primer token.
+
+Configuración por variables de entorno:
+    OPENAI_API_KEY, OPENAI_MODEL, OPENAI_RPM, OPENAI_BASE_URL
+    ANTHROPIC_API_KEY, ANTHROPIC_MODEL, ANTHROPIC_RPM, ANTHROPIC_BASE_URL
+    LLM_PROVIDERS='[{"name": "groq", "kind": "openai", "base_url": "...",
+                     "api_key_env": "GROQ_API_KEY", "model": "...", "rpm": 30}]'
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+import api_metrics
+
+# Sobrescribibles para apuntar a un proxy o al mock local (mock_api_server.py)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+DEFAULT_OPENAI_MODEL = "gpt-4"
+DEFAULT_ANTHROPIC_MODEL = "claude-3-sonnet-20240229"
+DEFAULT_RPM = {"openai": 500, "anthropic": 50}
+
+REQUEST_TIMEOUT = 30
+# Segundos antes de lanzar una petición duplicada en otro proveedor (0 = sin hedging)
+HEDGE_AFTER_SECONDS = 4.0
+# Enfriamiento por defecto tras un 429 / 5xx (si no llega Retry-After)
+COOLDOWN_SECONDS = {"rate_limit": 20.0, "server": 5.0, "network": 5.0}
+MAX_ATTEMPTS = 4
+LATENCY_SAMPLES = 500
+
+
+class ProviderError(Exception):
+    """Error de un proveedor. `kind`: rate_limit, server, network, auth o request."""
+
+    def __init__(self, provider: str, kind: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.kind = kind
+        self.retry_after = retry_after
+
+    @property
+    def failover(self) -> bool:
+        # Un 400 fallaría igual en cualquier proveedor
+        return self.kind != "request"
+
+
+class NoProviderAvailable(RuntimeError):
+    """Todos los proveedores fallaron o no hay ninguno configurado."""
+
+
+class Provider:
+    """Un proveedor/modelo con su límite de RPM, enfriamiento y latencias."""
+
+    def __init__(self, name: str, kind: str, model: str, api_key: str,
+                 base_url: Optional[str] = None, rpm: Optional[int] = None):
+        self.name = name
+        self.kind = kind
+        self.model = model
+        self.api_key = api_key
+        self.base_url = (base_url or (OPENAI_BASE_URL if kind == "openai" else ANTHROPIC_BASE_URL)).rstrip("/")
+        self.rpm = rpm or DEFAULT_RPM.get(kind, 60)
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._requests = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._requests and now - self._requests[0] >= 60:
+            self._requests.popleft()
+
+    def try_acquire(self) -> bool:
+        """Reserva un hueco de la cuota RPM si hay (sin bloquear)."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.cooldown_until:
+                return False
+            self._prune(now)
+            if len(self._requests) >= self.rpm:
+                return False
+            self._requests.append(now)
+            return True
+
+    def load(self) -> float:
+        """Fracción de la cuota del último minuto ya usada."""
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._requests) / self.rpm
+
+    def next_free_in(self) -> float:
+        """Segundos hasta que el proveedor pueda aceptar otra petición."""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            wait_seconds = max(self.cooldown_until - now, 0.0)
+            if len(self._requests) >= self.rpm:
+                wait_seconds = max(wait_seconds, 60 - (now - self._requests[0]))
+            return wait_seconds
+
+    def cool_down(self, seconds: float):
+        with self._lock:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+    def record(self, latency: Optional[float], ok: bool):
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self.latencies.append(latency)
+            else:
+                self.errors += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            samples = sorted(self.latencies)
+            calls, errors = self.calls, self.errors
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else None
+
+        return {"model": self.model, "rpm": self.rpm, "calls": calls, "errors": errors,
+                "p50": percentile(0.50), "p95": percentile(0.95)}
+
+    # --- Llamada HTTP ---
+
+    def _error_from(self, response: requests.Response) -> ProviderError:
+        status = response.status_code
+        retry_after = response.headers.get("retry-after")
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        if status == 429:
+            kind = "rate_limit"
+        elif status >= 500:
+            kind = "server"
+        elif status in (401, 403):
+            kind = "auth"
+        else:
+            kind = "request"
+        return ProviderError(self.name, kind, f"{status} - {response.text[:200]}", retry_after)
+
+    def _request(self, prompt: str, max_tokens: int, temperature: float, stream: bool = False) -> Tuple[str, Dict, Dict]:
+        messages = [{"role": "user", "content": prompt}]
+        if self.kind == "openai":
+            url = f"{self.base_url}/chat/completions"
+            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+            body = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        else:
+            url = f"{self.base_url}/messages"
+            headers = {"x-api-key": self.api_key, "Content-Type": "application/json",
+                       "anthropic-version": "2023-06-01"}
+            body = {"model": self.model, "max_tokens": max_tokens, "messages": messages,
+                    "temperature": temperature}
+        if stream:
+            body["stream"] = True
+        return url, headers, body
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """Una llamada de chat. Lanza ProviderError ante cualquier fallo."""
+        url, headers, body = self._request(prompt, max_tokens, temperature)
+
+        with api_metrics.track(f"llm.{self.name}", model=self.model):
+            started = time.monotonic()
+            try:
+                response = requests.post(url, headers=headers, json=body, timeout=REQUEST_TIMEOUT + max_tokens // 10)
+            except requests.RequestException as e:
+                self.record(None, ok=False)
+                raise ProviderError(self.name, "server", str(e))
+            api_metrics.annotate_response(response)
+            if response.status_code != 200:
+                self.record(None, ok=False)
+                raise self._error_from(response)
+
+            try:
+                result = response.json()
+                if self.kind == "openai":
+                    text = result["choices"][0]["message"]["content"]
+                else:
+                    text = result["content"][0]["text"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                # 200 con un cuerpo que no es JSON o sin el texto: falla este proveedor, no el lote
+                self.record(None, ok=False)
+                raise ProviderError(self.name, "server", f"Respuesta inesperada: {response.text[:200]}")
+            self.record(time.monotonic() - started, ok=True)
+            return text
+
+    def stream(self, prompt: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        """
+        Igual que complete() pero entrega el texto por fragmentos (Server-Sent
+        Events). Los errores de conexión / HTTP se lanzan al pedir el primer fragmento;
+        un corte a mitad del stream se lanza como ProviderError(kind="network").
+        """
+        url, headers, body = self._request(prompt, max_tokens, temperature, stream=True)
+        with api_metrics.track(f"llm.{self.name}.stream", model=self.model):
+            yield from self._stream_events(url, headers, body, max_tokens)
+
+    def _lines(self, response: requests.Response) -> Iterator[str]:
+        """Líneas del stream; un corte de red a mitad de camino se lanza como ProviderError."""
+        try:
+            yield from response.iter_lines(decode_unicode=True)
+        except requests.RequestException as e:
+            self.record(None, ok=False)
+            raise ProviderError(self.name, "network", str(e))
+
+    def _stream_events(self, url: str, headers: Dict, body: Dict, max_tokens: int) -> Iterator[str]:
+        started = time.monotonic()
+        try:
+            response = requests.post(url, headers=headers, json=body, stream=True,
+                                     timeout=REQUEST_TIMEOUT + max_tokens // 10)
+        except requests.RequestException as e:
+            self.record(None, ok=False)
+            raise ProviderError(self.name, "server", str(e))
+        api_metrics.annotate(status=response.status_code)
+        if response.status_code != 200:
+            self.record(None, ok=False)
+            raise self._error_from(response)
+
+        with response:
+            for line in self._lines(response):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+                if self.kind == "openai":
+                    choices = event.get("choices") or [{}]
+                    text = (choices[0].get("delta") or {}).get("content")
+                elif event.get("type") == "content_block_delta":
+                    text = (event.get("delta") or {}).get("text")
+                else:
+                    text = None
+                if text:
+                    yield text
+        self.record(time.monotonic() - started, ok=True)
+
+
+def providers_from_env(prefer: Optional[str] = None) -> List[Provider]:
+    """Proveedores configurados en el entorno; `prefer` ("openai"/"anthropic") va primero."""
+    providers = []
+    if os.getenv("OPENAI_API_KEY"):
+        providers.append(Provider(
+            "openai", "openai", os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL), os.getenv("OPENAI_API_KEY"),
+            rpm=int(os.getenv("OPENAI_RPM", DEFAULT_RPM["openai"]))
+        ))
+    if os.getenv("ANTHROPIC_API_KEY"):
+        providers.append(Provider(
+            "anthropic", "anthropic", os.getenv("ANTHROPIC_MODEL", DEFAULT_ANTHROPIC_MODEL),
+            os.getenv("ANTHROPIC_API_KEY"), rpm=int(os.getenv("ANTHROPIC_RPM", DEFAULT_RPM["anthropic"]))
+        ))
+    for spec in json.loads(os.getenv("LLM_PROVIDERS", "[]")):
+        api_key = os.getenv(spec.get("api_key_env", ""), spec.get("api_key", ""))
+        if api_key:
+            providers.append(Provider(
+                spec["name"], spec.get("kind", "openai"), spec["model"], api_key,
+                base_url=spec.get("base_url"), rpm=spec.get("rpm")
+            ))
+    if prefer:
+        providers.sort(key=lambda p: p.kind != prefer)
+    return providers
+
+
+class LLMRouter:
+    """Reparte, hace failover y hedging entre varios proveedores."""
+
+    def __init__(self, providers: List[Provider], hedge_after: float = HEDGE_AFTER_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self.max_attempts = max_attempts
+        # Proveedores con credenciales inválidas: no se vuelven a usar
+        self._disabled = set()
+        # Hilos para las peticiones (la principal y la de hedging)
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 4 * len(providers)))
+
+    def _pick(self, exclude: set, block: bool = True) -> Optional[Provider]:
+        """
+        El proveedor menos cargado (en proporción a su cuota) con hueco libre.
+        Si ninguno tiene hueco y block=True, espera al primero que se libere.
+        """
+        while True:
+            candidates = [p for p in self.providers if p.name not in exclude and p.name not in self._disabled]
+            if not candidates:
+                return None
+            for provider in sorted(candidates, key=lambda p: p.load()):
+                if provider.try_acquire():
+                    return provider
+            if not block:
+                return None
+            time.sleep(min(max(min(p.next_free_in() for p in candidates), 0.05), 1.0))
+
+    def _handle_error(self, error: ProviderError, retrying: bool = True):
+        provider = next(p for p in self.providers if p.name == error.provider)
+        if error.failover and retrying:
+            api_metrics.note_retry(f"llm.{provider.name}")
+        if error.kind == "auth":
+            self._disabled.add(provider.name)
+        elif error.kind in COOLDOWN_SECONDS:
+            provider.cool_down(error.retry_after or COOLDOWN_SECONDS[error.kind])
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float = 0.7) -> Tuple[str, str]:
+        """
+        Completa el prompt con el primer proveedor que responda bien.
+
+        Returns:
+            (texto, nombre del proveedor)
+
+        Raises:
+            NoProviderAvailable si todos fallan o se agotan los intentos.
+        """
+        if not self.providers:
+            raise NoProviderAvailable("No hay proveedores de LLM configurados (OPENAI_API_KEY / ANTHROPIC_API_KEY)")
+
+        failed = set()
+        errors = []
+        attempts = 0
+        pending = {}
+        while attempts < self.max_attempts or pending:
+            if not pending:
+                # Tras fallar todos, se vuelve a intentar con cualquiera (respetando enfriamientos)
+                usable = {p.name for p in self.providers} - self._disabled
+                provider = self._pick(failed if usable - failed else set())
+                if provider is None:
+                    break
+                attempts += 1
+                pending[self._pool.submit(provider.complete, prompt, max_tokens, temperature)] = provider
+
+            timeout = self.hedge_after if self.hedge_after and len(pending) == 1 and attempts < self.max_attempts else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Hedging: la petición va lenta; se lanza otra en un proveedor distinto
+                busy = {p.name for p in pending.values()}
+                hedge = self._pick(busy | failed, block=False)
+                if hedge is not None:
+                    attempts += 1
+                    pending[self._pool.submit(hedge.complete, prompt, max_tokens, temperature)] = hedge
+                else:
+                    wait(pending, return_when=FIRST_COMPLETED)
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    return future.result(), provider.name
+                except ProviderError as e:
+                    errors.append(str(e))
+                    self._handle_error(e)
+                    if not e.failover:
+                        raise
+                    failed.add(provider.name)
+            if attempts >= self.max_attempts and not pending:
+                break
+
+        raise NoProviderAvailable("; ".join(errors) or "Sin respuesta de los proveedores")
+
+    def stream(self, prompt: str, max_tokens: int, temperature: float = 0.7) -> Iterator[str]:
+        """
+        Texto por fragmentos a medida que llega. Hay failover mientras no haya
+        llegado el primer fragmento; después, un error corta el stream (no se
+        puede reanudar en otro proveedor sin repetir el texto ya mostrado).
+        """
+        if not self.providers:
+            raise NoProviderAvailable("No hay proveedores de LLM configurados (OPENAI_API_KEY / ANTHROPIC_API_KEY)")
+
+        failed = set()
+        errors = []
+        for _ in range(self.max_attempts):
+            usable = {p.name for p in self.providers} - self._disabled
+            provider = self._pick(failed if usable - failed else set())
+            if provider is None:
+                break
+            chunks = provider.stream(prompt, max_tokens, temperature)
+            try:
+                first = next(chunks)
+            except StopIteration:
+                return
+            except ProviderError as e:
+                errors.append(str(e))
+                self._handle_error(e)
+                if not e.failover:
+                    raise
+                failed.add(provider.name)
+                continue
+            yield first
+            try:
+                yield from chunks
+            except ProviderError as e:
+                # Ya se entregó texto: sin failover, solo enfriamiento / desactivación del proveedor
+                self._handle_error(e, retrying=False)
+                raise
+            return
+
+        raise NoProviderAvailable("; ".join(errors) or "Sin respuesta de los proveedores")
+
+    def stats(self) -> Dict[str, Dict]:
+        """Llamadas, errores y latencias p50/p95 (segundos) por proveedor."""
+        return {p.name: p.stats() for p in self.providers}
+
+    def concurrency(self) -> int:
+        """Llamadas simultáneas razonables para la suma de cuotas (≈ RPM / 60 × latencia)."""
+        return max(1, min(32, sum(max(1, p.rpm // 30) for p in self.providers)))
+
+
+def format_stats(stats: Dict[str, Dict]) -> str:
+    lines = []
+    for name, s in stats.items():
+        p50 = f"{s['p50']:.2f}s" if s["p50"] is not None else "-"
+        p95 = f"{s['p95']:.2f}s" if s["p95"] is not None else "-"
+        lines.append(f"     · {name} ({s['model']}): {s['calls']} llamadas, {s['errors']} errores, "
+                     f"p50 {p50}, p95 {p95}")
+    return "\n".join(lines)
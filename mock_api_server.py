@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita las APIs externas para medir el pipeline sin pagar llamadas.
+
+Responde con la misma forma que las APIs reales:
+    POST /v1/chat/completions   OpenAI (también stream=true y response_format json_object)
+    POST /v1/messages           Anthropic (también stream=true)
+    GET  /search                SerpAPI (organic_results)
+    GET  /v7.0/search           Bing Web Search (webPages.value)
+    GET  /genderize             Genderize (name=... o name[]=... en lote)
+    GET  /stats                 Peticiones atendidas por servicio y código HTTP
+
+Los prompts empaquetados (build_packed_prompt) reciben un JSON con un hook por
+contacto y los de email_review un JSON con un resultado por id, así cada
+script recorre el mismo camino que en producción.
+
+Para pruebas de carga:
+    --llm-latency / --search-latency / --genderize-latency
+        "0.3" (fija), "uniform:0.1,0.5", "normal:0.4,0.1", "lognormal:0.4,0.5"
+        (mediana, sigma) o "exp:0.3" (media)
+    --error-rate 0.05       responde 429 a ~5% de las peticiones (con Retry-After)
+    --server-error-rate     lo mismo con 503
+    --llm-rpm / --search-rpm / --genderize-rpm
+        tope de peticiones por minuto; por encima se responde 429
+
+Uso:
+    python mock_api_server.py --port 8765 --llm-latency lognormal:0.4,0.5 --llm-rpm 300
+    eval "$(python mock_api_server.py --port 8765 --print-env)"   # apunta todos los scripts aquí
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_PORT = 8765
+MOCK_HOOK = "your recent ventures in the fintech space caught my attention"
+STREAM_CHUNK_WORDS = 3
+RETRY_AFTER_SECONDS = 1
+
+SERVICES = ("llm", "search", "genderize")
+
+_PACKED_RE = re.compile(r"for EACH of the following (\d+)")
+_EMAIL_ID_RE = re.compile(r"=== EMAIL (\S+) ===")
+_QUOTED_RE = re.compile(r'"([^"]+)"')
+# Nombres que el mock trata como femeninos (el resto se reparte por hash)
+_FEMALE_NAMES = {"fatima", "layla", "sara", "nour", "rania", "hessa", "maha", "reem", "dina", "lina",
+                 "çağla", "zoë", "hélène", "noémie", "aïcha", "mariam", "aisha", "noura"}
+
+
+def parse_latency(spec) -> Callable[[random.Random], float]:
+    """
+    Distribución de latencia a partir de su especificación: un número (fija),
+    "uniform:a,b", "normal:media,desv", "lognormal:mediana,sigma" o "exp:media".
+    """
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        value = float(kind or 0)
+        return lambda rng: value
+    params = [float(x) for x in args.split(",")]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / params[0])
+    raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def fake_completion(prompt: str, json_mode: bool = False) -> str:
+    """Texto de respuesta según el tipo de prompt."""
+    packed = _PACKED_RE.search(prompt)
+    if packed:
+        count = int(packed.group(1))
+        return json.dumps({"hooks": [
+            {"id": i, "hook": f"your work on deal number {i} caught my attention"} for i in range(1, count + 1)
+        ]})
+    if json_mode:
+        # email_review: un resultado por email; en modo fragmentos solo se listan los que tienen problemas
+        ids = _EMAIL_ID_RE.findall(prompt)
+        return json.dumps({"results": [
+            {"id": eid, "issues": [], "overall_score": 9, "is_english": True} for eid in ids
+        ]})
+    return MOCK_HOOK
+
+
+def fake_search_results(query: str, count: int) -> List[Dict]:
+    """Resultados deterministas que mencionan lo que va entre comillas en la consulta."""
+    phrases = _QUOTED_RE.findall(query) or [query]
+    subject = " ".join(phrases[:2])
+    slug = re.sub(r"\W+", "-", subject.lower()).strip("-") or "result"
+    results = []
+    for i in range(count):
+        # Cada tanto el mismo perfil con otra URL (www / tracking) para ejercitar la deduplicación
+        variant = (_digest(query) + i) % 4
+        url = f"https://www.linkedin.com/in/{slug}/" if variant == 0 else f"https://news{variant}.example.com/{slug}-{i}"
+        if variant == 0 and i % 2:
+            url = f"https://linkedin.com/in/{slug}?utm_source=mock"
+        results.append({
+            "title": f"{subject} | Profile and recent news",
+            "snippet": f"{subject} spoke about venture investing in the region and recent deals ({query[:60]}).",
+            "url": url,
+        })
+    return results
+
+
+def fake_gender(name: str) -> Dict:
+    key = name.strip().lower()
+    if not key:
+        return {"name": name, "gender": None, "probability": 0.0, "count": 0}
+    female = key in _FEMALE_NAMES or (key not in _FEMALE_NAMES and _digest(key) % 5 == 0)
+    probability = 0.6 + (_digest(key + "p") % 40) / 100
+    return {"name": name, "gender": "female" if female else "male", "probability": round(probability, 2),
+            "count": _digest(key) % 5000}
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    server_version = "MockAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Sin un log por petición: el servidor se usa en benchmarks
+
+    def _send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+        return status
+
+    def _send_sse(self, events: List[Dict], done: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for event in events:
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        if done:
+            self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+        return 200
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _admit(self, service: str) -> bool:
+        """Latencia, tope de RPM e inyección de errores. False si ya se respondió con error."""
+        server = self.server
+        rejection = server.reject(service)
+        if rejection:
+            status = self._send_json(rejection, {"error": {"message": "mock: error inyectado",
+                                                           "type": "rate_limit_error" if rejection == 429 else "overloaded"}},
+                                     {"Retry-After": server.retry_after})
+            server.count(service, status)
+            return False
+        time.sleep(server.latency_for(service))
+        return True
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self._read_json()
+        if path.endswith("/chat/completions"):
+            if self._admit("llm"):
+                self.server.count("llm", self._openai(body))
+        elif path.endswith("/messages"):
+            if self._admit("llm"):
+                self.server.count("llm", self._anthropic(body))
+        else:
+            self._send_json(404, {"error": {"message": f"Ruta no soportada: {self.path}"}})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path == "/stats":
+            self._send_json(200, self.server.stats())
+        elif parts.path.endswith("/v7.0/search"):
+            if self._admit("search"):
+                results = fake_search_results(query.get("q", [""])[0], int(query.get("count", ["3"])[0]))
+                self.server.count("search", self._send_json(200, {"webPages": {"value": [
+                    {"name": r["title"], "url": r["url"], "snippet": r["snippet"]} for r in results
+                ]}}))
+        elif parts.path.endswith("/search"):
+            if self._admit("search"):
+                results = fake_search_results(query.get("q", [""])[0], int(query.get("num", ["3"])[0]))
+                self.server.count("search", self._send_json(200, {"organic_results": [
+                    {"position": i, "title": r["title"], "link": r["url"], "snippet": r["snippet"]}
+                    for i, r in enumerate(results, 1)
+                ]}))
+        elif parts.path in ("/", "/genderize"):
+            if self._admit("genderize"):
+                if "name[]" in query:
+                    payload = [fake_gender(name) for name in query["name[]"]]
+                else:
+                    payload = fake_gender(query.get("name", [""])[0])
+                self.server.count("genderize", self._send_json(200, payload))
+        else:
+            self._send_json(404, {"error": {"message": f"Ruta no soportada: {self.path}"}})
+
+    def _openai(self, body: Dict) -> int:
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        text = fake_completion(prompt, json_mode)
+        model = body.get("model", "mock")
+        if body.get("stream"):
+            return self._send_sse([
+                {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "model": model,
+                 "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                for chunk in _chunks(text)
+            ], done=True)
+        return self._send_json(200, {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                      "total_tokens": (len(prompt) + len(text)) // 4},
+        })
+
+    def _anthropic(self, body: Dict) -> int:
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = fake_completion(prompt)
+        model = body.get("model", "mock")
+        if body.get("stream"):
+            events = [{"type": "message_start", "message": {"id": "msg_mock", "model": model}},
+                      {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}]
+            events += [{"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}}
+                       for chunk in _chunks(text)]
+            events += [{"type": "content_block_stop", "index": 0}, {"type": "message_stop"}]
+            return self._send_sse(events, done=False)
+        return self._send_json(200, {
+            "id": "msg_mock", "type": "message", "role": "assistant", "model": model,
+            "content": [{"type": "text", "text": text}], "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+        })
+
+
+def _chunks(text: str) -> List[str]:
+    words = text.split(" ")
+    return [" ".join(words[i:i + STREAM_CHUNK_WORDS]) + (" " if i + STREAM_CHUNK_WORDS < len(words) else "")
+            for i in range(0, len(words), STREAM_CHUNK_WORDS)]
+
+
+class MockAPIServer(ThreadingHTTPServer):
+    """Servidor con latencia, topes de RPM y errores configurables por servicio."""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, search_latency=None, genderize_latency=None,
+                 error_rate: float = 0.0, server_error_rate: float = 0.0, rpm: Optional[Dict[str, int]] = None,
+                 retry_after: float = RETRY_AFTER_SECONDS, seed: Optional[int] = None):
+        super().__init__(address, MockAPIHandler)
+        self.latency = {
+            "llm": parse_latency(latency),
+            "search": parse_latency(latency if search_latency is None else search_latency),
+            "genderize": parse_latency(0.0 if genderize_latency is None else genderize_latency),
+        }
+        self.error_rate = error_rate
+        self.server_error_rate = server_error_rate
+        self.rpm = {service: limit for service, limit in (rpm or {}).items() if limit}
+        self.retry_after = retry_after
+        self.requests = 0
+        self._counts = Counter()
+        self._windows = {service: deque() for service in SERVICES}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency_for(self, service: str) -> float:
+        with self._lock:
+            return self.latency[service](self._rng)
+
+    def reject(self, service: str) -> Optional[int]:
+        """Código de error a devolver (429 / 503) o None si la petición pasa."""
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows[service]
+            while window and now - window[0] > 60:
+                window.popleft()
+            limit = self.rpm.get(service)
+            if limit and len(window) >= limit:
+                return 429
+            roll = self._rng.random()
+            if roll < self.error_rate:
+                return 429
+            if roll < self.error_rate + self.server_error_rate:
+                return 503
+            window.append(now)
+        return None
+
+    def count(self, service: str, status: int):
+        with self._lock:
+            self.requests += 1
+            self._counts[(service, status)] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            by_service = {}
+            for (service, status), n in self._counts.items():
+                by_service.setdefault(service, {})[str(status)] = n
+            return {"requests": self.requests, "services": by_service}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, latency=0.0, **options) -> MockAPIServer:
+    """Arranca el servidor en un hilo (port=0 elige un puerto libre) y lo devuelve."""
+    server = MockAPIServer((host, port), latency, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def env_for(base_url: str) -> Dict[str, str]:
+    """Variables de entorno que apuntan todos los scripts al mock."""
+    return {
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "ANTHROPIC_BASE_URL": f"{base_url}/v1",
+        "SERPAPI_URL": f"{base_url}/search",
+        "BING_SEARCH_URL": f"{base_url}/v7.0/search",
+        "GENDERIZE_URL": f"{base_url}/genderize",
+        "OPENAI_API_KEY": "mock",
+        "ANTHROPIC_API_KEY": "mock",
+        "SERPAPI_KEY": "mock",
+        "BING_API_KEY": "mock",
+        "GENDERIZE_KEY": "mock",
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita las APIs externas del pipeline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--llm-latency", default="0", help='Latencia del LLM: "0.3", "uniform:0.1,0.5", ...')
+    parser.add_argument("--search-latency", default=None, help="Latencia de SerpAPI/Bing (por defecto, la del LLM)")
+    parser.add_argument("--genderize-latency", default="0")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de respuestas 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Proporción de respuestas 503")
+    parser.add_argument("--retry-after", type=float, default=RETRY_AFTER_SECONDS)
+    parser.add_argument("--llm-rpm", type=int, default=0, help="Tope de peticiones/minuto del LLM (0 = sin tope)")
+    parser.add_argument("--search-rpm", type=int, default=0)
+    parser.add_argument("--genderize-rpm", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--print-env", action="store_true", help="Imprimir los export para apuntar los scripts aquí")
+    args = parser.parse_args(argv)
+
+    if args.print_env:
+        for name, value in env_for(f"http://{args.host}:{args.port}").items():
+            print(f"export {name}='{value}'")
+        return
+
+    server = MockAPIServer(
+        (args.host, args.port), args.llm_latency, args.search_latency, args.genderize_latency,
+        error_rate=args.error_rate, server_error_rate=args.server_error_rate, retry_after=args.retry_after,
+        rpm={"llm": args.llm_rpm, "search": args.search_rpm, "genderize": args.genderize_rpm}, seed=args.seed,
+    )
+    print(f"🧪 Mock API en {server.base_url} (LLM {args.llm_latency}s, 429 {args.error_rate:.0%}, "
+          f"RPM LLM {args.llm_rpm or '∞'})")
+    print(f"   eval \"$(python mock_api_server.py --port {args.port} --print-env)\" para apuntar los scripts aquí")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n👋 {json.dumps(server.stats())}")
+
+
+if __name__ == "__main__":
+    main()
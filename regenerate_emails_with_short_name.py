@@ -5,6 +5,8 @@ Script para regenerar todos los emails usando el nuevo template con {{short_name
 
 import pandas as pd
 
+from csv_storage import DATA_FILE, read_csv_versioned, write_csv_atomic
+
 # Landing page
 LANDING_PAGE = "https://zarcoideas.com"
 
@@ -41,46 +43,23 @@ def safe_get(row, col_name: str, default: str = "") -> str:
 def build_email_body(row):
     """
     Construye el cuerpo del email con todos los tokens reemplazados.
+    Usa el mismo render que template_store (CSV delta, app, export).
     """
-    honorific = safe_get(row, "Honorific")
-    last_name = safe_get(row, "Last Name")
-    fund_name = safe_get(row, "Investors")
-    short_name = safe_get(row, "Short_Name")
-    
-    # Si no hay short_name, usar fund_name
-    if not short_name:
-        short_name = fund_name
-    
-    # Usar Person_Hook si existe, sino usar el hook genérico
-    person_hook = safe_get(row, "Person_Hook")
-    if person_hook and person_hook.strip():
-        person_hook_sentence = person_hook
-    else:
-        person_hook_sentence = f"your leadership at {fund_name} caught my attention"
-    
-    # Reemplazar tokens
-    body = BODY_TEMPLATE
-    body = body.replace("{{honorific}}", honorific)
-    body = body.replace("{{last_name}}", last_name)
-    body = body.replace("{{fund_name}}", fund_name)
-    body = body.replace("{{short_name}}", short_name)
-    body = body.replace("{{person_hook_sentence}}", person_hook_sentence)
-    body = body.replace("{{landing_page}}", LANDING_PAGE)
-    
-    return body
+    # Import diferido: template_store importa las plantillas de este módulo
+    from template_store import CURRENT_VERSION, render_tokens, row_tokens
+    return render_tokens(CURRENT_VERSION, row_tokens(row))[1]
 
 
 def build_email_subject(row):
     """Construye el asunto del email."""
-    fund_name = safe_get(row, "Investors")
-    subject = SUBJECT_TEMPLATE.replace("{{fund_name}}", fund_name)
-    return subject
+    from template_store import CURRENT_VERSION, render_tokens, row_tokens
+    return render_tokens(CURRENT_VERSION, row_tokens(row))[0]
 
 
 def main():
     """Función principal."""
     print("📂 Leyendo archivo CSV...")
-    df = pd.read_csv("857-vc-funds-with-email-template.csv")
+    df, version = read_csv_versioned(DATA_FILE)
     
     print(f"✅ Cargados {len(df)} registros")
     
@@ -117,9 +96,10 @@ def main():
     
     # Guardar
     print("\n💾 Guardando cambios...")
-    df.to_csv("857-vc-funds-with-email-template.csv", index=False)
+    # Falla con StaleDataError si otro proceso escribió el CSV mientras tanto
+    write_csv_atomic(df, DATA_FILE, expected_version=version)
     print("✅ Todos los emails han sido regenerados con el nuevo template")
-    print(f"✅ Archivo actualizado: 857-vc-funds-with-email-template.csv")
+    print(f"✅ Archivo actualizado: {DATA_FILE}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tabla de resultados en disco (SQLite) para spell_checker.py.
+
+Los resultados de la revisión se escriben por bloques a medida que llegan,
+y la UI solo lee la página que está mostrando, de modo que la memoria no
+crece con el tamaño del archivo subido.
+"""
+
+import json
+import sqlite3
+import uuid
+from contextlib import closing
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+RESULTS_DB = "review_results.sqlite"
+SEVERITIES = ("low", "medium", "high")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    run_id      TEXT NOT NULL,
+    row_idx     INTEGER NOT NULL,
+    score       REAL,
+    is_english  INTEGER,
+    n_issues    INTEGER,
+    has_low     INTEGER,
+    has_medium  INTEGER,
+    has_high    INTEGER,
+    error       TEXT,
+    issues      TEXT,
+    row_json    TEXT,
+    PRIMARY KEY (run_id, row_idx)
+);
+"""
+
+
+class ReviewStore:
+    """Resultados de una ejecución de revisión (run_id) en una base SQLite."""
+
+    def __init__(self, path: str = RESULTS_DB, run_id: Optional[str] = None):
+        self.path = path
+        self.run_id = run_id or uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path)
+
+    def reset(self):
+        """Borra los resultados de esta ejecución."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM results WHERE run_id = ?", (self.run_id,))
+
+    def add(self, results: List[Dict], rows: pd.DataFrame):
+        """
+        Guarda un bloque de resultados junto con su fila original.
+
+        Args:
+            results: Resultados de email_review (con "row_idx")
+            rows: Bloque del CSV subido, indexado por row_idx
+        """
+        records = []
+        for r in results:
+            severities = {issue.get("severity", "low") for issue in r["issues"]}
+            row = rows.loc[r["row_idx"]]
+            records.append((
+                self.run_id, int(r["row_idx"]), float(r["score"]), int(bool(r["is_english"])),
+                len(r["issues"]), *(int(s in severities) for s in SEVERITIES),
+                r.get("error"), json.dumps(r["issues"]),
+                row.to_json(force_ascii=False),
+            ))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records
+            )
+
+    def summary(self) -> Dict:
+        """Totales de la ejecución calculados en SQL."""
+        with closing(self._connect()) as conn:
+            total, issues, avg_score, english, errors = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(n_issues), 0), COALESCE(AVG(score), 0), "
+                "COALESCE(SUM(is_english), 0), COUNT(error) FROM results WHERE run_id = ?",
+                (self.run_id,)
+            ).fetchone()
+        return {"total": total, "issues": issues, "avg_score": avg_score, "english": english, "errors": errors}
+
+    def _flagged_where(self, min_score: float, severity: Optional[str]) -> tuple[str, list]:
+        where = "run_id = ? AND (score < ? OR n_issues > 0)"
+        params = [self.run_id, min_score]
+        if severity in SEVERITIES:
+            where += f" AND has_{severity} = 1"
+        return where, params
+
+    def count_flagged(self, min_score: float, severity: Optional[str] = None) -> int:
+        where, params = self._flagged_where(min_score, severity)
+        with closing(self._connect()) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM results WHERE {where}", params).fetchone()[0]
+
+    def flagged_page(self, min_score: float, severity: Optional[str] = None,
+                     page: int = 0, page_size: int = 20) -> List[Dict]:
+        """Solo las filas de la página pedida, ordenadas por row_idx."""
+        where, params = self._flagged_where(min_score, severity)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT row_idx, score, issues, error, row_json FROM results WHERE {where} "
+                "ORDER BY row_idx LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size]
+            ).fetchall()
+        return [
+            {"row_idx": row_idx, "score": score, "issues": json.loads(issues), "error": error,
+             "row": json.loads(row_json)}
+            for row_idx, score, issues, error, row_json in rows
+        ]
+
+    def iter_report(self, chunksize: int = 5000) -> Iterator[pd.DataFrame]:
+        """Reporte por bloques: columnas de resultado + columnas del CSV original."""
+        with closing(self._connect()) as conn:
+            query = (
+                "SELECT row_idx AS row_index, score, is_english, n_issues AS total_issues, row_json "
+                "FROM results WHERE run_id = ? ORDER BY row_idx"
+            )
+            for chunk in pd.read_sql_query(query, conn, params=(self.run_id,), chunksize=chunksize):
+                chunk["is_english"] = chunk["is_english"].astype(bool)
+                original = pd.DataFrame([json.loads(r) for r in chunk.pop("row_json")], index=chunk.index)
+                yield pd.concat([chunk, original], axis=1)
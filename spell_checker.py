@@ -6,10 +6,20 @@ Sube un CSV y revisa la columna 'body' para asegurar inglés natural y sin error
 
 import streamlit as st
 import pandas as pd
-import re
-from typing import List, Dict, Tuple
-import openai
 import os
+import uuid
+
+import api_metrics
+from csv_storage import atomic_open
+from email_review import (
+    EMAILS_PER_REQUEST, MAX_IN_FLIGHT, TOKENS_PER_MINUTE, ReviewCache, review_concurrently, review_with_template
+)
+from review_store import ReviewStore
+
+# Filas del CSV subido que se leen y revisan por bloque
+CHUNK_ROWS = 2000
+# Ejecuciones de revisión (ReviewStore) que se mantienen en st.cache_resource
+REVIEW_STORES_MAX = 32
 
 # Configuración de la página
 st.set_page_config(
@@ -28,144 +38,50 @@ st.sidebar.header("⚙️ Configuración")
 api_key = st.sidebar.text_input(
     "OpenAI API Key (opcional)",
     type="password",
-    help="Para revisión avanzada con GPT-4"
+    help="Para revisión avanzada con GPT-4o"
 )
 
 if api_key:
-    openai.api_key = api_key
     use_ai_review = True
 else:
     use_ai_review = False
     st.sidebar.info("💡 Sin API key: solo revisión básica de ortografía")
 
-# Función para revisión básica de ortografía
-def basic_spell_check(text: str) -> List[Dict]:
-    """Revisión básica de ortografía y gramática."""
-    issues = []
-    
-    # Palabras comunes mal escritas
-    common_mistakes = {
-        "recieve": "receive",
-        "seperate": "separate", 
-        "definately": "definitely",
-        "occured": "occurred",
-        "begining": "beginning",
-        "accomodate": "accommodate",
-        "acheive": "achieve",
-        "beleive": "believe",
-        "calender": "calendar",
-        "cemetary": "cemetery",
-        "concious": "conscious",
-        "embarass": "embarrass",
-        "existance": "existence",
-        "goverment": "government",
-        "independant": "independent",
-        "occassion": "occasion",
-        "priviledge": "privilege",
-        "rythm": "rhythm",
-        "seige": "siege",
-        "tommorrow": "tomorrow",
-        "untill": "until",
-        "writting": "writing"
-    }
-    
-    # Revisar palabras mal escritas
-    for mistake, correction in common_mistakes.items():
-        if mistake in text.lower():
-            issues.append({
-                "type": "spelling",
-                "issue": f"'{mistake}' should be '{correction}'",
-                "severity": "medium"
-            })
-    
-    # Revisar dobles espacios
-    if "  " in text:
-        issues.append({
-            "type": "formatting",
-            "issue": "Double spaces found",
-            "severity": "low"
-        })
-    
-    # Revisar espacios antes de puntuación
-    if re.search(r'\s+[.,!?;:]', text):
-        issues.append({
-            "type": "formatting", 
-            "issue": "Spaces before punctuation",
-            "severity": "low"
-        })
-    
-    return issues
+# Límites del ejecutor concurrente de revisión
+max_in_flight = st.sidebar.number_input(
+    "Revisiones simultáneas",
+    min_value=1, max_value=32, value=MAX_IN_FLIGHT,
+    help="Máximo de llamadas a la AI en vuelo al mismo tiempo"
+)
+tokens_per_minute = st.sidebar.number_input(
+    "Tokens por minuto",
+    min_value=1000, max_value=1_000_000, value=TOKENS_PER_MINUTE, step=1000,
+    help="Presupuesto de tokens por minuto de tu cuenta de OpenAI"
+)
+emails_per_request = st.sidebar.number_input(
+    "Emails por llamada",
+    min_value=1, max_value=20, value=EMAILS_PER_REQUEST,
+    help="Emails cortos que se revisan juntos en una sola llamada a la AI"
+)
 
-# Función para revisión con AI
-def ai_review(text: str) -> List[Dict]:
-    """Revisión avanzada con OpenAI GPT-4."""
-    if not use_ai_review:
-        return []
-    
-    try:
-        prompt = f"""
-        Review this email text for:
-        1. Spelling errors
-        2. Grammar mistakes  
-        3. Natural English flow
-        4. Professional tone
-        5. Clarity and directness
-        
-        Text to review:
-        {text}
-        
-        Respond in JSON format with this structure:
-        {{
-            "issues": [
-                {{
-                    "type": "spelling|grammar|style|clarity",
-                    "issue": "description of the issue",
-                    "suggestion": "suggested improvement",
-                    "severity": "low|medium|high"
-                }}
-            ],
-            "overall_score": 1-10,
-            "is_english": true/false
-        }}
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500,
-            temperature=0.3
-        )
-        
-        result = response.choices[0].message.content
-        # Parse JSON response
-        import json
-        return json.loads(result)
-        
-    except Exception as e:
-        st.error(f"Error en revisión AI: {e}")
-        return []
+dedupe_template = st.sidebar.checkbox(
+    "Revisar la plantilla una sola vez",
+    value=True,
+    help="Revisa BODY_TEMPLATE una vez y solo las líneas variables (saludo, hook, fondo), sin repetir las iguales"
+)
 
-# Función principal de revisión
-def review_email_body(body: str, row_idx: int) -> Dict:
-    """Revisar un email body completo."""
-    if pd.isna(body) or not body.strip():
-        return {"issues": [], "score": 0, "is_english": False}
-    
-    # Revisión básica
-    basic_issues = basic_spell_check(body)
-    
-    # Revisión AI si está disponible
-    ai_result = ai_review(body) if use_ai_review else {"issues": [], "overall_score": 8, "is_english": True}
-    
-    # Combinar resultados
-    all_issues = basic_issues + ai_result.get("issues", [])
-    
-    return {
-        "issues": all_issues,
-        "score": ai_result.get("overall_score", 8),
-        "is_english": ai_result.get("is_english", True),
-        "row_idx": row_idx
-    }
+@st.cache_resource
+def get_review_cache():
+    # Resultados por cuerpo de email: reabrir el mismo archivo no vuelve a revisar
+    return ReviewCache()
+
+@st.cache_resource(max_entries=REVIEW_STORES_MAX)
+def get_review_store(run_id):
+    # Resultados de la revisión en SQLite: no se guardan en memoria ni en session_state.
+    # Cada revisión es un run_id nuevo; si se desaloja, se recrea con el mismo run_id
+    return ReviewStore(run_id=run_id)
+
+SEVERITY_ICONS = {"low": "🟡", "medium": "🟠", "high": "🔴"}
 
 # Interfaz principal
 st.header("📤 Subir Archivo CSV")
@@ -178,63 +94,109 @@ uploaded_file = st.file_uploader(
 
 if uploaded_file is not None:
     try:
-        # Leer CSV
-        df = pd.read_csv(uploaded_file)
-        st.success(f"✅ Archivo cargado: {len(df)} registros")
+        # Solo se leen unas filas para el preview; el archivo completo se procesa por bloques
+        preview_df = pd.read_csv(uploaded_file, nrows=5)
+        uploaded_file.seek(0)
+        st.success(f"✅ Archivo cargado: {uploaded_file.size / 1_000_000:.1f} MB")
         
         # Verificar que existe la columna 'body'
-        if 'body' not in df.columns:
+        if 'body' not in preview_df.columns:
             st.error("❌ No se encontró la columna 'body' en el CSV")
             st.info("💡 El CSV debe contener una columna llamada 'body'")
         else:
-            st.info(f"📋 Columnas encontradas: {', '.join(df.columns)}")
+            st.info(f"📋 Columnas encontradas: {', '.join(preview_df.columns)}")
             
             # Mostrar preview
             st.subheader("📋 Preview del archivo")
-            st.dataframe(df.head(), use_container_width=True)
+            st.dataframe(preview_df, use_container_width=True)
             
             # Botón para iniciar revisión
             if st.button("🔍 Iniciar Revisión de Emails", type="primary"):
                 st.subheader("🔍 Revisando emails...")
                 
-                # Crear contenedores para resultados
-                results_container = st.container()
+                previous_run = st.session_state.get('review_run')
+                if previous_run:
+                    get_review_store(previous_run).reset()
+                store = get_review_store(uuid.uuid4().hex)
+                st.session_state['review_run'] = store.run_id
+                
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                live_metrics = st.empty()
                 
-                all_results = []
-                total_rows = len(df)
-                
-                # Revisar cada email
-                for idx, row in df.iterrows():
-                    status_text.text(f"Revisando email {idx + 1} de {total_rows}")
-                    progress_bar.progress((idx + 1) / total_rows)
+                # Revisar en paralelo; los resultados llegan según terminan
+                review_options = dict(
+                    api_key=api_key if use_ai_review else None,
+                    max_in_flight=int(max_in_flight),
+                    tokens_per_minute=int(tokens_per_minute),
+                    emails_per_request=int(emails_per_request),
+                    cache=get_review_cache()
+                )
+                api_metrics.start_run("spell_check")
+                done = 0
+                cached_count = 0
+                failed_count = 0
+                issues_count = 0
+                # Fragmentos de plantilla ya revisados, compartidos por todos los bloques
+                fragment_reviews = {}
+                for chunk in pd.read_csv(uploaded_file, chunksize=CHUNK_ROWS):
+                    rows = zip(chunk.index, chunk['body'])
+                    if dedupe_template:
+                        results_stream = review_with_template(
+                            rows,
+                            on_progress=lambda batch, total: status_text.text(
+                                f"Revisando fragmentos variables: lote {batch} de {total}"
+                            ),
+                            reviews=fragment_reviews,
+                            **review_options
+                        )
+                    else:
+                        results_stream = review_concurrently(rows, **review_options)
                     
-                    result = review_email_body(row['body'], idx)
-                    all_results.append(result)
+                    chunk_results = []
+                    for result in results_stream:
+                        chunk_results.append(result)
+                        cached_count += result.get("cached", False)
+                        failed_count += "error" in result
+                        issues_count += len(result['issues'])
+                        status_text.text(f"Revisado email {result['row_idx'] + 1} ({done + len(chunk_results)} revisados)")
+                    store.add(chunk_results, chunk)
+                    done += len(chunk_results)
+                    
+                    progress_bar.progress(min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0))
+                    live_metrics.caption(
+                        f"✅ {done} revisados · 💾 {cached_count} desde caché · "
+                        f"⚠️ {issues_count} issues · ❌ {failed_count} errores AI"
+                    )
+                
+                progress_bar.progress(1.0)
+                api_metrics.finish_run(show=False)
+                st.caption(f"🧾 Métricas de la revisión en {api_metrics.registry.trace_path} (pestaña 📈 Métricas de app.py)")
+                if failed_count:
+                    st.error(f"Error en revisión AI en {failed_count} emails (se muestra solo la revisión básica)")
+            
+            # Mostrar resultados (persisten entre reruns mientras dure la sesión)
+            if st.session_state.get('review_run'):
+                store = get_review_store(st.session_state['review_run'])
+                summary = store.summary()
                 
-                # Mostrar resultados
-                with results_container:
+                if summary['total']:
                     st.subheader("📊 Resultados de la Revisión")
                     
                     # Estadísticas generales
-                    total_issues = sum(len(r['issues']) for r in all_results)
-                    avg_score = sum(r['score'] for r in all_results) / len(all_results)
-                    english_emails = sum(1 for r in all_results if r['is_english'])
-                    
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
-                        st.metric("Total emails", len(all_results))
+                        st.metric("Total emails", summary['total'])
                     with col2:
-                        st.metric("Total issues", total_issues)
+                        st.metric("Total issues", summary['issues'])
                     with col3:
-                        st.metric("Score promedio", f"{avg_score:.1f}/10")
+                        st.metric("Score promedio", f"{summary['avg_score']:.1f}/10")
                     with col4:
-                        st.metric("En inglés", f"{english_emails}/{len(all_results)}")
+                        st.metric("En inglés", f"{summary['english']}/{summary['total']}")
                     
                     # Filtros para resultados
                     st.subheader("🔧 Filtros")
-                    col1, col2 = st.columns(2)
+                    col1, col2, col3 = st.columns(3)
                     
                     with col1:
                         min_score = st.slider("Score mínimo", 1, 10, 7)
@@ -243,42 +205,38 @@ if uploaded_file is not None:
                             "Severidad mínima",
                             ["Todas", "low", "medium", "high"]
                         )
+                    with col3:
+                        page_size = st.selectbox("Emails por página", [10, 20, 50, 100], index=1)
                     
                     # Mostrar emails con problemas
                     st.subheader("⚠️ Emails que necesitan revisión")
                     
-                    emails_to_review = []
-                    for result in all_results:
-                        if result['score'] < min_score or len(result['issues']) > 0:
-                            # Filtrar por severidad
-                            if severity_filter != "Todas":
-                                filtered_issues = [i for i in result['issues'] if i.get('severity') == severity_filter]
-                                if not filtered_issues:
-                                    continue
-                            
-                            emails_to_review.append(result)
+                    flagged_count = store.count_flagged(min_score, severity_filter)
                     
-                    if emails_to_review:
-                        for result in emails_to_review:
+                    if flagged_count:
+                        pages = (flagged_count + page_size - 1) // page_size
+                        page = st.number_input(
+                            f"Página (de {pages})", min_value=1, max_value=pages, value=1
+                        ) - 1
+                        st.caption(f"{flagged_count} emails marcados · mostrando página {page + 1} de {pages}")
+                        
+                        # Solo se leen de disco las filas de esta página
+                        for result in store.flagged_page(min_score, severity_filter, page, page_size):
                             row_idx = result['row_idx']
-                            row = df.iloc[row_idx]
+                            row = result['row']
                             
-                            with st.expander(f"📧 Email {row_idx + 1} - Score: {result['score']}/10"):
+                            with st.expander(f"📧 Email {row_idx + 1} - Score: {result['score']:g}/10"):
                                 # Información del contacto
-                                if 'Full_name' in df.columns:
-                                    st.write(f"**Contacto:** {row.get('Full_name', 'N/A')}")
-                                if 'email' in df.columns:
-                                    st.write(f"**Email:** {row.get('email', 'N/A')}")
+                                if 'Full_name' in row:
+                                    st.write(f"**Contacto:** {row.get('Full_name') or 'N/A'}")
+                                if 'email' in row:
+                                    st.write(f"**Email:** {row.get('email') or 'N/A'}")
                                 
                                 # Issues encontrados
                                 if result['issues']:
                                     st.write("**Problemas encontrados:**")
                                     for issue in result['issues']:
-                                        severity_color = {
-                                            "low": "🟡",
-                                            "medium": "🟠", 
-                                            "high": "🔴"
-                                        }.get(issue.get('severity', 'low'), "🟡")
+                                        severity_color = SEVERITY_ICONS.get(issue.get('severity', 'low'), "🟡")
                                         
                                         st.write(f"{severity_color} **{issue.get('type', 'unknown').title()}:** {issue.get('issue', 'N/A')}")
                                         if 'suggestion' in issue:
@@ -288,7 +246,7 @@ if uploaded_file is not None:
                                 st.write("**Email body:**")
                                 st.text_area(
                                     "Contenido del email",
-                                    value=row['body'],
+                                    value=row.get('body') or "",
                                     height=200,
                                     key=f"body_{row_idx}"
                                 )
@@ -297,20 +255,11 @@ if uploaded_file is not None:
                     
                     # Botón para exportar resultados
                     if st.button("📥 Exportar Reporte"):
-                        # Crear reporte
-                        report_df = pd.DataFrame()
-                        report_df['row_index'] = [r['row_idx'] for r in all_results]
-                        report_df['score'] = [r['score'] for r in all_results]
-                        report_df['is_english'] = [r['is_english'] for r in all_results]
-                        report_df['total_issues'] = [len(r['issues']) for r in all_results]
-                        
-                        # Agregar columnas del CSV original
-                        for col in df.columns:
-                            report_df[col] = df[col].values
-                        
-                        # Guardar reporte
+                        # Reporte escrito por bloques desde SQLite, con renombrado atómico
                         report_file = "email_review_report.csv"
-                        report_df.to_csv(report_file, index=False)
+                        with atomic_open(report_file, suffix=".tmp") as f:
+                            for i, report_chunk in enumerate(store.iter_report(CHUNK_ROWS)):
+                                report_chunk.to_csv(f, index=False, header=(i == 0))
                         st.success(f"✅ Reporte exportado: {report_file}")
                         
     except Exception as e:
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Almacenamiento "template-delta" de 857-vc-funds-with-email-template.csv.
+
+Email_Subject, Email_Body y Email_Template repiten en cada fila la misma
+plantilla (~1 KB). En modo delta el CSV guarda por fila solo los tokens
+(Honorific, Last Name, Investors, Short_Name, Person_Hook) y la columna
+Template_Version; las plantillas se guardan una vez en <csv>.templates.json
+con un ID de versión (hash del contenido). Las celdas derivadas quedan vacías
+y se renderizan al ver o exportar; solo se escriben las que difieren de lo
+derivado (ediciones a mano, cuerpos antiguos), así que no se pierde nada.
+
+- csv_storage lee y escribe este formato de forma transparente: si el CSV
+  ya está en modo delta se mantiene; CSV_STORAGE=delta / full lo fuerza.
+- encode() / expand() convierten entre el DataFrame completo y el compacto.
+- render_row() usa un LRU por (versión de plantilla, tokens de la fila).
+- Es el único render de plantillas: dataset_schema (with_bodies, email_body)
+  y build_email_body() / build_email_subject() de
+  regenerate_emails_with_short_name llaman a estas funciones.
+
+    python template_store.py --to-delta     # convierte DATA_FILE
+    python template_store.py --to-full      # vuelve al CSV completo
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from regenerate_emails_with_short_name import BODY_TEMPLATE, LANDING_PAGE, SUBJECT_TEMPLATE
+
+VERSION_COLUMN = "Template_Version"
+DERIVED_COLUMNS = ["Email_Subject", "Email_Body", "Email_Template"]
+# Columnas con las que se rellena la plantilla
+TOKEN_COLUMNS = ["Honorific", "Last Name", "Investors", "Short_Name", "Person_Hook"]
+# Columnas de las que depende Email_Template ("Subject: ...\n\n" + cuerpo)
+TEMPLATE_INPUT_COLUMNS = TOKEN_COLUMNS + ["Email_Subject", "Email_Body"]
+
+STORAGE_ENV = "CSV_STORAGE"
+RENDER_CACHE_SIZE = 4096
+
+# Marca en df.attrs: las celdas vacías de DERIVED_COLUMNS se derivan de la plantilla
+COMPACT_ATTR = "compact_bodies"
+
+_TOKEN_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+def template_version(template: Dict[str, str]) -> str:
+    """ID de versión: hash corto del contenido de la plantilla."""
+    payload = json.dumps(template, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+CURRENT_TEMPLATE = {"subject": SUBJECT_TEMPLATE, "body": BODY_TEMPLATE, "landing_page": LANDING_PAGE}
+CURRENT_VERSION = template_version(CURRENT_TEMPLATE)
+
+# Plantillas conocidas por versión (se completan al leer los .templates.json)
+_templates: Dict[str, Dict[str, str]] = {CURRENT_VERSION: CURRENT_TEMPLATE}
+_templates_lock = threading.Lock()
+
+
+def templates_path(data_path: str) -> str:
+    return f"{data_path}.templates.json"
+
+
+def load_templates(data_path: str) -> Dict[str, Dict[str, str]]:
+    """Registra las plantillas del archivo hermano de `data_path` y las devuelve."""
+    path = templates_path(data_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        stored = json.load(f)
+    with _templates_lock:
+        _templates.update(stored)
+    return stored
+
+
+def save_templates(data_path: str, versions):
+    """Guarda en el archivo hermano las plantillas de `versions` (más las ya guardadas)."""
+    from csv_storage import atomic_open
+
+    stored = load_templates(data_path)
+    wanted = {v: _templates[v] for v in versions if v in _templates}
+    if all(v in stored for v in wanted):
+        return
+    with atomic_open(templates_path(data_path), suffix=".tmp") as f:
+        json.dump({**stored, **wanted}, f, ensure_ascii=False, indent=2)
+
+
+def get_template(version: str) -> Dict[str, str]:
+    try:
+        return _templates[version]
+    except KeyError:
+        raise KeyError(f"Plantilla {version} desconocida: falta su entrada en el .templates.json") from None
+
+
+# ---------------------------------------------------------------------------
+# Render
+# ---------------------------------------------------------------------------
+
+def _text(frame: pd.DataFrame, col: str) -> pd.Series:
+    """Como safe_get() para toda la columna: '' si falta, texto sin espacios."""
+    if col not in frame.columns:
+        return pd.Series("", index=frame.index, dtype=object)
+    values = frame[col].astype(object)
+    return values.where(values.notna(), "").astype(str).str.strip()
+
+
+def _fill(text: str, tokens: Dict[str, pd.Series], index) -> pd.Series:
+    parts = _TOKEN_RE.split(text)
+    result = pd.Series(parts[0], index=index, dtype=object)
+    for i in range(1, len(parts), 2):
+        result = result + tokens[parts[i]] + parts[i + 1]
+    return result
+
+
+def _render_group(frame: pd.DataFrame, template: Dict[str, str]) -> Tuple[pd.Series, pd.Series]:
+    """build_email_subject() / build_email_body() vectorizados con `template`."""
+    fund = _text(frame, "Investors")
+    short = _text(frame, "Short_Name")
+    hook = _text(frame, "Person_Hook")
+    tokens = {
+        "honorific": _text(frame, "Honorific"),
+        "last_name": _text(frame, "Last Name"),
+        "fund_name": fund,
+        "short_name": short.where(short != "", fund),
+        "person_hook_sentence": hook.where(hook != "", "your leadership at " + fund + " caught my attention"),
+        "landing_page": pd.Series(template["landing_page"], index=frame.index, dtype=object),
+    }
+    return _fill(template["subject"], tokens, frame.index), _fill(template["body"], tokens, frame.index)
+
+
+def row_versions(frame: pd.DataFrame) -> pd.Series:
+    """Versión de plantilla de cada fila (NaN = la fila no deriva nada)."""
+    if VERSION_COLUMN in frame.columns:
+        return frame[VERSION_COLUMN].astype(object)
+    return pd.Series(CURRENT_VERSION, index=frame.index, dtype=object)
+
+
+def render_frame(frame: pd.DataFrame, versions: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Asunto y cuerpo derivados de cada fila según su versión (sin mirar overrides)."""
+    versions = row_versions(frame) if versions is None else versions
+    rendered = pd.DataFrame({"Email_Subject": np.nan, "Email_Body": np.nan}, index=frame.index, dtype=object)
+    for version, rows in versions.groupby(versions, sort=False).groups.items():
+        subject, body = _render_group(frame.loc[rows], get_template(version))
+        rendered.loc[rows, "Email_Subject"] = subject
+        rendered.loc[rows, "Email_Body"] = body
+    return rendered
+
+
+def _compose(subject: pd.Series, body: pd.Series) -> pd.Series:
+    return "Subject: " + subject.astype(object) + "\n\n" + body.astype(object)
+
+
+def _override(frame: pd.DataFrame, col: str, derived: pd.Series) -> pd.Series:
+    if col not in frame.columns:
+        return derived
+    stored = frame[col].astype(object)
+    return stored.where(stored.notna(), derived)
+
+
+def resolve(frame: pd.DataFrame) -> pd.DataFrame:
+    """Email_Subject / Email_Body / Email_Template finales: override si existe, si no derivado."""
+    rendered = render_frame(frame)
+    subject = _override(frame, "Email_Subject", rendered["Email_Subject"])
+    body = _override(frame, "Email_Body", rendered["Email_Body"])
+    derived_template = _compose(subject, body).where(row_versions(frame).notna())
+    template = _override(frame, "Email_Template", derived_template)
+    return pd.DataFrame({"Email_Subject": subject, "Email_Body": body, "Email_Template": template})
+
+
+def row_tokens(row) -> Tuple[str, ...]:
+    """Tokens de una fila (Series o dict) en el orden de TOKEN_COLUMNS."""
+    values = []
+    for col in TOKEN_COLUMNS:
+        value = row.get(col)
+        values.append("" if value is None or pd.isna(value) else str(value).strip())
+    return tuple(values)
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_tokens(version: str, tokens: Tuple[str, ...]) -> Tuple[str, str]:
+    """(asunto, cuerpo) de una fila; cacheado por (versión, tokens)."""
+    frame = pd.DataFrame([dict(zip(TOKEN_COLUMNS, tokens))])
+    subject, body = _render_group(frame, get_template(version))
+    return subject.iloc[0], body.iloc[0]
+
+
+def render_row(row) -> Dict[str, Optional[str]]:
+    """Email_Subject / Email_Body / Email_Template de una fila (override o render con LRU)."""
+    stored = {col: row.get(col) for col in DERIVED_COLUMNS}
+    resolved = {col: value if isinstance(value, str) else None for col, value in stored.items()}
+    version = row.get(VERSION_COLUMN, CURRENT_VERSION)
+    if version is None or (not isinstance(version, str) and pd.isna(version)):
+        return resolved
+    if resolved["Email_Subject"] is None or resolved["Email_Body"] is None:
+        subject, body = render_tokens(version, row_tokens(row))
+        resolved["Email_Subject"] = subject if resolved["Email_Subject"] is None else resolved["Email_Subject"]
+        resolved["Email_Body"] = body if resolved["Email_Body"] is None else resolved["Email_Body"]
+    if resolved["Email_Template"] is None:
+        resolved["Email_Template"] = f"Subject: {resolved['Email_Subject']}\n\n{resolved['Email_Body']}"
+    return resolved
+
+
+# ---------------------------------------------------------------------------
+# Conversión completo <-> compacto
+# ---------------------------------------------------------------------------
+
+def is_compact(frame: pd.DataFrame) -> bool:
+    return bool(frame.attrs.get(COMPACT_ATTR))
+
+
+def encode(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    DataFrame compacto: vacía las celdas derivables y asigna a cada fila la
+    versión de plantilla con la que coincide su cuerpo (la que ya tenía o la
+    actual). Filas sin cuerpo no derivan nada (versión vacía).
+    """
+    if is_compact(df):
+        return df.copy()
+    out = df.copy()
+    present = [col for col in DERIVED_COLUMNS if col in out.columns]
+    if "Email_Body" not in present:
+        return out
+    body = out["Email_Body"].astype(object)
+
+    versions = row_versions(out)
+    matches = body == render_frame(out, versions)["Email_Body"]
+    retry = ~matches & (versions != CURRENT_VERSION)
+    if retry.any():
+        current = pd.Series(CURRENT_VERSION, index=out.index[retry], dtype=object)
+        matches_current = body[retry] == render_frame(out.loc[retry], current)["Email_Body"]
+        versions = versions.where(~matches_current.reindex(out.index, fill_value=False), CURRENT_VERSION)
+    versions = versions.where(versions.notna(), CURRENT_VERSION).where(body.notna())
+
+    out[VERSION_COLUMN] = versions
+    rendered = render_frame(out)
+    subject = out["Email_Subject"].astype(object) if "Email_Subject" in present else None
+    for col in present:
+        stored = out[col].astype(object)
+        if col == "Email_Template":
+            derived = _compose(subject if subject is not None else rendered["Email_Subject"], body)
+        else:
+            derived = rendered[col]
+        out[col] = stored.where((stored != derived) | versions.isna())
+    out.attrs[COMPACT_ATTR] = True
+    return out
+
+
+def expand(frame: pd.DataFrame, keep_version: bool = True) -> pd.DataFrame:
+    """DataFrame completo con las celdas derivadas renderizadas."""
+    if not is_compact(frame):
+        return frame
+    full = frame.copy()
+    resolved = resolve(frame)
+    for col in DERIVED_COLUMNS:
+        if col in full.columns:
+            full[col] = resolved[col].infer_objects()
+    if not keep_version:
+        full = full.drop(columns=VERSION_COLUMN, errors="ignore")
+    full.attrs.pop(COMPACT_ATTR, None)
+    return full
+
+
+def _pin(df: pd.DataFrame, idx, col: str, value, setter):
+    if col in df.columns and pd.isna(df.at[idx, col]):
+        setter(df, idx, col, value)
+
+
+def set_value(df: pd.DataFrame, idx, col: str, value, setter=None):
+    """
+    Asigna una celda de un DataFrame compacto. Si la celda es entrada de un
+    valor derivado, ese valor se fija antes como override: cambiar el hook no
+    reescribe un cuerpo ya guardado (igual que con el CSV completo). Un cuerpo
+    igual al derivado se guarda vacío.
+    """
+    if setter is None:
+        from csv_storage import set_cell as setter
+    if is_compact(df) and idx in df.index and pd.notna(row_versions(df.loc[[idx]]).loc[idx]):
+        current = resolve(df.loc[[idx]]).loc[idx]
+        if col in TEMPLATE_INPUT_COLUMNS:
+            _pin(df, idx, "Email_Template", current["Email_Template"], setter)
+        if col in TOKEN_COLUMNS:
+            _pin(df, idx, "Email_Subject", current["Email_Subject"], setter)
+            _pin(df, idx, "Email_Body", current["Email_Body"], setter)
+        if col in ("Email_Subject", "Email_Body") and isinstance(value, str):
+            derived = render_frame(df.loc[[idx]]).at[idx, col]
+            value = np.nan if value == derived else value
+        elif col == "Email_Template" and isinstance(value, str):
+            value = np.nan if value == current["Email_Template"] else value
+    setter(df, idx, col, value)
+
+
+# ---------------------------------------------------------------------------
+# Integración con csv_storage
+# ---------------------------------------------------------------------------
+
+def file_is_delta(path: str) -> bool:
+    """True si la cabecera del CSV tiene la columna de versión."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header = f.readline()
+    except FileNotFoundError:
+        return False
+    return VERSION_COLUMN in next(csv.reader([header]), [])
+
+
+def use_delta(path: str) -> bool:
+    """Formato con el que se escribe `path`: CSV_STORAGE o, si no, el formato actual del archivo."""
+    mode = os.getenv(STORAGE_ENV, "").strip().lower()
+    if mode in ("delta", "full"):
+        return mode == "delta"
+    return file_is_delta(path)
+
+
+def decode(df: pd.DataFrame, path: str, compact: bool = False) -> pd.DataFrame:
+    """DataFrame leído de un CSV delta: compacto (compact=True) o completo."""
+    if VERSION_COLUMN not in df.columns:
+        return df
+    load_templates(path)
+    df.attrs[COMPACT_ATTR] = True
+    return df if compact else expand(df)
+
+
+def to_disk(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """El DataFrame tal como se escribe en `path` (delta o completo)."""
+    if use_delta(path):
+        out = encode(df)
+        versions = out[VERSION_COLUMN].dropna().unique() if VERSION_COLUMN in out.columns else []
+        save_templates(path, versions)
+        return out
+    return expand(df, keep_version=False).drop(columns=VERSION_COLUMN, errors="ignore")
+
+
+def main():
+    from csv_storage import DATA_FILE, file_lock, read_csv_versioned, _write_atomic
+
+    parser = argparse.ArgumentParser(description="Convierte el CSV entre formato completo y template-delta")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--to-delta", action="store_true", help="Guardar solo tokens + versión de plantilla")
+    group.add_argument("--to-full", action="store_true", help="Volver a escribir los emails completos")
+    parser.add_argument("--path", default=DATA_FILE)
+    args = parser.parse_args()
+
+    size_before = os.path.getsize(args.path)
+    with file_lock(args.path):
+        df, _ = read_csv_versioned(args.path)
+        os.environ[STORAGE_ENV] = "delta" if args.to_delta else "full"
+        _write_atomic(df, args.path)
+    size_after = os.path.getsize(args.path)
+
+    started = time.perf_counter()
+    compact_df, _ = read_csv_versioned(args.path, compact=True)
+    load_seconds = time.perf_counter() - started
+    print(f"✅ {args.path} en formato {'delta' if args.to_delta else 'completo'}")
+    print(f"   💾 {size_before / 1024:,.0f} KB → {size_after / 1024:,.0f} KB")
+    print(f"   ⏱️ Carga: {load_seconds * 1000:,.0f} ms · memoria "
+          f"{compact_df.memory_usage(deep=True).sum() / 1024:,.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Escrituras atómicas, lock y detección de datos obsoletos (csv_storage.py)."""
+
+import os
+import stat
+
+import pandas as pd
+import pytest
+
+from csv_storage import (
+    LockTimeoutError, StaleDataError, atomic_open, file_lock, file_version, read_csv_versioned,
+    update_rows, update_rows_from, write_csv_atomic
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.delenv("CSV_STORAGE", raising=False)
+    path = str(tmp_path / "contacts.csv")
+    pd.DataFrame({"Investors": ["Fund A", "Fund B"], "Person_Hook": ["hook a", "hook b"]}).to_csv(path, index=False)
+    return path
+
+
+def test_stale_write_raises_and_keeps_the_file(csv_path):
+    df, version = read_csv_versioned(csv_path)
+    other = df.copy()
+    other.loc[0, "Person_Hook"] = "written by someone else"
+    write_csv_atomic(other, csv_path, expected_version=version)
+
+    df.loc[1, "Person_Hook"] = "stale edit"
+    with pytest.raises(StaleDataError):
+        write_csv_atomic(df, csv_path, expected_version=version)
+    assert pd.read_csv(csv_path)["Person_Hook"].tolist() == ["written by someone else", "hook b"]
+
+
+def test_write_returns_the_new_version(csv_path):
+    df, version = read_csv_versioned(csv_path)
+    df.loc[0, "Person_Hook"] = "a much longer hook than before"
+    new_version = write_csv_atomic(df, csv_path, expected_version=version)
+    assert new_version == file_version(csv_path) != version
+
+
+def test_update_rows_touches_only_the_given_cells(csv_path):
+    update_rows({1: {"Person_Hook": "new hook b"}}, csv_path)
+    df = pd.read_csv(csv_path)
+    assert df["Person_Hook"].tolist() == ["hook a", "new hook b"]
+    assert df["Investors"].tolist() == ["Fund A", "Fund B"]
+
+
+def test_update_rows_from_reports_whether_the_file_was_in_sync(csv_path):
+    _, version = read_csv_versioned(csv_path)
+    version, in_sync = update_rows_from({0: {"Person_Hook": "first"}}, version, csv_path)
+    assert in_sync
+    update_rows({1: {"Person_Hook": "someone else"}}, csv_path)
+    _, in_sync = update_rows_from({0: {"Person_Hook": "second"}}, version, csv_path)
+    assert not in_sync
+    assert pd.read_csv(csv_path)["Person_Hook"].tolist() == ["second", "someone else"]
+
+
+def test_failed_atomic_write_leaves_the_original(csv_path):
+    before = open(csv_path).read()
+    with pytest.raises(RuntimeError):
+        with atomic_open(csv_path) as f:
+            f.write("partial")
+            raise RuntimeError("boom")
+    assert open(csv_path).read() == before
+    assert not [name for name in os.listdir(os.path.dirname(csv_path)) if name.startswith(".tmp-")]
+
+
+def test_atomic_write_keeps_the_file_mode(csv_path):
+    os.chmod(csv_path, 0o640)
+    with atomic_open(csv_path) as f:
+        f.write("Investors\nFund C\n")
+    assert stat.S_IMODE(os.stat(csv_path).st_mode) == 0o640
+
+
+def test_lock_times_out_while_held(csv_path):
+    with file_lock(csv_path):
+        with pytest.raises(LockTimeoutError):
+            with file_lock(csv_path, timeout=0.1):
+                pass
@@ -0,0 +1,56 @@
+"""El esquema compacto de dataset_schema.py no pierde datos."""
+
+import numpy as np
+import pandas as pd
+
+import dataset_schema
+from regenerate_emails_with_short_name import build_email_body, build_email_subject
+
+
+def _frame() -> pd.DataFrame:
+    df = pd.DataFrame({
+        "Primary Contact": ["Omar Haddad", "Sara Khan", "Ali Saleh"],
+        "country": ["UAE", "UAE", "Egypt"],
+        "Honorific": ["Mr.", "Ms.", np.nan],
+        "Last Name": ["Haddad", "Khan", "Saleh"],
+        "Investors": ["Gulf Ventures LLC", "Desert Capital", "Nile Partners"],
+        "Short_Name": ["Gulf Ventures", "Desert", "Nile"],
+        "Person_Hook": ["your fintech bets caught my attention", np.nan, np.nan],
+        "Hook_Confidence": [8, np.nan, 7],
+    })
+    df["Email_Subject"] = [build_email_subject(row) for _, row in df.iterrows()]
+    df["Email_Body"] = [build_email_body(row) for _, row in df.iterrows()]
+    df.loc[2, "Email_Body"] = "Edited by hand"
+    df["Email_Template"] = "Subject: " + df["Email_Subject"] + "\n\n" + df["Email_Body"]
+    return df
+
+
+def test_with_bodies_restores_the_original_values():
+    df = _frame()
+    compact = dataset_schema.compact(df)
+    assert str(compact["Hook_Confidence"].dtype) == "Int8"
+    assert isinstance(compact["country"].dtype, pd.CategoricalDtype)
+
+    full = dataset_schema.with_bodies(compact)
+    assert list(full.columns) == list(df.columns)
+    for col in df.columns:
+        assert full[col].astype(object).where(full[col].notna(), None).tolist() == \
+            df[col].astype(object).where(df[col].notna(), None).tolist(), col
+
+
+def test_email_body_matches_with_bodies():
+    compact = dataset_schema.compact(_frame())
+    full = dataset_schema.with_bodies(compact)
+    for idx in compact.index:
+        assert dataset_schema.email_body(compact.loc[idx]) == full.at[idx, "Email_Body"]
+        assert dataset_schema.email_subject(compact.loc[idx]) == full.at[idx, "Email_Subject"]
+
+
+def test_set_value_respects_the_compact_schema():
+    compact = dataset_schema.compact(_frame())
+    dataset_schema.set_value(compact, 1, "Hook_Confidence", "8")
+    dataset_schema.set_value(compact, 0, "Hook_Confidence", "")
+    dataset_schema.set_value(compact, 2, "country", "Oman")
+    assert compact.at[1, "Hook_Confidence"] == 8
+    assert pd.isna(compact.at[0, "Hook_Confidence"])
+    assert compact.at[2, "country"] == "Oman"
@@ -0,0 +1,140 @@
+"""Presupuesto de tokens y reintentos del pipeline de revisión (email_review.py)."""
+
+import pytest
+
+import email_review
+from email_review import TokenBudget, with_retries
+
+
+class FakeClock:
+    """Sustituye al módulo time de email_review: sleep() avanza el reloj sin esperar."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(email_review, "time", fake)
+    return fake
+
+
+def test_token_budget_blocks_until_the_window_frees(clock):
+    budget = TokenBudget(tokens_per_minute=1000)
+    budget.acquire(600)
+    budget.acquire(400)
+    assert clock.sleeps == []
+    budget.acquire(100)
+    # Espera a que salga de la ventana de 60 s la primera reserva
+    assert 60 <= clock.now - 1000.0 < 61
+
+
+def test_token_budget_caps_a_single_request(clock):
+    budget = TokenBudget(tokens_per_minute=1000)
+    budget.acquire(5000)
+    assert clock.sleeps == []
+
+
+def test_with_retries_retries_then_succeeds(clock):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("timeout")
+        return "ok"
+
+    assert with_retries(flaky, max_retries=3, backoff=1.0) == "ok"
+    assert len(attempts) == 3
+    # Backoff exponencial (1 s, 2 s) más jitter de hasta 1 s
+    assert 1.0 <= clock.sleeps[0] <= 2.0 and 2.0 <= clock.sleeps[1] <= 3.0
+
+
+def test_with_retries_gives_up_after_max_retries(clock):
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        raise ConnectionError("timeout")
+
+    with pytest.raises(ConnectionError):
+        with_retries(failing, max_retries=2, backoff=0.5)
+    assert len(attempts) == 3
+
+
+# --- Revisión deduplicada por plantilla ---
+
+def _bodies():
+    from regenerate_emails_with_short_name import build_email_body
+
+    contacts = [
+        {"Honorific": "Mr.", "Last Name": "Haddad", "Investors": "Gulf Ventures", "Person_Hook": ""},
+        {"Honorific": "Ms.", "Last Name": "Khan", "Investors": "Desert Capital",
+         "Person_Hook": "your recieved  awards in fintech"},
+        {"Honorific": "Mr.", "Last Name": "Haddad", "Investors": "Gulf Ventures", "Person_Hook": ""},
+        {"Honorific": "", "Last Name": "Saleh", "Investors": "Nile Partners", "Person_Hook": "tu trabajo en Nile"},
+    ]
+    bodies = [build_email_body(contact) for contact in contacts]
+    # Cuerpo editado a mano: no sigue la plantilla y se revisa completo
+    bodies.append("Dear Omar,\n\nThis email was rewriten by hand.")
+    return list(enumerate(bodies))
+
+
+def _by_row(results):
+    return {r["row_idx"]: (sorted(map(str, r["issues"])), r["score"], r["is_english"]) for r in results}
+
+
+def test_review_with_template_matches_review_concurrently():
+    rows = _bodies()
+    expected = _by_row(email_review.review_concurrently(rows))
+    assert _by_row(email_review.review_with_template(rows)) == expected
+    assert len(expected) == len(rows)
+
+
+def test_shared_reviews_skip_fragments_seen_in_earlier_chunks(monkeypatch):
+    reviewed = []
+    basic = email_review.basic_spell_check_series
+    monkeypatch.setattr(email_review, "basic_spell_check_series", lambda texts: reviewed.append(list(texts)) or basic(texts))
+    rows = _bodies()[:4]
+    reviews = {}
+    list(email_review.review_with_template(rows[:2], reviews=reviews))
+    first_call = reviewed.pop()
+
+    second = email_review.review_with_template(rows[2:], reviews=reviews)
+    # La fila 2 repite los fragmentos de la fila 0: sale antes de revisar nada
+    assert next(second)["row_idx"] == 2 and not reviewed
+    list(second)
+    assert [text for texts in reviewed for text in texts if text in first_call] == []
+
+
+def test_failed_fragments_are_retried_in_the_next_chunk(monkeypatch):
+    calls = []
+
+    def ai_review_fragments(fragments, api_key):
+        calls.append(dict(fragments))
+        if len(calls) == 1:
+            raise TimeoutError("timeout")
+        return {fid: {"issues": [], "overall_score": 9} for fid in fragments}
+
+    monkeypatch.setattr(email_review, "ai_review_fragments", ai_review_fragments)
+    splitter = email_review.TemplateSplitter()
+    rows = _bodies()[:4]
+    reviews = {}
+    first = list(email_review.review_with_template(rows[:2], api_key="key", max_retries=0, reviews=reviews))
+    assert all("error" in r for r in first)
+    assert splitter.template not in reviews
+
+    second = list(email_review.review_with_template(rows[2:], api_key="key", max_retries=0, reviews=reviews))
+    assert not any("error" in r for r in second)
+    assert splitter.template in reviews
+    # Se pidió dos veces: la que falló y el reintento del bloque siguiente
+    assert sum(splitter.template in fragments.values() for fragments in calls) == 2
@@ -0,0 +1,45 @@
+"""Validación de la respuesta empaquetada de generate_hooks.py."""
+
+import json
+
+import generate_hooks
+from generate_hooks import PACKED_MAX_WORDS, parse_packed_hooks
+
+
+def _response(items) -> str:
+    return "Here you go:\n" + json.dumps({"hooks": items}) + "\nThanks"
+
+
+def test_hooks_come_back_in_contact_order():
+    text = _response([{"id": 1, "hook": '"your path to Gulf Ventures"'}, {"id": "2", "hook": " your fintech bets "}])
+    assert parse_packed_hooks(text, 2) == ["your path to Gulf Ventures", "your fintech bets"]
+
+
+def test_out_of_order_or_wrong_count_discards_everything():
+    swapped = _response([{"id": 2, "hook": "b"}, {"id": 1, "hook": "a"}])
+    assert parse_packed_hooks(swapped, 2) == [None, None]
+    assert parse_packed_hooks(_response([{"id": 1, "hook": "a"}]), 2) == [None, None]
+
+
+def test_invalid_hooks_fall_back_one_by_one():
+    too_long = " ".join(["word"] * (PACKED_MAX_WORDS + 1))
+    text = _response([{"id": 1, "hook": "good"}, {"id": 2, "hook": "  "}, {"id": 3, "hook": too_long}])
+    assert parse_packed_hooks(text, 3) == ["good", None, None]
+
+
+def test_unparseable_response():
+    assert parse_packed_hooks(None, 2) == [None, None]
+    assert parse_packed_hooks("not json", 2) == [None, None]
+    assert parse_packed_hooks('{"other": []}', 1) == [None]
+
+
+def test_generate_hooks_packed_regenerates_only_the_failed(monkeypatch):
+    monkeypatch.setattr(generate_hooks, "complete",
+                        lambda prompt, max_tokens: _response([{"id": 1, "hook": "packed"}, {"id": 2, "hook": ""}]))
+    calls = []
+    monkeypatch.setattr(generate_hooks, "generate_hook", lambda contact, context: calls.append(contact) or "single")
+    contacts = [{"Primary Contact": "A", "Investors": "F1"}, {"Primary Contact": "B", "Investors": "F2"}]
+    hooks, stats = generate_hooks.generate_hooks_packed(contacts, ["ctx 1", "ctx 2"])
+    assert hooks == ["packed", "single"]
+    assert calls == [contacts[1]]
+    assert stats["calls"] == 2
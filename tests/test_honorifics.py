@@ -0,0 +1,51 @@
+"""Las versiones vectorizadas de honorifics.py dan lo mismo que las de fila a fila."""
+
+import numpy as np
+import pandas as pd
+
+import honorifics
+
+CONTACTS = pd.DataFrame(
+    [
+        ("Omar Al-Saud", "Managing Partner"),
+        ("  Ali   bin \t Hamad  ", "Mr. Dr. Founding Partner"),
+        ("Smith, John", "Doctoral Fellow"),
+        ("Omar Al-Saud, PhD, CFA", "Sheikh, Mr. Chairman"),
+        ("Cher", "Miss Universe Partner"),
+        ("", "madam chair"),
+        ("   ", "H.E. Board Member"),
+        (np.nan, "his excellency, ms"),
+        ("Line\nBreak Name", "MRS\nPartner"),
+        ("Zoë Núñez", np.nan),
+        ("Rania Haddad", "Dr"),
+        ("Omar Al-Saud", "Managing Partner"),
+    ],
+    columns=["Primary Contact", "Primary Contact Title"],
+    dtype=object,
+)
+
+
+def test_split_names_matches_split_name():
+    first, last = honorifics.split_names(CONTACTS["Primary Contact"])
+    expected = CONTACTS["Primary Contact"].apply(honorifics.split_name).tolist()
+    assert list(zip(first, last)) == expected
+    assert first.index.equals(CONTACTS.index)
+
+
+def test_honorifics_from_titles_matches_honorific_from_title():
+    titles = CONTACTS["Primary Contact Title"]
+    expected = titles.apply(honorifics.honorific_from_title).tolist()
+    assert honorifics.honorifics_from_titles(titles).tolist() == expected
+
+
+def test_build_salutations_matches_build_salutation():
+    first, last = honorifics.split_names(CONTACTS["Primary Contact"])
+    honorific = honorifics.honorifics_from_titles(CONTACTS["Primary Contact Title"])
+    names = CONTACTS["Primary Contact"]
+    expected = [honorifics.build_salutation(h, f, l, n) for h, f, l, n in zip(honorific, first, last, names)]
+    assert honorifics.build_salutations(honorific, first, last, names).tolist() == expected
+
+
+def test_title_priority():
+    assert honorifics.honorific_from_title("Mr. Dr. Founding Partner") == "Dr."
+    assert honorifics.honorific_from_title("Doctoral Fellow") == ""
@@ -0,0 +1,51 @@
+"""Resultados de revisión en SQLite con paginación (review_store.py)."""
+
+import pandas as pd
+
+from review_store import ReviewStore
+
+
+def _result(row_idx: int, score: float, severities=()) -> dict:
+    issues = [{"type": "grammar", "issue": f"issue {s}", "severity": s} for s in severities]
+    return {"row_idx": row_idx, "score": score, "is_english": True, "issues": issues}
+
+
+def _store(tmp_path, run_id="run-1") -> ReviewStore:
+    store = ReviewStore(path=str(tmp_path / "results.sqlite"), run_id=run_id)
+    rows = pd.DataFrame({"body": [f"email {i}" for i in range(25)]})
+    results = [_result(i, 6 if i % 2 else 9, ("high",) if i % 5 == 0 else ()) for i in range(25)]
+    store.add(results[10:], rows)
+    store.add(results[:10], rows)
+    return store
+
+
+def test_pages_are_ordered_and_complete(tmp_path):
+    store = _store(tmp_path)
+    flagged = [i for i in range(25) if i % 2 or i % 5 == 0]
+    assert store.count_flagged(min_score=7) == len(flagged)
+
+    pages = [store.flagged_page(min_score=7, page=p, page_size=4) for p in range(4)]
+    assert [len(page) for page in pages] == [4, 4, 4, 3]
+    assert [r["row_idx"] for page in pages for r in page] == flagged
+    assert pages[0][0]["row"] == {"body": "email 0"}
+
+
+def test_severity_filter_and_summary(tmp_path):
+    store = _store(tmp_path)
+    assert [r["row_idx"] for r in store.flagged_page(min_score=0, severity="high")] == [0, 5, 10, 15, 20]
+    assert store.count_flagged(min_score=0, severity="low") == 0
+    assert store.summary()["total"] == 25
+
+
+def test_runs_are_isolated_and_reset(tmp_path):
+    store = _store(tmp_path)
+    other = ReviewStore(path=store.path, run_id="run-2")
+    assert other.summary()["total"] == 0
+    store.reset()
+    assert store.summary()["total"] == 0
+
+
+def test_report_chunks_cover_every_row(tmp_path):
+    report = pd.concat(_store(tmp_path).iter_report(chunksize=10))
+    assert report["row_index"].tolist() == list(range(25))
+    assert report["body"].tolist() == [f"email {i}" for i in range(25)]
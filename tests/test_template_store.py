@@ -0,0 +1,70 @@
+"""Ida y vuelta entre el CSV completo y el formato template-delta (template_store.py)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import template_store
+from csv_storage import read_csv_versioned, write_csv_atomic
+from regenerate_emails_with_short_name import build_email_body, build_email_subject
+
+
+def _full_frame() -> pd.DataFrame:
+    df = pd.DataFrame({
+        "Primary Contact": ["Omar Haddad", "Sara Khan", "Ali Saleh", "No Body"],
+        "Honorific": ["Mr.", "Ms.", "", "Mr."],
+        "Last Name": ["Haddad", "Khan", "Saleh", "Body"],
+        "Investors": ["Gulf Ventures LLC", "Desert Capital", "Nile Partners", "Empty Fund"],
+        "Short_Name": ["Gulf Ventures", np.nan, "Nile", "Empty"],
+        "Person_Hook": ["your fintech bets caught my attention", np.nan, "", np.nan],
+    }, dtype=object)
+    df["Email_Subject"] = [build_email_subject(row) for _, row in df.iterrows()]
+    df["Email_Body"] = [build_email_body(row) for _, row in df.iterrows()]
+    # Cuerpo editado a mano (no coincide con la plantilla) y fila sin cuerpo
+    df.loc[1, "Email_Body"] = df.loc[1, "Email_Body"].replace("Best regards", "Kind regards")
+    df.loc[3, ["Email_Subject", "Email_Body"]] = np.nan
+    df["Email_Template"] = ("Subject: " + df["Email_Subject"] + "\n\n" + df["Email_Body"]).where(df["Email_Body"].notna())
+    return df
+
+
+def test_encode_expand_round_trip():
+    df = _full_frame()
+    compact = template_store.encode(df)
+    assert template_store.is_compact(compact)
+    # Solo el cuerpo editado a mano queda guardado como override
+    assert compact["Email_Body"].notna().tolist() == [False, True, False, False]
+    assert compact[template_store.VERSION_COLUMN].isna().tolist() == [False, False, False, True]
+    pd.testing.assert_frame_equal(template_store.expand(compact, keep_version=False), df, check_dtype=False)
+
+
+def test_render_row_matches_resolve():
+    compact = template_store.encode(_full_frame())
+    resolved = template_store.resolve(compact)
+    for idx, row in compact.iterrows():
+        rendered = template_store.render_row(row)
+        for col in template_store.DERIVED_COLUMNS:
+            expected = resolved.at[idx, col]
+            assert rendered[col] == (expected if isinstance(expected, str) else None)
+
+
+def test_set_value_keeps_stored_body_when_hook_changes():
+    df = _full_frame()
+    compact = template_store.encode(df)
+    template_store.set_value(compact, 0, "Person_Hook", "a new hook")
+    expanded = template_store.expand(compact)
+    assert expanded.at[0, "Person_Hook"] == "a new hook"
+    assert expanded.at[0, "Email_Body"] == df.at[0, "Email_Body"]
+
+
+@pytest.mark.parametrize("storage", ["delta", "full"])
+def test_csv_round_trip(tmp_path, monkeypatch, storage):
+    monkeypatch.setenv(template_store.STORAGE_ENV, storage)
+    path = str(tmp_path / "contacts.csv")
+    df = _full_frame()
+    write_csv_atomic(df, path)
+    assert template_store.file_is_delta(path) == (storage == "delta")
+
+    loaded, _ = read_csv_versioned(path)
+    loaded = loaded.drop(columns=template_store.VERSION_COLUMN, errors="ignore")
+    expected = df.astype(object).where(df.notna() & (df != ""), np.nan)
+    pd.testing.assert_frame_equal(loaded.astype(object), expected, check_dtype=False)
@@ -0,0 +1,30 @@
+"""URLs canónicas y deduplicación de resultados web (web_ranking.py)."""
+
+from web_ranking import canonical_url, dedupe_results
+
+
+def test_canonical_url_drops_scheme_host_prefix_fragment_and_slash():
+    assert canonical_url("https://www.example.com/news/") == "example.com/news"
+    assert canonical_url("http://m.example.com/news#top") == "example.com/news"
+    assert canonical_url("HTTPS://Example.COM/News") == "example.com/News"
+    assert canonical_url("") == ""
+
+
+def test_canonical_url_strips_only_tracking_params():
+    url = "https://example.com/a?utm_source=x&UTM_Medium=y&ref=home&fbclid=1&id=7&reference=2&refid=3&trkid_page=4"
+    assert canonical_url(url) == "example.com/a?id=7&reference=2&refid=3&trkid_page=4"
+
+
+def test_canonical_url_sorts_query():
+    assert canonical_url("https://example.com/a?b=2&a=1") == canonical_url("https://example.com/a?a=1&b=2")
+
+
+def test_dedupe_results_keeps_longest_snippet_per_url():
+    results = [
+        {"url": "https://www.example.com/p?utm_source=a", "title": "P", "snippet": "short"},
+        {"url": "http://example.com/p/", "title": "P", "snippet": "a longer snippet"},
+        {"url": "https://example.com/other", "title": "O", "snippet": "x"},
+        {"url": "", "title": "No URL", "snippet": "kept by title"},
+    ]
+    deduped = dedupe_results(results)
+    assert [r["snippet"] for r in deduped] == ["a longer snippet", "x", "kept by title"]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Ranking de resultados web antes de armar el prompt del hook.
+
+Las búsquedas de un contacto devuelven a menudo la misma página varias veces
+(con o sin www, utm_*, barra final) o páginas que no hablan de él. Aquí:
+
+1. Se deduplican por URL canónica.
+2. Cada resultado se puntúa contra el nombre de la persona y del fondo con
+   rapidfuzz token_set_ratio sobre título + fragmento.
+3. Se eligen los mejores hasta WEB_RESULTS_IN_PROMPT y dentro de un
+   presupuesto de tokens; la fuente del hook es el mejor resultado.
+
+enough_results() permite cortar las búsquedas en cuanto hay suficientes
+resultados buenos, así la mayoría de contactos necesitan menos consultas.
+"""
+
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from rapidfuzz import fuzz, utils
+
+from hook_prompts import WEB_RESULTS_IN_PROMPT, WEB_SNIPPET_TOKENS, count_tokens, trim_to_tokens
+
+WEB_CONTEXT_TOKENS = 300    # Presupuesto total de los fragmentos en el prompt
+MIN_RELEVANCE = 45          # Por debajo, la página no habla ni de la persona ni del fondo
+GOOD_RELEVANCE = 75         # Resultado claramente sobre la persona
+PERSON_WEIGHT = 0.7         # La persona pesa más que el fondo (el resumen del fondo ya va aparte)
+
+# Parámetros de seguimiento que no cambian la página: nombres exactos (así
+# "reference" o "refid" se conservan) y el prefijo utm_
+_TRACKING_PARAMS = {"ref", "fbclid", "gclid", "mc_cid", "mc_eid", "trk"}
+_TRACKING_PREFIX = "utm_"
+
+
+def canonical_url(url: str) -> str:
+    """URL canónica para deduplicar: sin esquema, www, fragmento, tracking ni barra final."""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+    query = [(k, v) for k, v in parse_qsl(parts.query)
+             if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith(_TRACKING_PREFIX)]
+    path = parts.path.rstrip("/")
+    return urlunsplit(("", host, path, urlencode(sorted(query)), "")).lstrip("/")
+
+
+def relevance(result: Dict, person: str, fund: str) -> float:
+    """Puntuación 0-100 del resultado frente a los nombres de la persona y del fondo."""
+    person = person if isinstance(person, str) else ""
+    fund = fund if isinstance(fund, str) else ""
+    text = f"{result.get('title', '')} {result.get('snippet', '')}"
+    person_score = fuzz.token_set_ratio(person, text, processor=utils.default_process) if person else 0
+    fund_score = fuzz.token_set_ratio(fund, text, processor=utils.default_process) if fund else 0
+    if not person:
+        return fund_score
+    return PERSON_WEIGHT * person_score + (1 - PERSON_WEIGHT) * fund_score
+
+
+def dedupe_results(results: List[Dict]) -> List[Dict]:
+    """Un resultado por URL canónica (se queda el de fragmento más largo)."""
+    by_url: Dict[str, Dict] = {}
+    for result in results:
+        key = canonical_url(result.get("url", "")) or result.get("title", "")
+        current = by_url.get(key)
+        if current is None or len(result.get("snippet", "")) > len(current.get("snippet", "")):
+            by_url[key] = result
+    return list(by_url.values())
+
+
+def _cost(result: Dict) -> int:
+    return (count_tokens(trim_to_tokens(result.get("title", ""), 30))
+            + count_tokens(trim_to_tokens(result.get("snippet", ""), WEB_SNIPPET_TOKENS)))
+
+
+def rank_web_results(results: List[Dict], person: str, fund: str,
+                     max_results: int = WEB_RESULTS_IN_PROMPT,
+                     token_budget: int = WEB_CONTEXT_TOKENS) -> List[Dict]:
+    """
+    Deduplica, puntúa y elige los mejores resultados dentro del presupuesto.
+    Cada resultado devuelto lleva su "score".
+    """
+    scored = []
+    for result in dedupe_results(results):
+        score = relevance(result, person, fund)
+        if score >= MIN_RELEVANCE:
+            scored.append({**result, "score": round(score, 1)})
+    scored.sort(key=lambda r: r["score"], reverse=True)
+
+    selected, used = [], 0
+    for result in scored:
+        cost = _cost(result)
+        if used + cost > token_budget:
+            continue
+        selected.append(result)
+        used += cost
+        if len(selected) >= max_results:
+            break
+    return selected
+
+
+def enough_results(results: List[Dict], person: str, fund: str,
+                   needed: int = WEB_RESULTS_IN_PROMPT) -> bool:
+    """True si ya hay `needed` resultados distintos claramente sobre la persona."""
+    good = [r for r in dedupe_results(results) if relevance(r, person, fund) >= GOOD_RELEVANCE]
+    return len(good) >= needed
+
+
+def best_source_url(ranked: List[Dict]) -> str:
+    """URL del resultado mejor puntuado (la fuente que se guarda con el hook)."""
+    return ranked[0].get("url", "") if ranked else ""